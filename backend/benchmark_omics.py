@@ -0,0 +1,71 @@
+"""
+/integrate-omics latency before and after GPR compilation.
+
+Usage: python benchmark_omics.py [model_file] [repeats]
+"""
+import os
+import sys
+import time
+import numpy as np
+from simulator import MetabolicSimulator
+from omics_integrator import OmicsIntegrator
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def apply_reference(integrator: OmicsIntegrator, gene_expression, normalization_factor=1.0):
+    """The pre-compilation request path: string GPR evaluation and get_by_id per reaction."""
+    model = integrator.model
+    for rxn_id, expression in integrator._map_gene_to_reaction_reference(gene_expression).items():
+        rxn = model.reactions.get_by_id(rxn_id)
+        bound = expression * normalization_factor
+        if rxn.upper_bound > 0:
+            rxn.upper_bound = min(rxn.upper_bound, bound)
+        if rxn.lower_bound < 0:
+            rxn.lower_bound = max(rxn.lower_bound, -bound)
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return 1000 * float(np.median(samples))
+
+
+def main():
+    model_file = sys.argv[1] if len(sys.argv) > 1 else "iML1515.json"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    sim = MetabolicSimulator(os.path.join(MODELS_DIR, model_file))
+    rng = np.random.default_rng(0)
+    gene_expression = {g.id: float(v) for g, v in zip(sim.model.genes, rng.lognormal(2.0, 1.0, len(sim.model.genes)))}
+
+    start = time.perf_counter()
+    integrator = OmicsIntegrator(sim.model)
+    compile_ms = 1000 * (time.perf_counter() - start)
+
+    compiled = integrator._map_gene_to_reaction(gene_expression)
+    reference = integrator._map_gene_to_reaction_reference(gene_expression)
+    agree = sum(1 for rid, v in reference.items() if abs(compiled.get(rid, 0.0) - v) < 1e-9)
+
+    def request(apply):
+        sim.reset_model()
+        apply()
+        sim.simulate()
+
+    rows = [
+        ("GPR mapping (reference)", timed(lambda: integrator._map_gene_to_reaction_reference(gene_expression), repeats)),
+        ("GPR mapping (compiled)", timed(lambda: integrator._map_gene_to_reaction(gene_expression), repeats)),
+        ("/integrate-omics path (before)", timed(lambda: request(lambda: apply_reference(integrator, gene_expression)), repeats)),
+        ("/integrate-omics path (after)", timed(lambda: request(lambda: integrator.apply_omics_data(gene_expression)), repeats)),
+    ]
+
+    print(f"Model: {model_file}, {len(integrator.gpr.reaction_ids)} GPR rules, compile {compile_ms:.1f} ms")
+    print(f"Reference reactions reproduced: {agree}/{len(reference)} (compiled maps {len(compiled)})")
+    for label, ms in rows:
+        print(f"{label:<34} {ms:9.2f} ms (median of {repeats})")
+
+
+if __name__ == "__main__":
+    main()
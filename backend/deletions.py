@@ -0,0 +1,144 @@
+import os
+import json
+import math
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+import model_cache
+import worker_pool
+from preprocessing import medium_of, medium_hash
+
+logger = logging.getLogger(__name__)
+
+DELETION_KINDS = ("gene", "reaction")
+DELETION_COLUMNS = ["id", "growth", "relative_growth", "status", "essential"]
+# A deletion is essential when growth drops below this fraction of the wild type
+ESSENTIAL_FRACTION = 0.01
+
+_memory_cache: Dict[str, Dict] = {}
+# Cache file path of tables not computed yet, so a miss costs a stat, not a model hash
+_misses: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _key(model_path: str, medium: Dict, kind: str) -> str:
+    return f"{model_path}:{medium_hash(medium)}:{kind}"
+
+
+def _disk_path(model_path: str, medium: Dict, kind: str) -> str:
+    return model_cache.cache_path(model_path, suffix=f"-del-{kind}-{medium_hash(medium)}.json")
+
+
+def _deletion_frame(model, kind: str, ids: Optional[List[str]]):
+    from cobra.flux_analysis import single_gene_deletion, single_reaction_deletion
+
+    # Always in-process: parallel scans go through worker_pool's spawned workers,
+    # never through cobra's own (forking) pool inside the threaded API server
+    if kind == "gene":
+        return single_gene_deletion(model, gene_list=ids, processes=1)
+    return single_reaction_deletion(model, reaction_list=ids, processes=1)
+
+
+def _deletion_growth(model, kind: str, ids: Optional[List[str]]) -> List[Tuple[str, float, str]]:
+    frame = _deletion_frame(model, kind, ids)
+    return [
+        (next(iter(deleted)), 0.0 if growth is None or math.isnan(growth) else float(growth), status)
+        for deleted, growth, status in zip(frame["ids"], frame["growth"], frame["status"])
+    ]
+
+
+def run_deletions(sim, kind: str = "gene", ids: Optional[List[str]] = None, processes: int = 1) -> Dict:
+    """
+    Single gene or reaction deletions on the simulator's current scenario.
+    With processes > 1 the ids are split across worker processes that replay
+    the scenario. Returns a table with growth relative to the wild type and essentiality.
+    """
+    wild_type = sim.model.slim_optimize()
+    if math.isnan(wild_type):
+        raise ValueError("Wild-type model not optimal in this medium")
+    if processes > 1:
+        if ids is None:
+            ids = [item.id for item in (sim.model.genes if kind == "gene" else sim.model.reactions)]
+        results = [
+            item for chunk in worker_pool.map_chunks(
+                _deletion_chunk, sim.model_path, worker_pool.chunked(ids, processes * 4),
+                scenario=sim.scenario, kind=kind
+            ) for item in chunk
+        ]
+    else:
+        results = _deletion_growth(sim.model, kind, ids)
+
+    rows = []
+    for deleted, growth, status in results:
+        relative = growth / wild_type if wild_type > 0 else 0.0
+        rows.append([deleted, round(growth, 6), round(relative, 4), status, relative < ESSENTIAL_FRACTION])
+    rows.sort(key=lambda row: row[0])
+    return {
+        "kind": kind,
+        "medium": medium_of(sim.scenario),
+        "wild_type_growth": round(wild_type, 6),
+        "columns": DELETION_COLUMNS,
+        "rows": rows,
+    }
+
+
+def _remember(key: str, table: Dict) -> Dict:
+    table["essential_set"] = {row[0] for row in table["rows"] if row[4]}
+    with _lock:
+        _memory_cache[key] = table
+    return table
+
+
+def get_deletions(sim, kind: str = "gene", processes: int = 1) -> Dict:
+    """
+    Genome-wide deletion table for the simulator's current medium, computed
+    once and cached in memory and as JSON next to the model cache.
+    """
+    medium = medium_of(sim.scenario)
+    table = lookup(sim.model_path, medium, kind)
+    if table is not None:
+        return table
+    table = run_deletions(sim, kind, processes=processes)
+    try:
+        model_cache.write_atomic(_disk_path(sim.model_path, medium, kind), json.dumps(table).encode("utf-8"))
+    except OSError as e:
+        logger.warning(f"Could not write deletion cache: {e}")
+    return _remember(_key(sim.model_path, medium, kind), table)
+
+
+def lookup(model_path: str, medium: Dict, kind: str) -> Optional[Dict]:
+    """Cached deletion table, or None when it has not been computed for this medium."""
+    key = _key(model_path, medium, kind)
+    with _lock:
+        table = _memory_cache.get(key)
+        path = _misses.get(key)
+    if table is not None:
+        return table
+    if path is None:
+        path = _disk_path(model_path, medium, kind)
+    # A table written later (e.g. by another process) is picked up on the next lookup
+    if not os.path.exists(path):
+        with _lock:
+            _misses[key] = path
+        return None
+    try:
+        with open(path) as fh:
+            table = json.load(fh)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Discarding unreadable deletion cache {path}: {e}")
+        return None
+    with _lock:
+        _misses.pop(key, None)
+    return _remember(key, table)
+
+
+def essential_set(model_path: str, medium: Dict, kind: str) -> Optional[set]:
+    table = lookup(model_path, medium, kind)
+    return table["essential_set"] if table is not None else None
+
+
+def _deletion_chunk(model_path: str, ids: List[str], scenario: Dict, kind: str) -> List[Tuple[str, float, str]]:
+    """Worker-process entry point for parallel deletion scans."""
+    sim = worker_pool.get_worker_simulator(model_path)
+    sim.apply_scenario(scenario)
+    return _deletion_growth(sim.model, kind, ids)
@@ -0,0 +1,420 @@
+import math
+import bisect
+import numpy as np
+import cobra
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Constants for uptake (Michaelis-Menten)
+KM_UPTAKE = 0.5 # mmol/L
+VMAX_UPTAKE = -10.0 # mmol/gDW/h (Negative for uptake)
+
+# Toxicity Thresholds (mmol/L)
+TOXICITY_MAP = {
+    "EX_ac_e": 60.0,   # Acetate threshold
+    "EX_lac__L_e": 40.0, # Lactate threshold
+    "EX_etoh_e": 30.0    # Ethanol threshold
+}
+TOXICITY_ALERT_FRACTION = 0.8
+
+INTEGRATORS = ("euler", "rk45")
+
+# Dormand-Prince 5(4) tableau
+_DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+_DP_B = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0])
+_DP_B_LOW = np.array([5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+_DP_E = _DP_B - _DP_B_LOW
+
+
+def substrate_uptake(S: float) -> float:
+    return VMAX_UPTAKE * (S / (KM_UPTAKE + S))
+
+
+def substrate_for_uptake(v: float) -> float:
+    """Inverse of substrate_uptake for VMAX_UPTAKE < v <= 0."""
+    return KM_UPTAKE * v / (VMAX_UPTAKE - v)
+
+
+class DFBAEngine:
+    """
+    Incremental LP backend for dynamic FBA.
+    The model's solver problem stays loaded for the whole run: each step only
+    moves the substrate uptake bound, the solver warm-starts from the previous
+    optimal basis, and only exchange fluxes are read back from the primal values.
+    """
+
+    def __init__(self, model: cobra.Model, substrate_rxn_id: str = "EX_glc__D_e"):
+        self.model = model
+        self.substrate = model.reactions.get_by_id(substrate_rxn_id)
+        exchanges = list(model.exchanges)
+        self.exchange_ids = [r.id for r in exchanges]
+        self._exchange_vars = [(r.forward_variable, r.reverse_variable) for r in exchanges]
+        self.substrate_pos = self.exchange_ids.index(substrate_rxn_id)
+        self.reaction_ids = [r.id for r in model.reactions]
+        self.solves = 0
+        self._reaction_var_names = None
+
+    def solve(self, substrate_lower_bound: float) -> Optional[Tuple[float, np.ndarray]]:
+        """
+        Solve one step. Returns (objective value, exchange fluxes) or None when
+        the LP is not optimal. Exchange fluxes follow `self.exchange_ids`.
+        """
+        self.substrate.lower_bound = substrate_lower_bound
+        self.solves += 1
+        mu = self.model.slim_optimize()
+        if math.isnan(mu) or self.model.solver.status != 'optimal':
+            return None
+        fluxes = np.fromiter(
+            (fwd.primal - rev.primal for fwd, rev in self._exchange_vars),
+            dtype=float, count=len(self._exchange_vars)
+        )
+        return mu, fluxes
+
+    def reaction_flux_array(self) -> np.ndarray:
+        """
+        Net flux of every reaction (in `self.reaction_ids` order) for the last solve.
+        Only needed when the full flux history is requested.
+        """
+        if self._reaction_var_names is None:
+            self._reaction_var_names = [(r.forward_variable.name, r.reverse_variable.name) for r in self.model.reactions]
+        primals = self.model.solver.primal_values
+        values = np.fromiter(
+            (primals[fwd] - primals[rev] for fwd, rev in self._reaction_var_names),
+            dtype=float, count=len(self._reaction_var_names)
+        )
+        return np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def toxicity_positions(self) -> List[Optional[int]]:
+        return [self.exchange_ids.index(rid) if rid in self.exchange_ids else None for rid in TOXICITY_MAP]
+
+
+class UptakeResponse:
+    """
+    Optimum of the engine's LP as a function of the substrate uptake bound,
+    answered from as few solves as possible.
+
+    The optimal growth rate is concave and piecewise linear in the bound, and
+    on a linear piece any convex combination of two optimal solutions is
+    optimal too. A gap between two solved bounds is certified linear when the
+    solve at its midpoint lies on their chord (by concavity the growth rate
+    then stays within twice the chord tolerance anywhere in the gap), and
+    bounds inside a certified gap are interpolated without a solve.
+    Uncertified gaps are halved on demand down to `resolution`; below that,
+    bounds are solved directly.
+    """
+
+    def __init__(self, engine: DFBAEngine, resolution: float = 1e-3, tolerance: float = 1e-7,
+                 max_edge_solves: int = 30):
+        self.engine = engine
+        self.resolution = resolution
+        self.tolerance = tolerance
+        self.max_edge_solves = max_edge_solves
+        self.bounds: List[float] = []  # solved feasible bounds, ascending
+        self.values: List[Tuple[float, np.ndarray]] = []
+        self.linear: List[bool] = []  # gap i lies between bounds[i] and bounds[i + 1]
+        self.infeasible_from: Optional[float] = None  # every bound >= this is infeasible
+        self._edge_searched = False
+        self._lower_end_solved = False
+
+    @property
+    def edge(self) -> Optional[float]:
+        """Least restrictive feasible bound found, once the infeasible side is known."""
+        if self.infeasible_from is None or not self.bounds:
+            return None
+        return self.bounds[-1]
+
+    def _solve(self, v: float) -> Optional[Tuple[float, np.ndarray]]:
+        step = self.engine.solve(v)
+        if step is None:
+            # Loosening the bound only grows the feasible set, so this holds for every higher bound
+            above_feasible = not self.bounds or v > self.bounds[-1]
+            if above_feasible and (self.infeasible_from is None or v < self.infeasible_from):
+                self.infeasible_from = v
+            return None
+        i = bisect.bisect_left(self.bounds, v)
+        if 0 < i < len(self.bounds):
+            # Splitting a gap: both halves inherit its certificate
+            self.linear[i - 1:i] = [self.linear[i - 1]] * 2
+        elif self.bounds:
+            self.linear.insert(0 if i == 0 else len(self.linear), False)
+        self.bounds.insert(i, v)
+        self.values.insert(i, step)
+        return step
+
+    def _find_edge(self):
+        """
+        Bracket the feasibility edge between the highest solved bound and 0.
+        Past the last kink growth falls linearly to zero at the edge (the
+        uptake no longer covers maintenance), so a secant on the two highest
+        solves estimates it and a probe either side closes the bracket;
+        bisection takes over when the estimate misses.
+        """
+        self._edge_searched = True
+        if self._solve(0.0) is not None:
+            return
+        probes: List[float] = []
+        for _ in range(self.max_edge_solves):
+            lo, hi = self.bounds[-1], self.infeasible_from
+            if hi - lo <= self.resolution:
+                return
+            if not probes and len(self.bounds) >= 2:
+                (v0, v1), mu0, mu1 = self.bounds[-2:], self.values[-2][0], self.values[-1][0]
+                if mu1 != mu0:
+                    estimate = v1 - mu1 * (v1 - v0) / (mu1 - mu0)
+                    probes = [v for v in (estimate - 0.5 * self.resolution, estimate + 0.5 * self.resolution)
+                              if lo < v < hi]
+            v = probes.pop(0) if probes else 0.5 * (lo + hi)
+            if lo < v < hi:
+                self._solve(v)
+
+    def evaluate(self, v: float) -> Optional[Tuple[float, np.ndarray]]:
+        """(growth rate, exchange fluxes) at uptake bound `v`, or None when infeasible."""
+        while True:
+            if self.infeasible_from is not None and v >= self.infeasible_from:
+                return None
+            i = bisect.bisect_left(self.bounds, v)
+            if i < len(self.bounds) and self.bounds[i] == v:
+                return self.values[i]
+            if i == len(self.bounds) and self.bounds and not self._edge_searched:
+                self._find_edge()
+                continue
+            if i == 0 and self.bounds and not self._lower_end_solved and v > VMAX_UPTAKE:
+                # Close the range from below with the loosest bound any substrate level gives
+                self._lower_end_solved = True
+                self._solve(VMAX_UPTAKE)
+                continue
+            if i == 0 or i == len(self.bounds):
+                return self._solve(v)
+            lo, hi = self.bounds[i - 1], self.bounds[i]
+            if self.linear[i - 1]:
+                w = (v - lo) / (hi - lo)
+                (mu_lo, ex_lo), (mu_hi, ex_hi) = self.values[i - 1], self.values[i]
+                return mu_lo + w * (mu_hi - mu_lo), ex_lo + w * (ex_hi - ex_lo)
+            if hi - lo <= 2 * self.resolution:
+                return self._solve(v)
+            mid = self._solve(0.5 * (lo + hi))
+            if mid is None:
+                return self._solve(v)  # between two feasible bounds; only on solver trouble
+            chord = 0.5 * (self.values[i - 1][0] + self.values[i + 1][0])
+            if abs(mid[0] - chord) <= self.tolerance * max(1.0, abs(chord)):
+                self.linear[i - 1] = self.linear[i] = True
+
+
+def _point(t: float, X: float, S: float, mu: float, ex_values: Optional[np.ndarray],
+           alerts: List[Dict], fluxes: Optional[np.ndarray]) -> Dict:
+    return {
+        "time": t,
+        "biomass": X,
+        "glucose": S,
+        "growth_rate": mu,
+        "exchange_fluxes": ex_values,
+        "alerts": alerts,
+        "fluxes": fluxes,
+    }
+
+
+def euler_points(engine: DFBAEngine, initial_glucose: float, initial_biomass: float,
+                 total_time: float, time_step: float, include_fluxes: bool = False) -> Iterator[Dict]:
+    """
+    Fixed-step explicit Euler dFBA. Yields one point per step; the growth rate
+    and exchange fluxes of a point are those solved at its (X, S) state.
+    """
+    X = initial_biomass
+    S = initial_glucose
+    t = 0.0
+    # Byproduct accumulation (mmol/L)
+    P = {rid: 0.0 for rid in TOXICITY_MAP}
+    tox_pos = engine.toxicity_positions()
+
+    while t <= total_time and S > 0:
+        step = engine.solve(substrate_uptake(S))
+        if step is None:
+            yield _point(t, X, S, 0.0, None, [], None)
+            return
+        mu, ex_values = step
+
+        # --- Toxicity Inhibition Factor ---
+        # mu = mu_base * Product(Ki / (Ki + Pi))
+        inhibition_factor = 1.0
+        alerts = []
+        for rid, threshold in TOXICITY_MAP.items():
+            current_p = P[rid]
+            inhibition_factor *= (threshold / (threshold + current_p))
+            if current_p > threshold * TOXICITY_ALERT_FRACTION:
+                alerts.append({"time": t, "byproduct": rid, "concentration": current_p})
+        mu = mu * inhibition_factor
+
+        fluxes = engine.reaction_flux_array() if include_fluxes else None
+        yield _point(t, X, S, mu, ex_values, alerts, fluxes)
+
+        # Accumulate secreted byproducts in the medium
+        for rid, pos in zip(TOXICITY_MAP, tox_pos):
+            if pos is not None and ex_values[pos] > 1e-4:
+                P[rid] += ex_values[pos] * X * time_step
+
+        # Integrate (Euler)
+        dt = time_step
+        X_next = X + (mu * X * dt)
+        S_next = S + (ex_values[engine.substrate_pos] * X * dt)
+
+        X = max(0, X_next)
+        S = max(0, S_next)
+        t += dt
+
+
+def _hermite(y0: np.ndarray, y1: np.ndarray, f0: np.ndarray, f1: np.ndarray, h: float, s: float) -> np.ndarray:
+    s2, s3 = s * s, s * s * s
+    return ((2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * h * f0
+            + (-2 * s3 + 3 * s2) * y1 + (s3 - s2) * h * f1)
+
+
+def _locate_crossing(y0, y1, f0, f1, h, component: int, level: float, iterations: int = 40) -> float:
+    """
+    Fraction of the step at which `component` crosses `level`, found by bisection
+    on the cubic Hermite interpolant (no extra LP solves).
+    """
+    lo, hi = 0.0, 1.0
+    below_at_start = y0[component] < level
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        value = _hermite(y0, y1, f0, f1, h, mid)[component]
+        if (value < level) == below_at_start:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def adaptive_points(engine: DFBAEngine, initial_glucose: float, initial_biomass: float,
+                    total_time: float, rtol: float = 1e-3, atol: float = 1e-6,
+                    max_step: float = 2.0, min_step: float = 1e-4,
+                    depletion_threshold: float = 1e-3, include_fluxes: bool = False) -> Iterator[Dict]:
+    """
+    Direct-approach dFBA with an adaptive Dormand-Prince RK45 integrator.
+
+    The state is y = [X, S, P_1..P_n] (biomass, substrate, toxic byproducts).
+    Right-hand sides come from an UptakeResponse, so stages whose uptake bound
+    lies on an already certified linear piece of the LP cost no solve, and step
+    sizes are picked from the embedded error estimate alone.
+    The run ends when the substrate is exhausted (S <= depletion_threshold) or
+    reaches the lowest level whose LP is feasible, where the uptake no longer
+    covers maintenance; stages that overshoot that level are evaluated at it.
+    Both ends, and toxicity thresholds, are located on the Hermite interpolant
+    of the accepted step.
+    """
+    tox_pos = engine.toxicity_positions()
+    tox_thresholds = np.array(list(TOXICITY_MAP.values()))
+    tox_ids = list(TOXICITY_MAP)
+    # Bounds closer than rtol of the largest uptake are not told apart
+    response = UptakeResponse(engine, resolution=rtol * abs(VMAX_UPTAKE))
+
+    def rhs(y: np.ndarray):
+        X, S = max(y[0], 0.0), max(y[1], 0.0)
+        step = response.evaluate(substrate_uptake(S))
+        if step is None and response.edge is not None:
+            step = response.evaluate(response.edge)
+        if step is None:
+            return None
+        mu0, ex_values = step
+        P = np.maximum(y[2:], 0.0)
+        mu = mu0 * float(np.prod(tox_thresholds / (tox_thresholds + P)))
+        dy = np.empty_like(y)
+        dy[0] = mu * X
+        dy[1] = ex_values[engine.substrate_pos] * X if S > 0 else 0.0
+        for i, pos in enumerate(tox_pos):
+            secreted = ex_values[pos] if pos is not None else 0.0
+            dy[2 + i] = secreted * X if secreted > 1e-4 else 0.0
+        return dy, mu, ex_values
+
+    def end_level() -> float:
+        edge = response.edge
+        floor = substrate_for_uptake(edge) if edge is not None and edge < 0 else 0.0
+        return max(depletion_threshold, floor)
+
+    def fluxes_at(y: np.ndarray) -> Optional[np.ndarray]:
+        if not include_fluxes:
+            return None
+        # Interpolated right-hand sides leave no matching solver state, so solve at the recorded state
+        v = substrate_uptake(max(y[1], 0.0))
+        if response.edge is not None:
+            v = min(v, response.edge)
+        engine.solve(v)
+        return engine.reaction_flux_array()
+
+    t = 0.0
+    y = np.array([initial_biomass, initial_glucose] + [0.0] * len(tox_ids), dtype=float)
+    evaluation = rhs(y)
+    if evaluation is None or y[1] <= depletion_threshold:
+        yield _point(t, y[0], y[1], 0.0 if evaluation is None else evaluation[1],
+                     None if evaluation is None else evaluation[2], [], None)
+        return
+    f, mu, ex_values = evaluation
+    yield _point(t, y[0], y[1], mu, ex_values, [], fluxes_at(y))
+
+    h = min(max_step, 0.1, total_time)
+    while t < total_time - 1e-12:
+        h = min(h, total_time - t)
+        stages = [f]
+        trial = None
+        for row in _DP_A[1:]:
+            y_stage = y + h * sum(a * k for a, k in zip(row, stages))
+            trial = rhs(y_stage)
+            if trial is None:
+                break
+            stages.append(trial[0])
+
+        if trial is None:
+            # Stages are held at the feasibility edge, so this is solver trouble:
+            # end the run with a zero-growth point, as the Euler integrator does
+            yield _point(t, y[0], y[1], 0.0, None, [], None)
+            return
+
+        k = np.array(stages)
+        y_new = y + h * (_DP_B @ k)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err = float(np.sqrt(np.mean((h * (_DP_E @ k) / scale) ** 2)))
+
+        if err > 1.0 and h > min_step:
+            h = max(h * max(0.2, 0.9 * err ** -0.2), min_step)
+            continue
+
+        f_new, mu_new, ex_new = trial  # FSAL: last stage is f(y_new)
+        t_new = t + h
+        terminal = False
+
+        alerts = []
+        for i, rid in enumerate(tox_ids):
+            level = tox_thresholds[i] * TOXICITY_ALERT_FRACTION
+            if y[2 + i] <= level < y_new[2 + i]:
+                frac = _locate_crossing(y, y_new, f, f_new, h, 2 + i, level)
+                alerts.append({"time": t + frac * h, "byproduct": rid, "concentration": float(level)})
+
+        level = end_level()
+        if y_new[1] <= level < y[1]:
+            frac = _locate_crossing(y, y_new, f, f_new, h, 1, level)
+            t_new = t + frac * h
+            y_new = _hermite(y, y_new, f, f_new, h, frac)
+            y_new[1] = max(y_new[1], 0.0)
+            alerts = [alert for alert in alerts if alert["time"] <= t_new]
+            terminal = True
+
+        if terminal:
+            evaluation = rhs(y_new)
+            if evaluation is None:
+                yield _point(t_new, y_new[0], y_new[1], 0.0, None, alerts, None)
+                return
+            f_new, mu_new, ex_new = evaluation
+
+        t, y, f = t_new, y_new, f_new
+        yield _point(t, y[0], y[1], mu_new, ex_new, alerts, fluxes_at(y))
+        if terminal:
+            return
+
+        h = min(h * min(5.0, 0.9 * max(err, 1e-10) ** -0.2), max_step)
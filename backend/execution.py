@@ -0,0 +1,229 @@
+import os
+import asyncio
+import logging
+import weakref
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+LP_THREADS = int(os.getenv("EXECUTION_LP_THREADS", str(os.cpu_count() or 4)))
+IO_THREADS = int(os.getenv("EXECUTION_IO_THREADS", "16"))
+# Longest a stream may hold its slot (and the simulator it leased), slow clients included
+STREAM_MAX_SECONDS = float(os.getenv("EXECUTION_STREAM_MAX_SECONDS", "900"))
+
+
+class Saturated(Exception):
+    """An endpoint has no free slot and its wait queue is full (HTTP 429)."""
+
+    def __init__(self, endpoint: str):
+        super().__init__(f"Endpoint {endpoint} is saturated, retry later")
+        self.endpoint = endpoint
+
+
+class ExecutionTimeout(Exception):
+    """A call outlived its endpoint timeout (HTTP 504). The worker thread finishes on its own."""
+
+    def __init__(self, endpoint: str, timeout: float):
+        super().__init__(f"Endpoint {endpoint} timed out after {timeout:g}s")
+        self.endpoint = endpoint
+
+
+class EndpointLimit:
+    """
+    Concurrency budget of one endpoint: `concurrency` calls run at once, up to
+    `queue` more wait, everything beyond is rejected. `timeout` (seconds) covers
+    queueing plus execution; None means unbounded (streams, model loads).
+    """
+
+    def __init__(self, concurrency: int, queue: int, timeout: Optional[float] = None, executor: str = "lp"):
+        self.concurrency = max(1, concurrency)
+        self.queue = queue
+        self.timeout = timeout
+        self.executor = executor
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._semaphore.locked() and self.waiting >= self.queue:
+            raise asyncio.TimeoutError  # treated like a queue timeout: rejected
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    def metrics(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "timeout": self.timeout,
+            "executor": self.executor,
+            "active": self.active,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+def default_limits(lp: int = LP_THREADS, io: int = IO_THREADS) -> Dict[str, EndpointLimit]:
+    heavy = max(1, lp // 2)
+    return {
+        "default": EndpointLimit(lp, 32, 60),
+        "load-model": EndpointLimit(2, 8, None),
+        "simulate": EndpointLimit(lp, 64, 30),
+        "simulate-batch": EndpointLimit(heavy, 8, 300),
+        "simulate-fva": EndpointLimit(heavy, 4, 600),
+        "simulate-dynamic": EndpointLimit(lp, 16, 300),
+        "simulate-dynamic-stream": EndpointLimit(heavy, 8, None),
+        "simulate-dynamic-sweep": EndpointLimit(2, 8, 30, executor="io"),
+        "integrate-omics": EndpointLimit(lp, 16, 60),
+        "integrate-omics-batch": EndpointLimit(heavy, 4, 600),
+        "optimize-design": EndpointLimit(1, 4, 900),
+        "analyze-3d-space": EndpointLimit(lp, 16, 30),
+        "production-envelope": EndpointLimit(heavy, 8, 300),
+        "deletions": EndpointLimit(1, 2, 1800),
+        "search": EndpointLimit(io, 64, 10, executor="io"),
+        "chat": EndpointLimit(io, 32, 90, executor="io"),
+        "jobs": EndpointLimit(io, 64, 10, executor="io"),
+    }
+
+
+class ExecutionLayer:
+    """
+    Runs blocking handler work off the event loop.
+    Solver work and network/disk work use separate bounded thread pools, and
+    every call first takes a slot from its endpoint's limit, so a burst on one
+    slow endpoint is rejected with 429 instead of starving the others.
+    """
+
+    def __init__(self, lp_threads: int = LP_THREADS, io_threads: int = IO_THREADS,
+                 limits: Optional[Dict[str, EndpointLimit]] = None):
+        self.executors = {
+            "lp": ThreadPoolExecutor(max_workers=lp_threads, thread_name_prefix="lp"),
+            "io": ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="io"),
+        }
+        self.limits = limits or default_limits(lp_threads, io_threads)
+
+    def limit(self, endpoint: str) -> EndpointLimit:
+        return self.limits.get(endpoint) or self.limits["default"]
+
+    async def _acquire(self, endpoint: str, limit: EndpointLimit):
+        try:
+            await asyncio.wait_for(limit.acquire(), limit.timeout)
+        except asyncio.TimeoutError:
+            limit.rejected += 1
+            raise Saturated(endpoint)
+
+    async def run(self, endpoint: str, fn: Callable, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` on the endpoint's executor within its limits."""
+        limit = self.limit(endpoint)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await self._acquire(endpoint, limit)
+
+        future = loop.run_in_executor(self.executors[limit.executor], functools.partial(fn, *args, **kwargs))
+
+        def finished(f: asyncio.Future):
+            # The slot is held until the thread is done, even after a timeout
+            limit.release()
+            if not f.cancelled():
+                f.exception()  # mark as retrieved when nobody awaits it any more
+
+        future.add_done_callback(finished)
+        remaining = None if limit.timeout is None else max(0.0, limit.timeout - (loop.time() - start))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            limit.timeouts += 1
+            raise ExecutionTimeout(endpoint, limit.timeout)
+
+    async def stream(self, endpoint: str, iterator: Iterator, max_seconds: Optional[float] = STREAM_MAX_SECONDS):
+        """
+        Take a slot for a blocking iterator (e.g. a StreamingResponse body) and
+        return an async iterator that advances it on the endpoint's executor.
+        The slot is taken before the response starts, so saturation is still a 429.
+        After `max_seconds` the stream is cut off with ExecutionTimeout and the
+        iterator closed, however slowly the client reads.
+        If the async iterator is dropped without ever being started (the client
+        left before the body was sent), the slot is freed when it is collected.
+        """
+        limit = self.limit(endpoint)
+        await self._acquire(endpoint, limit)
+        state = {"started": False}
+        drain = self._drain(endpoint, limit, iterator, state, max_seconds)
+        weakref.finalize(drain, self._abandon, asyncio.get_running_loop(), limit, iterator, state)
+        return drain
+
+    def _abandon(self, loop: asyncio.AbstractEventLoop, limit: EndpointLimit, iterator: Iterator, state: Dict):
+        if state["started"]:
+            return  # _drain's finally owns the cleanup
+        closer = getattr(iterator, "close", None)
+        if closer is not None:
+            self.executors[limit.executor].submit(closer)
+        try:
+            loop.call_soon_threadsafe(limit.release)
+        except RuntimeError:
+            pass  # loop already closed: nothing left to limit
+
+    async def _drain(self, endpoint: str, limit: EndpointLimit, iterator: Iterator, state: Dict,
+                     max_seconds: Optional[float]):
+        state["started"] = True
+        loop = asyncio.get_running_loop()
+        executor = self.executors[limit.executor]
+        deadline = None if max_seconds is None else loop.time() + max_seconds
+        done = object()
+        step: Optional[Future] = None
+        try:
+            while True:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    limit.timeouts += 1
+                    raise ExecutionTimeout(endpoint, max_seconds)
+                step = executor.submit(next, iterator, done)
+                try:
+                    item = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(step)), remaining)
+                except asyncio.TimeoutError:
+                    limit.timeouts += 1
+                    raise ExecutionTimeout(endpoint, max_seconds)
+                if item is done:
+                    break
+                yield item
+        finally:
+            def close(*_):
+                # Runs the generator's cleanup (e.g. returning its simulator) off the loop
+                closer = getattr(iterator, "close", None)
+                if closer is None:
+                    loop.call_soon_threadsafe(limit.release)
+                    return
+                executor.submit(closer).add_done_callback(lambda _: loop.call_soon_threadsafe(limit.release))
+
+            if step is not None and not step.done():
+                # A step is still running in its thread; close once it returns
+                step.add_done_callback(close)
+            else:
+                close()
+
+    def metrics(self) -> Dict:
+        return {
+            "executors": {name: executor._max_workers for name, executor in self.executors.items()},
+            "endpoints": {name: limit.metrics() for name, limit in self.limits.items()},
+        }
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,85 @@
+import base64
+import hashlib
+import numpy as np
+from typing import Any, Dict, List
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for application/x-msgpack responses
+    msgpack = None
+
+FLUX_FORMATS = ("dict", "sparse", "float32")
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+
+class ReactionIndex:
+    """
+    Stable reaction ordering for a model.
+    Clients fetch it once per model and decode compact flux payloads against it;
+    `version` changes whenever the reaction list does.
+    """
+
+    def __init__(self, reaction_ids: List[str]):
+        self.reaction_ids = list(reaction_ids)
+        self.positions = {rid: i for i, rid in enumerate(self.reaction_ids)}
+        self.version = hashlib.sha1("\n".join(self.reaction_ids).encode("utf-8")).hexdigest()[:12]
+
+    def to_array(self, fluxes: Dict[str, float]) -> np.ndarray:
+        values = np.zeros(len(self.reaction_ids), dtype=float)
+        for rid, value in fluxes.items():
+            pos = self.positions.get(rid)
+            if pos is not None:
+                values[pos] = value
+        return values
+
+    def describe(self) -> Dict:
+        return {"version": self.version, "count": len(self.reaction_ids), "reaction_ids": self.reaction_ids}
+
+
+def encode_fluxes(fluxes: Dict[str, float],
+                  index: ReactionIndex,
+                  fmt: str = "dict",
+                  threshold: float = 0.0,
+                  binary: bool = False) -> Any:
+    """
+    Encode a flux dict for the wire.
+
+    dict    -- {reaction_id: flux}, dropping |flux| <= threshold when threshold > 0
+    sparse  -- parallel `indices` / `values` lists against the reaction index
+    float32 -- little-endian uint32 indices and float32 values, base64-encoded
+               (raw bytes when `binary` is set, e.g. for MessagePack responses)
+    """
+    if fmt not in FLUX_FORMATS:
+        raise ValueError(f"Unknown flux format: {fmt}")
+
+    if fmt == "dict":
+        if threshold <= 0:
+            return fluxes
+        return {rid: v for rid, v in fluxes.items() if abs(v) > threshold}
+
+    values = index.to_array(fluxes)
+    indices = np.flatnonzero(np.abs(values) > threshold) if threshold > 0 else np.flatnonzero(values)
+    payload = {"format": fmt, "index_version": index.version, "count": len(index.reaction_ids)}
+
+    if fmt == "sparse":
+        payload["indices"] = indices.tolist()
+        payload["values"] = values[indices].tolist()
+        return payload
+
+    index_bytes = indices.astype("<u4").tobytes()
+    value_bytes = values[indices].astype("<f4").tobytes()
+    if binary:
+        payload["indices"] = index_bytes
+        payload["values"] = value_bytes
+    else:
+        payload["indices"] = base64.b64encode(index_bytes).decode("ascii")
+        payload["values"] = base64.b64encode(value_bytes).decode("ascii")
+    return payload
+
+
+def wants_msgpack(accept_header: str) -> bool:
+    return msgpack is not None and MSGPACK_MEDIA_TYPE in (accept_header or "")
+
+
+def pack(payload: Any) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
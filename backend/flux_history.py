@@ -0,0 +1,174 @@
+import io
+import numpy as np
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for Parquet export
+    pa = None
+    pq = None
+
+HISTORY_FORMATS = ("records", "columnar", "npz", "parquet")
+EXPORT_MEDIA_TYPES = {
+    "npz": "application/octet-stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class FluxMatrix:
+    """
+    Preallocated (timesteps x columns) matrix that grows by doubling.
+    All rows share one column index, so a step costs one row copy.
+    """
+
+    def __init__(self, columns: List[str], capacity: int = 64, dtype=np.float64):
+        self.columns = list(columns)
+        self._data = np.zeros((max(1, capacity), len(self.columns)), dtype=dtype)
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, row: np.ndarray):
+        if self._rows == self._data.shape[0]:
+            grown = np.zeros((self._data.shape[0] * 2, self._data.shape[1]), dtype=self._data.dtype)
+            grown[:self._rows] = self._data[:self._rows]
+            self._data = grown
+        self._data[self._rows] = row
+        self._rows += 1
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._rows]
+
+
+class DynamicTrajectory:
+    """
+    Columnar record of a dFBA run: state series, exchange fluxes per step and,
+    optionally, the full reaction flux matrix.
+    """
+
+    STATE_COLUMNS = ["time", "biomass", "glucose", "growth_rate"]
+
+    def __init__(self, reaction_ids: List[str], exchange_ids: List[str],
+                 capacity: int = 64, track_fluxes: bool = False):
+        self.state = FluxMatrix(self.STATE_COLUMNS, capacity)
+        self.exchanges = FluxMatrix(exchange_ids, capacity)
+        self.fluxes = FluxMatrix(reaction_ids, capacity) if track_fluxes else None
+        self.alerts: List[Dict] = []
+        self.lp_solves = 0
+
+    def __len__(self) -> int:
+        return len(self.state)
+
+    def append(self, point: Dict):
+        self.state.append(np.array([point["time"], point["biomass"], point["glucose"], point["growth_rate"]]))
+        ex_values = point["exchange_fluxes"]
+        self.exchanges.append(ex_values if ex_values is not None else 0.0)
+        if self.fluxes is not None:
+            fluxes = point["fluxes"]
+            self.fluxes.append(fluxes if fluxes is not None else 0.0)
+        self.alerts.extend(point["alerts"])
+
+    def series(self, name: str) -> np.ndarray:
+        return self.state.values[:, self.STATE_COLUMNS.index(name)]
+
+    def endpoints(self, product_rxn_id: Optional[str] = None, depletion_threshold: float = 1e-3) -> Dict:
+        """
+        Fermentation endpoints of the run: final biomass, product titer
+        (trapezoidal integral of v_p * X), volumetric productivity and the time
+        at which the substrate dropped below `depletion_threshold`.
+        """
+        time = self.series("time")
+        biomass = self.series("biomass")
+        glucose = self.series("glucose")
+        summary = {
+            "final_time": float(time[-1]) if len(time) else 0.0,
+            "final_biomass": float(biomass[-1]) if len(biomass) else 0.0,
+            "max_growth_rate": float(np.nan_to_num(self.series("growth_rate")).max()) if len(time) else 0.0,
+            "time_to_depletion": None,
+            "final_titer": None,
+            "productivity": None,
+        }
+        depleted = np.flatnonzero(glucose <= depletion_threshold)
+        if len(depleted):
+            summary["time_to_depletion"] = float(time[depleted[0]])
+        if product_rxn_id is not None and product_rxn_id in self.exchanges.columns and len(time) > 1:
+            secretion = np.maximum(self.exchanges.values[:, self.exchanges.columns.index(product_rxn_id)], 0.0)
+            rate = secretion * biomass
+            titer = float(np.sum(0.5 * (rate[1:] + rate[:-1]) * np.diff(time)))
+            summary["final_titer"] = titer
+            summary["productivity"] = titer / summary["final_time"] if summary["final_time"] > 0 else 0.0
+        return summary
+
+    def byproduct_histories(self, threshold: float = 1e-4) -> Dict[str, List[float]]:
+        """
+        Secretion history of every exchange that exceeded `threshold` at some step,
+        zero elsewhere, ordered by first appearance.
+        """
+        values = self.exchanges.values
+        secreted = values > threshold
+        active = np.flatnonzero(secreted.any(axis=0))
+        if len(active) == 0:
+            return {}
+        first_seen = secreted[:, active].argmax(axis=0)
+        order = active[np.argsort(first_seen, kind='stable')]
+        rounded = np.round(np.where(secreted, values, 0.0), 4)
+        return {self.exchanges.columns[j]: rounded[:, j].tolist() for j in order}
+
+    def flux_records(self, threshold: float = 1e-3) -> List[Dict[str, float]]:
+        """Legacy per-step sparse dicts ({reaction_id: flux} with |flux| > threshold)."""
+        if self.fluxes is None:
+            return []
+        ids = self.fluxes.columns
+        records = []
+        for row in self.fluxes.values:
+            nonzero = np.flatnonzero(np.abs(row) > threshold)
+            records.append({ids[j]: float(row[j]) for j in nonzero})
+        return records
+
+    def flux_columnar(self, threshold: float = 1e-3) -> Dict:
+        """
+        Flux matrix restricted to reactions that ever exceed `threshold`,
+        as a shared reaction index plus one row per timestep.
+        Empty index and values when fluxes were not recorded.
+        """
+        if self.fluxes is None:
+            return {"reaction_ids": [], "values": []}
+        values = self.fluxes.values
+        keep = np.flatnonzero((np.abs(values) > threshold).any(axis=0))
+        return {
+            "reaction_ids": [self.fluxes.columns[j] for j in keep],
+            "values": np.round(values[:, keep], 6).tolist(),
+        }
+
+    def to_npz(self) -> bytes:
+        arrays = {name: self.series(name) for name in self.STATE_COLUMNS}
+        arrays["exchange_ids"] = np.array(self.exchanges.columns)
+        arrays["exchange_fluxes"] = self.exchanges.values
+        if self.fluxes is not None:
+            arrays["reaction_ids"] = np.array(self.fluxes.columns)
+            arrays["fluxes"] = self.fluxes.values
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    def to_parquet(self) -> bytes:
+        if pa is None:
+            raise RuntimeError("Parquet export requires pyarrow")
+        matrix = self.fluxes if self.fluxes is not None else self.exchanges
+        columns = {name: self.series(name) for name in self.STATE_COLUMNS}
+        values = matrix.values
+        for j, rid in enumerate(matrix.columns):
+            columns[rid] = values[:, j]
+        buffer = io.BytesIO()
+        pq.write_table(pa.table(columns), buffer, compression="zstd")
+        return buffer.getvalue()
+
+    def export(self, fmt: str) -> bytes:
+        if fmt == "npz":
+            return self.to_npz()
+        if fmt == "parquet":
+            return self.to_parquet()
+        raise ValueError(f"Unknown export format: {fmt}")
@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+import model_cache
+import worker_pool
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(model_cache.CACHE_DIR, "jobs.sqlite3"))
+
+# Statuses: queued -> running -> completed | failed; cancelling -> cancelled
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+REUSABLE_STATUSES = ("queued", "running", "completed")
+ENVIRONMENT_KEYS = ("carbon_source", "uptake_rate", "aerobic")
+# Seconds between progress writes (and cancellation checks) of a running job
+PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "0.5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_params_hash ON jobs (params_hash);
+"""
+
+_STATUS_COLUMNS = "id, kind, model_id, params, status, progress, created_at, started_at, finished_at, error"
+
+
+class JobCancelled(BaseException):
+    """
+    Raised from a job's progress callback once cancellation was requested.
+    A BaseException, so the simulator's `except Exception` error results
+    don't turn a cancellation into a failed job.
+    """
+
+
+def params_hash(kind: str, model_key: str, params: Dict) -> str:
+    """Identical jobs (kind, model file, canonical params) share one hash."""
+    encoded = json.dumps({"kind": kind, "model": model_key, "params": params},
+                         sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    SQLite job table shared by the API process and the worker processes.
+    Every call opens a short-lived connection, so it is safe from any thread
+    or process; WAL mode lets workers write progress while the API reads.
+    """
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _describe(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["job_id"] = job.pop("id")
+        return job
+
+    def create(self, kind: str, model_id: str, digest: str, params: Dict) -> str:
+        job_id = uuid.uuid4().hex[:16]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, model_id, params_hash, params, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, model_id, digest, json.dumps(params), time.time())
+            )
+        return job_id
+
+    def find_reusable(self, digest: str) -> Optional[str]:
+        placeholders = ",".join("?" * len(REUSABLE_STATUSES))
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE params_hash = ? AND status IN ({placeholders}) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (digest, *REUSABLE_STATUSES)
+            ).fetchone()
+        return row["id"] if row else None
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {_STATUS_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._describe(row) if row else None
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_STATUS_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._describe(row) for row in rows]
+
+    def result(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["result"]) if row and row["result"] is not None else None
+
+    def unfinished(self) -> List[Tuple[str, str, str, Dict, str]]:
+        placeholders = ",".join("?" * len(ACTIVE_STATUSES))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, kind, model_id, params, status FROM jobs WHERE status IN ({placeholders}) "
+                "ORDER BY created_at", ACTIVE_STATUSES
+            ).fetchall()
+        return [(r["id"], r["kind"], r["model_id"], json.loads(r["params"]), r["status"]) for r in rows]
+
+    def start(self, job_id: str) -> bool:
+        """Move a queued job to running; False when it was cancelled meanwhile."""
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, progress = 0 WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount
+        return updated == 1
+
+    def set_progress(self, job_id: str, progress: float) -> str:
+        """Record progress and return the current status (workers poll it for cancellation)."""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET progress = ? WHERE id = ? AND status = 'running'",
+                         (round(progress, 4), job_id))
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else "cancelled"
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        """Close an active job; a pending cancellation wins over the outcome."""
+        payload = json.dumps(result) if result is not None and status == "completed" else None
+        placeholders = ",".join("?" * len(ACTIVE_STATUSES))
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET status = CASE WHEN status = 'cancelling' THEN 'cancelled' ELSE ? END, "
+                "result = CASE WHEN status = 'cancelling' THEN NULL ELSE ? END, "
+                "progress = CASE WHEN ? = 'completed' AND status != 'cancelling' THEN 1 ELSE progress END, "
+                f"error = ?, finished_at = ? WHERE id = ? AND status IN ({placeholders})",
+                (status, payload, status, error, time.time(), job_id, *ACTIVE_STATUSES)
+            )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE status WHEN 'queued' THEN 'cancelled' ELSE 'cancelling' END, "
+                "finished_at = CASE status WHEN 'queued' THEN ? ELSE finished_at END "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    def requeue(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE status WHEN 'cancelling' THEN 'cancelled' ELSE 'queued' END, "
+                "progress = 0, started_at = NULL WHERE id = ?",
+                (job_id,)
+            )
+
+
+# --- Job kinds (run inside worker processes) ---
+
+def _fva_job(sim, params: Dict, progress: Callable[[float], None]) -> Dict:
+    results = {}
+    total = 0
+    for chunk in sim.iter_fva(params.get("reaction_ids"), params.get("fraction_of_optimum", 0.95),
+                              chunk_size=params.get("chunk_size", 250)):
+        results.update(chunk["fva_results"])
+        total = chunk["total"]
+        progress(chunk["completed"] / total if total else 1.0)
+    return {"success": True, "fva_results": results, "completed": len(results), "total": total, "truncated": False}
+
+
+def _envelope_job(sim, params: Dict, progress: Callable[[float], None]) -> Dict:
+    return sim.simulate_production_envelope(
+        params["target_rxn_id"], points=params.get("points", 20), control_rxn_ids=params.get("control_rxn_ids"),
+        progress=progress
+    )
+
+
+def _design_job(sim, params: Dict, progress: Callable[[float], None]) -> Dict:
+    import deletions
+    import preprocessing
+    from strain_designer import StrainDesigner, OPTKNOCK_MAX_CANDIDATES, SCREEN_MAX_COMBINATIONS
+
+    essential = deletions.essential_set(sim.model_path, preprocessing.medium_of(sim.scenario), "reaction")
+    designer = StrainDesigner(sim.model, preprocessing.get_preprocessing(sim),
+                              model_path=sim.model_path, scenario=sim.scenario, essential_reactions=essential)
+    common = dict(
+        target_rxn_id=params["target_rxn_id"],
+        biomass_rxn_id=sim.biomass_rxn_id,
+        max_knockouts=params.get("max_knockouts", 2),
+        fraction_of_optimum=params.get("min_growth", 0.1),
+    )
+    if params.get("method") == "optknock":
+        # A single MILP solve: no intermediate progress, bounded by time_limit instead
+        return designer.optknock(time_limit=params.get("time_limit", 600.0), mip_gap=params.get("mip_gap", 0.01),
+                                 max_candidates=params.get("max_candidates", OPTKNOCK_MAX_CANDIDATES), **common)
+    # Already inside a worker process: solve the combinations here
+    return designer.optimize_knockouts(max_combinations=params.get("max_combinations", SCREEN_MAX_COMBINATIONS),
+                                       top_k=params.get("top_k", 5), processes=1, progress=progress, **common)
+
+
+DYNAMIC_KEYS = ("initial_glucose", "initial_biomass", "total_time", "time_step", "include_flux_history",
+                "integrator", "rtol", "atol", "max_step", "history_format")
+
+
+def _dynamic_job(sim, params: Dict, progress: Callable[[float], None]) -> Dict:
+    return sim.simulate_dynamic(progress=progress, **{key: params[key] for key in DYNAMIC_KEYS if key in params})
+
+
+def cancellable_while_running(kind: str, params: Dict) -> bool:
+    """Whether a running job of this kind reports progress, i.e. can stop early."""
+    return not (kind == "optimize-design" and params.get("method") == "optknock")
+
+
+JOB_KINDS: Dict[str, Callable] = {
+    "fva": _fva_job,
+    "production-envelope": _envelope_job,
+    "optimize-design": _design_job,
+    "dynamic": _dynamic_job,
+}
+
+
+def run_job(db_path: str, job_id: str, kind: str, model_path: str, params: Dict):
+    """Worker-process entry point: run one job and store its outcome."""
+    store = JobStore(db_path)
+    if not store.start(job_id):
+        return
+
+    last_report = [0.0]
+
+    def progress(fraction: float):
+        now = time.time()
+        if now - last_report[0] < PROGRESS_INTERVAL:
+            return
+        last_report[0] = now
+        if store.set_progress(job_id, min(1.0, fraction)) != "running":
+            raise JobCancelled()
+
+    try:
+        sim = worker_pool.get_worker_simulator(model_path)
+        scenario = {key: params[key] for key in ENVIRONMENT_KEYS if key in params}
+        scenario.update(knockouts=params.get("knockouts", []), overexpressions=params.get("overexpressions", {}))
+        sim.apply_scenario(scenario)
+        result = JOB_KINDS[kind](sim, params, progress)
+    except JobCancelled:
+        store.finish(job_id, "cancelled")
+        return
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        store.finish(job_id, "failed", error=str(e))
+        return
+    if isinstance(result, dict) and result.get("success") is False:
+        store.finish(job_id, "failed", error=result.get("error"))
+    else:
+        store.finish(job_id, "completed", result=result)
+
+
+class JobManager:
+    """
+    Long analyses as jobs on the shared worker process pool.
+    Jobs and results live in SQLite, so they survive restarts; resubmitting an
+    identical job (same kind, model file and parameters) returns the existing one
+    unless it failed or was cancelled.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB):
+        self.store = JobStore(db_path)
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, model_id: str, model_path: str, params: Dict) -> Tuple[Dict, bool]:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        digest = params_hash(kind, model_cache.cache_key(model_path), params)
+        with self._lock:
+            existing = self.store.find_reusable(digest)
+            if existing is not None:
+                return self.store.get(existing), True
+            job_id = self.store.create(kind, model_id, digest, params)
+        self._dispatch(job_id, kind, model_path, params)
+        return self.store.get(job_id), False
+
+    def _dispatch(self, job_id: str, kind: str, model_path: str, params: Dict):
+        future = worker_pool.get_executor().submit(run_job, self.store.path, job_id, kind, model_path, params)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._settle(job_id, f))
+
+    def _settle(self, job_id: str, future: Future):
+        self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # The worker died before it could record the outcome (e.g. a broken pool)
+            self.store.finish(job_id, "failed", error=str(error))
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Cancel a job. Queued jobs never start; running jobs stop at their next
+        progress report. Raises ValueError for running jobs that report none.
+        """
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == "running" and not cancellable_while_running(job["kind"], job["params"]):
+            raise ValueError(f"Running {job['kind']} jobs with method {job['params'].get('method')} cannot be cancelled")
+        status = self.store.request_cancel(job_id)
+        if status is None:
+            return None
+        future = self._futures.get(job_id)
+        if future is not None and status == "cancelled":
+            future.cancel()
+        return self.store.get(job_id)
+
+    def recover(self, model_paths: Dict[str, str]) -> int:
+        """Requeue jobs that were queued or running when the server stopped."""
+        recovered = 0
+        for job_id, kind, model_id, params, status in self.store.unfinished():
+            self.store.requeue(job_id)
+            model_path = model_paths.get(model_id)
+            if status == "cancelling":
+                continue
+            if model_path is None:
+                self.store.finish(job_id, "failed", error=f"Model {model_id} not found")
+                continue
+            self._dispatch(job_id, kind, model_path, params)
+            recovered += 1
+        if recovered:
+            logger.info(f"Requeued {recovered} unfinished jobs")
+        return recovered
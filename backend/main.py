@@ -1,20 +1,129 @@
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import os
 import json
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager, contextmanager
 from openai import OpenAI
 from dotenv import load_dotenv
-from simulator import MetabolicSimulator
-from omics_integrator import OmicsIntegrator
+from simulator_pool import SimulatorPool, DEFAULT_POOL_SIZE, LEASE_TIMEOUT
+from result_cache import ResultCache, scenario_key
+import worker_pool
+from execution import ExecutionLayer, Saturated, ExecutionTimeout
+from flux_history import HISTORY_FORMATS, EXPORT_MEDIA_TYPES
+from dfba_engine import INTEGRATORS
+from sweeps import SweepManager, expand_grid
+from flux_encoding import FLUX_FORMATS, MSGPACK_MEDIA_TYPE, encode_fluxes, wants_msgpack, pack
+from omics_integrator import OmicsIntegrator, read_expression_csv, read_expression_npz
 from strain_designer import StrainDesigner
-from workspace_engine import WorkspaceEngine
+from workspace_engine import WorkspaceEngine, PROJECTION_FORMATS
+from jobs import JobManager, JOB_KINDS
+import preprocessing
+import deletions
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-app = FastAPI(title="MetaFlux-Sim API")
+# One pool of isolated simulators per model
+simulators: Dict[str, SimulatorPool] = {}
+model_status: Dict[str, str] = {}
+loading_tasks: Dict[str, asyncio.Task] = {}
+POOL_SIZE = DEFAULT_POOL_SIZE
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+MODEL_EXTENSIONS = (".json", ".xml", ".sbml")
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "1") != "0"
+
+sweep_manager = SweepManager()
+
+# Long analyses as persistent, deduplicated jobs on the worker process pool
+job_manager = JobManager()
+
+# Bounded LP/IO executors with per-endpoint concurrency limits
+execution = ExecutionLayer()
+
+# FBA/MOMA results keyed by canonical scenario hash
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_ENTRIES", "256")),
+    max_bytes=int(os.getenv("RESULT_CACHE_BYTES", "0")) or None
+)
+
+def discover_models() -> Dict[str, str]:
+    """Map model_id -> file path for every model file in MODELS_DIR."""
+    models = {}
+    for file_name in sorted(os.listdir(MODELS_DIR)):
+        model_id, ext = os.path.splitext(file_name)
+        if ext.lower() in MODEL_EXTENSIONS and model_id not in models:
+            models[model_id] = os.path.join(MODELS_DIR, file_name)
+    return models
+
+def build_pool(file_path: str) -> SimulatorPool:
+    pool = SimulatorPool(file_path, POOL_SIZE)
+    pool.warm_up()
+    return pool
+
+async def _load_pool(model_id: str, file_path: str) -> SimulatorPool:
+    model_status[model_id] = "loading"
+    try:
+        pool = await execution.run("load-model", build_pool, file_path)
+    except Exception as e:
+        model_status[model_id] = f"error: {e}"
+        raise
+    finally:
+        loading_tasks.pop(model_id, None)
+    simulators[model_id] = pool
+    model_status[model_id] = "ready"
+    return pool
+
+async def ensure_model(model_id: str) -> SimulatorPool:
+    """
+    Return the pool for `model_id`, joining an in-flight load instead of
+    starting a second one.
+    """
+    if model_id in simulators:
+        return simulators[model_id]
+    task = loading_tasks.get(model_id)
+    if task is None:
+        file_path = discover_models().get(model_id)
+        if file_path is None:
+            raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+        task = asyncio.create_task(_load_pool(model_id, file_path))
+        loading_tasks[model_id] = task
+    try:
+        return await asyncio.shield(task)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def preload_models():
+    model_ids = list(discover_models())
+    logger.info(f"Preloading models: {model_ids}")
+    await asyncio.gather(*(ensure_model(model_id) for model_id in model_ids), return_exceptions=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    preload = asyncio.create_task(preload_models()) if PRELOAD_MODELS else None
+    await execution.run("jobs", job_manager.recover, discover_models())
+    yield
+    if preload is not None and not preload.done():
+        preload.cancel()
+    worker_pool.shutdown()
+    execution.shutdown()
+
+app = FastAPI(title="MetaFlux-Sim API", lifespan=lifespan)
+
+@app.exception_handler(Saturated)
+async def saturated_handler(request: Request, exc: Saturated):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(ExecutionTimeout)
+async def timeout_handler(request: Request, exc: ExecutionTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
 
 # Enable CORS
 app.add_middleware(
@@ -24,24 +133,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global simulator instance
-simulators: Dict[str, MetabolicSimulator] = {}
-MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-
 class OmicsIntegrationRequest(BaseModel):
     model_id: str
     gene_expression: Dict[str, float]
     normalization_factor: float = 1.0
 
+class OmicsBatchRequest(BaseModel):
+    model_id: str
+    genes: List[str]
+    expression: List[List[float]]  # genes x samples
+    samples: Optional[List[str]] = None
+    normalization_factor: float = 1.0
+    key_reactions: Optional[List[str]] = None  # defaults to biomass and main exchanges
+    carbon_source: Optional[str] = None  # model default medium when omitted
+    uptake_rate: float = -10.0
+    aerobic: bool = True
+    processes: int = 1
+
+MAX_OMICS_SAMPLES = int(os.getenv("MAX_OMICS_SAMPLES", "1000"))
+
 class Analysis3DRequest(BaseModel):
     model_id: str
     fluxes: Dict[str, float]
+    projection_format: str = "records"  # "records" or "columnar"
 
 class DesignOptimizationRequest(BaseModel):
     model_id: str
     target_rxn_id: str
-    max_knockouts: int = 2
+    max_knockouts: int = 2  # up to 3
     min_growth: float = 0.1
+    max_candidates: int = 50  # optknock: reactions given a binary
+    max_combinations: int = 2000  # screening: double/triple sets solved
+    top_k: int = 5
+    processes: int = 1
+    method: str = "screening"  # "screening" or "optknock"
+    time_limit: float = 60.0  # optknock only
+    mip_gap: float = 0.01  # optknock only
+
+class DeletionRequest(BaseModel):
+    model_id: str
+    kind: str = "gene"  # "gene" or "reaction"
+    carbon_source: Optional[str] = None  # model default medium when omitted
+    uptake_rate: float = -10.0
+    aerobic: bool = True
+    ids: Optional[List[str]] = None  # subset scans are not cached
+    processes: int = 1
 
 class SimulationRequest(BaseModel):
     model_id: str
@@ -51,6 +187,24 @@ class SimulationRequest(BaseModel):
     knockouts: List[str] = []
     overexpressions: Dict[str, float] = {}
     method: str = "fba" # "fba" or "moma"
+    flux_format: str = "dict" # "dict", "sparse" or "float32"
+    flux_threshold: float = 0.0
+
+class BatchScenario(BaseModel):
+    carbon_source: str = "glc__D"
+    uptake_rate: float = -10.0
+    aerobic: bool = True
+    knockouts: List[str] = []
+    overexpressions: Dict[str, float] = {}
+    method: str = "fba"
+
+class SimulationBatchRequest(BaseModel):
+    model_id: str
+    scenarios: List[BatchScenario]
+    processes: int = 1
+    stream: bool = False
+    flux_format: str = "dict"
+    flux_threshold: float = 0.0
 
 class FVARequest(BaseModel):
     model_id: str
@@ -59,6 +213,11 @@ class FVARequest(BaseModel):
     aerobic: bool = True
     knockouts: List[str] = []
     fraction_of_optimum: float = 0.95
+    reaction_ids: Optional[List[str]] = None # all reactions when omitted
+    processes: int = 1
+    chunk_size: int = 250
+    time_budget: Optional[float] = 120.0 # seconds
+    stream: bool = False
 
 class DynamicSimulationRequest(BaseModel):
     model_id: str
@@ -68,6 +227,28 @@ class DynamicSimulationRequest(BaseModel):
     time_step: float = 0.5
     knockouts: List[str] = []
     include_flux_history: bool = False
+    integrator: str = "euler" # "euler" or "rk45"
+    rtol: float = 1e-3
+    atol: float = 1e-6
+    max_step: float = 2.0
+    history_format: str = "records" # "records", "columnar", "npz" or "parquet"
+
+class DynamicSweepRequest(BaseModel):
+    model_id: str
+    initial_glucose: List[float] = [20.0]
+    initial_biomass: List[float] = [0.01]
+    knockout_sets: List[List[str]] = [[]]
+    total_time: float = 24.0
+    time_step: float = 0.5
+    integrator: str = "euler"
+    product_rxn_id: Optional[str] = None
+
+MAX_SWEEP_POINTS = int(os.getenv("MAX_SWEEP_POINTS", "1000"))
+
+class JobRequest(BaseModel):
+    kind: str
+    model_id: str
+    params: Dict = {}
 
 class ProductionEnvelopeRequest(BaseModel):
     model_id: str
@@ -76,6 +257,9 @@ class ProductionEnvelopeRequest(BaseModel):
     uptake_rate: float = -10.0
     aerobic: bool = True
     knockouts: List[str] = []
+    control_rxn_ids: Optional[List[str]] = None  # defaults to the biomass reaction; two for a 2D envelope
+    points: int = 20
+    processes: int = 1
 
 class ChatRequest(BaseModel):
     message: str
@@ -84,141 +268,492 @@ class ChatRequest(BaseModel):
 
 @app.post("/load-model")
 async def load_model(model_id: str = Body(..., embed=True)):
-    file_name = f"{model_id}.json"
-    file_path = os.path.join(MODELS_DIR, file_name)
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
-    
+    await ensure_model(model_id)
+    return {"status": "success", "message": f"Model {model_id} loaded"}
+
+async def get_pool(model_id: str) -> SimulatorPool:
+    return await ensure_model(model_id)
+
+def encode_result(result: Dict, pool: SimulatorPool, flux_format: str, flux_threshold: float,
+                  binary: bool = False) -> Dict:
+    """
+    Re-encode the `fluxes` of a result without touching the (possibly cached) original.
+    """
+    if flux_format not in FLUX_FORMATS:
+        raise HTTPException(status_code=422, detail=f"flux_format must be one of {FLUX_FORMATS}")
+    if "fluxes" not in result or (flux_format == "dict" and flux_threshold <= 0):
+        return result
+    fluxes = encode_fluxes(result["fluxes"], pool.primary.flux_index, flux_format, flux_threshold, binary)
+    return {**result, "fluxes": fluxes}
+
+def respond(payload, request: Request):
+    if wants_msgpack(request.headers.get("accept")):
+        return Response(pack(payload), media_type=MSGPACK_MEDIA_TYPE)
+    return payload
+
+@contextmanager
+def lease_simulator(pool: SimulatorPool, endpoint: str, deadline: Optional[float] = None):
+    """
+    Lease a simulator from `pool`, waiting at most LEASE_TIMEOUT seconds and
+    never past `deadline` (time.monotonic()). Raises Saturated (429) when none
+    frees up in time, so an executor thread never blocks on a busy model.
+    """
+    timeout = LEASE_TIMEOUT if deadline is None else max(0.0, min(LEASE_TIMEOUT, deadline - time.monotonic()))
     try:
-        simulators[model_id] = MetabolicSimulator(file_path)
-        return {"status": "success", "message": f"Model {model_id} loaded"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        sim = pool.checkout(timeout)
+    except TimeoutError:
+        raise Saturated(endpoint)
+    try:
+        yield sim
+    finally:
+        pool.checkin(sim)
+
+async def run_with_simulator(model_id: str, fn, *args, endpoint: str = "default", **kwargs):
+    """
+    Check out a simulator for `model_id` and run `fn(sim, ...)` on the LP
+    executor within `endpoint`'s concurrency limit.
+    The wait for a simulator ends with the endpoint's timeout, so a request
+    that already got its 504 gives up its thread instead of running later.
+    The simulator is reset and returned to the pool afterwards.
+    """
+    pool = await get_pool(model_id)
+    timeout = execution.limit(endpoint).timeout
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def run():
+        with lease_simulator(pool, endpoint, deadline) as sim:
+            return fn(sim, *args, **kwargs)
+
+    return await execution.run(endpoint, run)
 
 @app.post("/simulate")
-async def simulate(req: SimulationRequest):
-    if req.model_id not in simulators:
-        await load_model(req.model_id)
-        
-    sim = simulators[req.model_id]
-    sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
-    sim.apply_modifications(req.knockouts, req.overexpressions)
-    
-    # Offload to threadpool
-    from starlette.concurrency import run_in_threadpool
-    if req.method.lower() == "moma":
-        result = await run_in_threadpool(sim.simulate_moma)
-    else:
-        result = await run_in_threadpool(sim.simulate)
-    return result
+async def simulate(req: SimulationRequest, request: Request):
+    pool = await get_pool(req.model_id)
+    binary = wants_msgpack(request.headers.get("accept"))
+    key = scenario_key(
+        req.model_id, req.carbon_source, req.uptake_rate, req.aerobic,
+        req.knockouts, req.overexpressions, req.method
+    )
+    cached = result_cache.get(key)
+    if cached is not None:
+        return respond(encode_result(cached, pool, req.flux_format, req.flux_threshold, binary), request)
+
+    def run(sim):
+        sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
+        sim.apply_modifications(req.knockouts, req.overexpressions)
+        if req.method.lower() == "moma":
+            return sim.simulate_moma()
+        return sim.simulate()
+
+    result = await run_with_simulator(req.model_id, run, endpoint="simulate")
+    if result.get("success"):
+        result_cache.put(key, result)
+    return respond(encode_result(result, pool, req.flux_format, req.flux_threshold, binary), request)
+
+@app.post("/simulate-batch")
+async def simulate_batch(req: SimulationBatchRequest, request: Request):
+    pool = await get_pool(req.model_id)
+    scenarios = [scenario.dict() for scenario in req.scenarios]
+    processes = max(1, min(req.processes, worker_pool.MAX_WORKER_PROCESSES))
+
+    if req.stream:
+        encode_result({}, pool, req.flux_format, req.flux_threshold)  # validate before streaming
+
+        def stream():
+            try:
+                with lease_simulator(pool, "simulate-batch") as sim:
+                    for result in sim.iter_simulate_many(scenarios, processes=processes):
+                        result = encode_result(result, pool, req.flux_format, req.flux_threshold)
+                        yield json.dumps(result) + "\n"
+            except Saturated as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+
+        return StreamingResponse(await execution.stream("simulate-batch", stream()), media_type="application/x-ndjson")
+
+    binary = wants_msgpack(request.headers.get("accept"))
+
+    def run(sim):
+        return [
+            encode_result(result, pool, req.flux_format, req.flux_threshold, binary)
+            for result in sim.iter_simulate_many(scenarios, processes=processes)
+        ]
+
+    results = await run_with_simulator(req.model_id, run, endpoint="simulate-batch")
+    return respond({"success": True, "count": len(results), "results": results}, request)
+
+@app.get("/models/{model_id}/reaction-index")
+async def reaction_index(model_id: str):
+    pool = await get_pool(model_id)
+    return {"model_id": model_id, **pool.primary.flux_index.describe()}
 
 @app.post("/simulate-fva")
 async def simulate_fva(req: FVARequest):
-    if req.model_id not in simulators:
-        await load_model(req.model_id)
-        
-    sim = simulators[req.model_id]
-    sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
-    sim.apply_modifications(req.knockouts, {})
-    
-    # Offload to threadpool
-    from starlette.concurrency import run_in_threadpool
-    result = await run_in_threadpool(sim.simulate_fva, fraction_of_optimum=req.fraction_of_optimum)
-    return result
+    processes = max(1, min(req.processes, worker_pool.MAX_WORKER_PROCESSES))
+    if req.chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be at least 1")
+
+    if req.stream:
+        pool = await get_pool(req.model_id)
+
+        def stream():
+            try:
+                with lease_simulator(pool, "simulate-fva") as sim:
+                    sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
+                    sim.apply_modifications(req.knockouts, {})
+                    for chunk in sim.iter_fva(req.reaction_ids, req.fraction_of_optimum, processes=processes,
+                                              chunk_size=req.chunk_size, time_budget=req.time_budget):
+                        yield json.dumps(chunk) + "\n"
+            except Exception as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+
+        return StreamingResponse(await execution.stream("simulate-fva", stream()), media_type="application/x-ndjson")
+
+    def run(sim):
+        sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
+        sim.apply_modifications(req.knockouts, {})
+        return sim.simulate_fva(
+            req.reaction_ids,
+            fraction_of_optimum=req.fraction_of_optimum,
+            processes=processes,
+            time_budget=req.time_budget,
+            chunk_size=req.chunk_size
+        )
+
+    return await run_with_simulator(req.model_id, run, endpoint="simulate-fva")
 
 @app.post("/simulate-dynamic")
 async def simulate_dynamic(req: DynamicSimulationRequest):
     print(f"Received dynamic simulation request for model: {req.model_id}, history={req.include_flux_history}")
-    if req.model_id not in simulators:
-        print(f"Loading model {req.model_id}...")
-        await load_model(req.model_id)
-        
-    sim = simulators[req.model_id]
-    # Apply modifications before dynamic run
-    sim.reset_model()
-    sim.apply_modifications(req.knockouts, {})
-    
-    print("Starting simulation in simulator.py...")
-    # Offload to threadpool
-    from starlette.concurrency import run_in_threadpool
-    result = await run_in_threadpool(
-        sim.simulate_dynamic,
+    if req.history_format not in HISTORY_FORMATS:
+        raise HTTPException(status_code=422, detail=f"history_format must be one of {HISTORY_FORMATS}")
+    if req.time_step <= 0:
+        raise HTTPException(status_code=400, detail="time_step must be positive")
+    params = dict(
         initial_glucose=req.initial_glucose,
         initial_biomass=req.initial_biomass,
         total_time=req.total_time,
         time_step=req.time_step,
-        include_flux_history=req.include_flux_history
+        include_flux_history=req.include_flux_history,
+        integrator=req.integrator,
+        rtol=req.rtol,
+        atol=req.atol,
+        max_step=req.max_step
     )
+
+    def run(sim):
+        # Apply modifications before dynamic run
+        sim.reset_model()
+        sim.apply_modifications(req.knockouts, {})
+        print("Starting simulation in simulator.py...")
+        if req.history_format in EXPORT_MEDIA_TYPES:
+            return sim.run_dynamic_trajectory(**params).export(req.history_format)
+        return sim.simulate_dynamic(history_format=req.history_format, **params)
+
+    try:
+        result = await run_with_simulator(req.model_id, run, endpoint="simulate-dynamic")
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     print("Simulation completed. Returning result.")
+    if req.history_format in EXPORT_MEDIA_TYPES:
+        return Response(
+            result,
+            media_type=EXPORT_MEDIA_TYPES[req.history_format],
+            headers={"Content-Disposition": f'attachment; filename="dfba_{req.model_id}.{req.history_format}"'}
+        )
     return result
 
+@app.post("/simulate-dynamic-stream")
+async def simulate_dynamic_stream(req: DynamicSimulationRequest):
+    """
+    Server-Sent Events variant of /simulate-dynamic: one `step` event per timestep
+    as soon as it is solved, then a `done` event. With include_flux_history the
+    steps carry a sparse `flux_delta` against the previous step.
+    """
+    if req.time_step <= 0:
+        raise HTTPException(status_code=400, detail="time_step must be positive")
+    pool = await get_pool(req.model_id)
+
+    def events():
+        try:
+            with lease_simulator(pool, "simulate-dynamic-stream") as sim:
+                sim.reset_model()
+                sim.apply_modifications(req.knockouts, {})
+                for event in sim.iter_dynamic(
+                    initial_glucose=req.initial_glucose,
+                    initial_biomass=req.initial_biomass,
+                    total_time=req.total_time,
+                    time_step=req.time_step,
+                    flux_mode="delta" if req.include_flux_history else None,
+                    integrator=req.integrator,
+                    rtol=req.rtol,
+                    atol=req.atol,
+                    max_step=req.max_step
+                ):
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        await execution.stream("simulate-dynamic-stream", events()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/simulate-dynamic-sweep")
+async def start_dynamic_sweep(req: DynamicSweepRequest):
+    """
+    Start a dFBA parameter sweep over initial_glucose x initial_biomass x knockout_sets.
+    Every trajectory runs in a worker process with its own preloaded model;
+    poll GET /simulate-dynamic-sweep/{sweep_id} for progress and the results table.
+    """
+    pool = await get_pool(req.model_id)
+    if req.integrator not in INTEGRATORS:
+        raise HTTPException(status_code=422, detail=f"integrator must be one of {INTEGRATORS}")
+    if req.time_step <= 0:
+        raise HTTPException(status_code=400, detail="time_step must be positive")
+    n_points = len(req.initial_glucose) * len(req.initial_biomass) * len(req.knockout_sets)
+    if n_points > MAX_SWEEP_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SWEEP_POINTS} sweep points per request")
+    points = expand_grid(req.initial_glucose, req.initial_biomass, req.knockout_sets)
+    if not points:
+        raise HTTPException(status_code=422, detail="Parameter grid is empty")
+    settings = {
+        "total_time": req.total_time,
+        "time_step": req.time_step,
+        "integrator": req.integrator,
+        "product_rxn_id": req.product_rxn_id,
+    }
+    sweep = await execution.run("simulate-dynamic-sweep", sweep_manager.start,
+                                req.model_id, pool.model_path, points, settings)
+    return sweep.describe(include_rows=False)
+
+@app.get("/simulate-dynamic-sweep/{sweep_id}")
+async def get_dynamic_sweep(sweep_id: str):
+    sweep = sweep_manager.get(sweep_id)
+    if sweep is None:
+        raise HTTPException(status_code=404, detail=f"Sweep {sweep_id} not found")
+    return sweep.describe()
+
+@app.delete("/simulate-dynamic-sweep/{sweep_id}")
+async def cancel_dynamic_sweep(sweep_id: str):
+    sweep = sweep_manager.cancel(sweep_id)
+    if sweep is None:
+        raise HTTPException(status_code=404, detail=f"Sweep {sweep_id} not found")
+    return sweep.describe()
+
+@app.post("/jobs")
+async def submit_job(req: JobRequest):
+    """
+    Queue a long analysis (fva, production-envelope, optimize-design, dynamic).
+    `params` takes the fields of the matching endpoint's request plus the
+    environment (carbon_source, uptake_rate, aerobic, knockouts). An identical
+    queued, running or completed job is returned instead of a new one.
+    """
+    if req.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {list(JOB_KINDS)}")
+    if req.kind in ("production-envelope", "optimize-design") and "target_rxn_id" not in req.params:
+        raise HTTPException(status_code=400, detail=f"{req.kind} jobs require params.target_rxn_id")
+    model_path = discover_models().get(req.model_id)
+    if model_path is None:
+        raise HTTPException(status_code=404, detail=f"Model {req.model_id} not found")
+    job, deduplicated = await execution.run("jobs", job_manager.submit, req.kind, req.model_id, model_path, req.params)
+    return {**job, "deduplicated": deduplicated}
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50):
+    return await execution.run("jobs", job_manager.store.list, max(1, min(limit, 500)))
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await execution.run("jobs", job_manager.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await execution.run("jobs", job_manager.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+    return await execution.run("jobs", job_manager.store.result, job_id)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    try:
+        job = await execution.run("jobs", job_manager.cancel, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
 @app.post("/integrate-omics")
 async def integrate_omics(req: OmicsIntegrationRequest):
-    if req.model_id not in simulators:
-        await load_model(req.model_id)
-        
-    sim = simulators[req.model_id]
-    
-    # Reset model to baseline before applying omics
-    sim.reset_model()
-    
-    integrator = OmicsIntegrator(sim.model)
-    updated_model = integrator.apply_omics_data(req.gene_expression, req.normalization_factor)
-    
-    # Run FBA with omics constraints to see impact
-    result = sim.simulate()
+    def run(sim):
+        # Reset model to baseline before applying omics
+        sim.reset_model()
+
+        integrator = OmicsIntegrator(sim.model)
+        integrator.apply_omics_data(req.gene_expression, req.normalization_factor)
+
+        # Run FBA with omics constraints to see impact
+        return sim.simulate()
+
+    result = await run_with_simulator(req.model_id, run, endpoint="integrate-omics")
     result["message"] = "오믹스 데이터가 대사 모델에 성공적으로 통합되었습니다."
     return result
 
+async def run_omics_batch(req: OmicsBatchRequest, genes: List[str], samples: Optional[List[str]], expression):
+    n_samples = len(expression[0]) if len(expression) else 0
+    if n_samples == 0:
+        raise HTTPException(status_code=400, detail="Expression matrix is empty")
+    if n_samples > MAX_OMICS_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_OMICS_SAMPLES} samples per batch")
+    processes = max(1, min(req.processes, worker_pool.MAX_WORKER_PROCESSES))
+
+    def run(sim):
+        if req.carbon_source is not None:
+            sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
+        return sim.simulate_omics_batch(
+            genes, expression, samples=samples, normalization_factor=req.normalization_factor,
+            key_reactions=req.key_reactions, processes=processes
+        )
+
+    return await run_with_simulator(req.model_id, run, endpoint="integrate-omics-batch")
+
+@app.post("/integrate-omics-batch")
+async def integrate_omics_batch(req: OmicsBatchRequest):
+    return await run_omics_batch(req, req.genes, req.samples, req.expression)
+
+@app.post("/integrate-omics-batch/upload")
+async def integrate_omics_batch_upload(request: Request, model_id: str, normalization_factor: float = 1.0,
+                                       carbon_source: Optional[str] = None, uptake_rate: float = -10.0,
+                                       aerobic: bool = True, processes: int = 1):
+    """
+    Expression matrix as the raw request body: text/csv (header of sample names,
+    first column gene ids) or an npz archive (genes, expression, optional samples).
+    """
+    body = await request.body()
+    try:
+        if "csv" in request.headers.get("content-type", ""):
+            genes, samples, matrix = read_expression_csv(body.decode("utf-8"))
+        else:
+            genes, samples, matrix = read_expression_npz(body)
+    except (ValueError, KeyError, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read expression matrix: {e}")
+    req = OmicsBatchRequest(
+        model_id=model_id, genes=[], expression=[], normalization_factor=normalization_factor,
+        carbon_source=carbon_source, uptake_rate=uptake_rate, aerobic=aerobic, processes=processes
+    )
+    return await run_omics_batch(req, genes, samples, matrix)
+
 @app.post("/optimize-design")
 async def optimize_design(req: DesignOptimizationRequest):
-    if req.model_id not in simulators:
-        await load_model(req.model_id)
-        
-    sim = simulators[req.model_id]
-    designer = StrainDesigner(sim.model)
-    
-    # Use model-specific biomass reaction
-    biomass_id = "BIOMASS_Ec_iML1515_core_75p37M" if "iML1515" in req.model_id else "r_2111"
-    
-    result = designer.optimize_knockouts(
-        target_rxn_id=req.target_rxn_id,
-        biomass_rxn_id=biomass_id,
-        max_knockouts=req.max_knockouts,
-        fraction_of_optimum=req.min_growth
-    )
-    return result
+    if req.method not in ("screening", "optknock"):
+        raise HTTPException(status_code=400, detail=f"Unknown design method: {req.method}")
+    if not 0 < req.time_limit <= 600:
+        raise HTTPException(status_code=400, detail="time_limit must be within (0, 600] seconds")
+
+    def run(sim):
+        essential = deletions.essential_set(sim.model_path, preprocessing.medium_of(sim.scenario), "reaction")
+        designer = StrainDesigner(sim.model, preprocessing.get_preprocessing(sim),
+                                  model_path=sim.model_path, scenario=sim.scenario,
+                                  essential_reactions=essential)
+        if req.method == "optknock":
+            return designer.optknock(
+                target_rxn_id=req.target_rxn_id,
+                biomass_rxn_id=sim.biomass_rxn_id,
+                max_knockouts=req.max_knockouts,
+                fraction_of_optimum=req.min_growth,
+                time_limit=req.time_limit,
+                mip_gap=req.mip_gap,
+                max_candidates=req.max_candidates
+            )
+        return designer.optimize_knockouts(
+            target_rxn_id=req.target_rxn_id,
+            biomass_rxn_id=sim.biomass_rxn_id,
+            max_knockouts=req.max_knockouts,
+            fraction_of_optimum=req.min_growth,
+            max_combinations=req.max_combinations,
+            top_k=req.top_k,
+            processes=max(1, min(req.processes, worker_pool.MAX_WORKER_PROCESSES))
+        )
+
+    return await run_with_simulator(req.model_id, run, endpoint="optimize-design")
 
 @app.post("/analyze-3d-space")
 async def analyze_3d_space(req: Analysis3DRequest):
-    if req.model_id not in simulators:
-        await load_model(req.model_id)
-        
-    sim = simulators[req.model_id]
-    engine = WorkspaceEngine(sim.model)
-    
-    projections = engine.get_3d_projection(req.fluxes)
+    if req.projection_format not in PROJECTION_FORMATS:
+        raise HTTPException(status_code=400, detail=f"projection_format must be one of {PROJECTION_FORMATS}")
+
+    def run(sim):
+        engine = WorkspaceEngine(sim.model)
+        return engine.get_3d_projection(req.fluxes, preprocessing.get_preprocessing(sim)["blocked_set"],
+                                        projection_format=req.projection_format)
+
+    projections = await run_with_simulator(req.model_id, run, endpoint="analyze-3d-space")
     return {"success": True, "projections": projections}
 
 @app.post("/production-envelope")
 async def get_production_envelope(req: ProductionEnvelopeRequest):
-    if req.model_id not in simulators:
-        await load_model(req.model_id)
-        
-    sim = simulators[req.model_id]
-    sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
-    sim.apply_modifications(req.knockouts, {})
-    
-    result = sim.simulate_production_envelope(target_rxn_id=req.target_rxn_id)
+    if not 2 <= req.points <= 200:
+        raise HTTPException(status_code=400, detail="points must be between 2 and 200")
+    key = scenario_key(
+        req.model_id, req.carbon_source, req.uptake_rate, req.aerobic, req.knockouts,
+        method="envelope", target=req.target_rxn_id, controls=req.control_rxn_ids, points=req.points
+    )
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    def run(sim):
+        sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
+        sim.apply_modifications(req.knockouts, {})
+        return sim.simulate_production_envelope(
+            target_rxn_id=req.target_rxn_id,
+            points=req.points,
+            control_rxn_ids=req.control_rxn_ids,
+            processes=max(1, min(req.processes, worker_pool.MAX_WORKER_PROCESSES))
+        )
+
+    result = await run_with_simulator(req.model_id, run, endpoint="production-envelope")
+    if result.get("success"):
+        result_cache.put(key, result)
     return result
 
+@app.post("/deletions")
+async def run_deletions(req: DeletionRequest):
+    if req.kind not in deletions.DELETION_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown deletion kind: {req.kind}")
+    processes = max(1, min(req.processes, worker_pool.MAX_WORKER_PROCESSES))
+
+    def run(sim):
+        if req.carbon_source is not None:
+            sim.apply_environment(req.carbon_source, req.uptake_rate, req.aerobic)
+        try:
+            if req.ids:
+                table = deletions.run_deletions(sim, req.kind, req.ids, processes=processes)
+            else:
+                table = deletions.get_deletions(sim, req.kind, processes=processes)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        return {"success": True, **{k: v for k, v in table.items() if k != "essential_set"}}
+
+    return await run_with_simulator(req.model_id, run, endpoint="deletions")
+
 @app.get("/search")
-async def search(model_id: str, query: str):
-    if model_id not in simulators:
-        await load_model(model_id)
-    
-    return simulators[model_id].search_genes_reactions(query)
+async def search(model_id: str, query: str, response: Response, offset: int = 0, limit: int = 20):
+    """Ranked gene/reaction matches; the total match count is in X-Total-Count."""
+    pool = await get_pool(model_id)
+    found = await execution.run("search", pool.search, query, offset, limit)
+    response.headers["X-Total-Count"] = str(found["total"])
+    return found["results"]
+
+@app.get("/pool-metrics")
+async def pool_metrics():
+    return {model_id: pool.metrics() for model_id, pool in simulators.items()}
 
 @app.post("/chat")
 async def chat(req: ChatRequest):
@@ -286,7 +821,10 @@ async def chat(req: ChatRequest):
 """
 
     try:
-        response = client.chat.completions.create(
+        # The OpenAI client is synchronous: run it on the IO executor
+        response = await execution.run(
+            "chat",
+            client.chat.completions.create,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -296,16 +834,27 @@ async def chat(req: ChatRequest):
             max_tokens=1000
         )
         return {"response": response.choices[0].message.content}
+    except (Saturated, ExecutionTimeout):
+        raise
     except Exception as e:
         print(f"LLM Error: {e}")
         return {"response": "죄송합니다. 현재 AI 엔진에 연결할 수 없습니다. 잠시 후 다시 시도해 주세요."}
-    except Exception as e:
-        print(f"LLM Error: {e}")
-        return {"response": "죄송합니다. 현재 AI 엔진에 연결할 수 없습니다. 잠시 후 다시 시도해 주세요."}
+
+@app.get("/execution-metrics")
+async def execution_metrics():
+    return execution.metrics()
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return result_cache.stats()
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    statuses = dict(model_status)
+    for model_id in discover_models():
+        statuses.setdefault(model_id, "not_loaded")
+    ready = all(status == "ready" for status in statuses.values())
+    return {"status": "ok", "ready": ready, "models": statuses}
 
 if __name__ == "__main__":
     import uvicorn
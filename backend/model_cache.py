@@ -0,0 +1,76 @@
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+import cobra
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv(
+    "MODEL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", ".cache")
+)
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(model_path: str) -> str:
+    """
+    Cache key for a model file: source name, content hash and cobra version
+    (pickles are not guaranteed to be portable across cobra releases).
+    """
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return f"{stem}-{file_hash(model_path)[:16]}-cobra{cobra.__version__}"
+
+
+def cache_path(model_path: str, suffix: str = ".pkl") -> str:
+    return os.path.join(CACHE_DIR, cache_key(model_path) + suffix)
+
+
+def parse_model(model_path: str) -> cobra.Model:
+    if model_path.endswith('.json'):
+        return cobra.io.load_json_model(model_path)
+    return cobra.io.read_sbml_model(model_path)
+
+
+def write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_model(model_path: str) -> cobra.Model:
+    """
+    Load a model through the on-disk pickle cache.
+    The source file is parsed only when no cache entry exists for its hash;
+    the parsed model is then written back so later loads just unpickle it.
+    """
+    path = cache_path(model_path)
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as fh:
+                return pickle.load(fh)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable model cache {path}: {e}")
+
+    model = parse_model(model_path)
+    try:
+        write_atomic(path, pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+        logger.info(f"Wrote model cache {path}")
+    except OSError as e:
+        logger.warning(f"Could not write model cache {path}: {e}")
+    return model
@@ -1,32 +1,270 @@
+import io
+import csv
+import math
 import cobra
-from typing import Dict, List, Optional
+import weakref
+from typing import Dict, List, Tuple
 import numpy as np
 
+# Expression assumed for genes that appear in a rule but not in the data
+UNKNOWN_GENE_EXPRESSION = 0.01
+
+_OR, _AND = "or", "and"
+
+
+def _tokenize(rule: str) -> List[str]:
+    return rule.replace('(', ' ( ').replace(')', ' ) ').split()
+
+
+def _parse(tokens: List[str]):
+    """
+    Recursive-descent GPR parser (AND binds tighter than OR).
+    Returns a gene id for leaves or (op, [children]) with same-op chains flattened.
+    """
+    pos = 0
+
+    def expression(op: str, operand):
+        nonlocal pos
+        children = [operand()]
+        while pos < len(tokens) and tokens[pos].lower() == op:
+            pos += 1
+            children.append(operand())
+        flat = []
+        for child in children:
+            flat.extend(child[1] if isinstance(child, tuple) and child[0] == op else [child])
+        return flat[0] if len(flat) == 1 else (op, flat)
+
+    def factor():
+        nonlocal pos
+        if pos >= len(tokens):
+            raise ValueError("Unexpected end of GPR rule")
+        token = tokens[pos]
+        pos += 1
+        if token == '(':
+            node = expression(_OR, term)
+            if pos >= len(tokens) or tokens[pos] != ')':
+                raise ValueError("Unbalanced parentheses in GPR rule")
+            pos += 1
+            return node
+        if token == ')' or token.lower() in (_OR, _AND):
+            raise ValueError(f"Unexpected token {token!r} in GPR rule")
+        return token
+
+    def term():
+        return expression(_AND, factor)
+
+    tree = expression(_OR, term)
+    if pos != len(tokens):
+        raise ValueError("Trailing tokens in GPR rule")
+    return tree
+
+
+class CompiledGPR:
+    """
+    GPR rules of a model compiled into a flat, level-ordered node program.
+
+    Rows 0..n_genes-1 of the node value matrix are gene expression values;
+    every operator node gets a row after them, ordered by height, so one level
+    is evaluated with a single reduceat per operator (OR -> sum, AND -> min,
+    zero if any subunit is missing). Works on one expression vector or on a
+    genes x samples matrix.
+    """
+
+    def __init__(self, model: cobra.Model):
+        self.genes: List[str] = []
+        self.gene_positions: Dict[str, int] = {}
+        self.reactions: List[cobra.Reaction] = []
+        trees = []
+        for rxn in model.reactions:
+            if not rxn.gene_reaction_rule:
+                continue
+            try:
+                tree = _parse(_tokenize(rxn.gene_reaction_rule))
+            except ValueError:
+                continue  # malformed rules are skipped, as before
+            self.reactions.append(rxn)
+            trees.append(tree)
+        self.reaction_ids = [rxn.id for rxn in self.reactions]
+
+        # Assign gene rows first, then collect operator nodes with their heights
+        operators: List[Tuple[int, str, list]] = []
+        for tree in trees:
+            self._collect_genes(tree)
+        n_genes = len(self.genes)
+
+        def visit(node) -> Tuple[int, int]:
+            if not isinstance(node, tuple):
+                return self.gene_positions[node], 0
+            op, children = node
+            visited = [visit(child) for child in children]
+            height = 1 + max(h for _, h in visited)
+            operators.append((height, op, [index for index, _ in visited]))
+            return -len(operators), height  # provisional id, remapped below
+
+        provisional_roots = [visit(tree)[0] for tree in trees]
+
+        # Order operator nodes by height and remap provisional ids to rows
+        order = sorted(range(len(operators)), key=lambda i: operators[i][0])
+        row_of = {-(i + 1): n_genes + rank for rank, i in enumerate(order)}
+
+        def row(index: int) -> int:
+            return row_of[index] if index < 0 else index
+
+        self.n_nodes = n_genes + len(operators)
+        self.roots = np.array([row(index) for index in provisional_roots], dtype=np.intp)
+        self.levels = []
+        for height in sorted({h for h, _, _ in operators}):
+            for op in (_OR, _AND):
+                nodes, children, offsets = [], [], []
+                for i in order:
+                    h, node_op, child_ids = operators[i]
+                    if h != height or node_op != op:
+                        continue
+                    nodes.append(row_of[-(i + 1)])
+                    offsets.append(len(children))
+                    children.extend(row(c) for c in child_ids)
+                if nodes:
+                    self.levels.append((op, np.array(nodes, dtype=np.intp),
+                                        np.array(children, dtype=np.intp), np.array(offsets, dtype=np.intp)))
+
+    def _collect_genes(self, node):
+        if isinstance(node, tuple):
+            for child in node[1]:
+                self._collect_genes(child)
+        elif node not in self.gene_positions:
+            self.gene_positions[node] = len(self.genes)
+            self.genes.append(node)
+
+    def expression_vector(self, gene_expression: Dict[str, float],
+                          default: float = UNKNOWN_GENE_EXPRESSION) -> np.ndarray:
+        return np.array([gene_expression.get(gene, default) for gene in self.genes], dtype=float)
+
+    def evaluate(self, gene_values: np.ndarray) -> np.ndarray:
+        """
+        Reaction expression for gene values ordered as `self.genes`:
+        shape (n_genes,) -> (n_reactions,), (n_genes, n_samples) -> (n_reactions, n_samples).
+        """
+        gene_values = np.asarray(gene_values, dtype=float)
+        values = np.empty((self.n_nodes,) + gene_values.shape[1:], dtype=float)
+        values[:len(self.genes)] = gene_values
+        for op, nodes, children, offsets in self.levels:
+            if op == _OR:
+                values[nodes] = np.add.reduceat(values[children], offsets, axis=0)
+            else:
+                values[nodes] = np.maximum(np.minimum.reduceat(values[children], offsets, axis=0), 0.0)
+        return values[self.roots]
+
+
+def read_expression_csv(text: str) -> Tuple[List[str], List[str], np.ndarray]:
+    """Genes x samples CSV: header row of sample names, first column gene ids."""
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if len(rows) < 2 or len(rows[0]) < 2:
+        raise ValueError("Expression CSV needs a header row and at least one gene row")
+    samples = [name.strip() for name in rows[0][1:]]
+    genes = [row[0].strip() for row in rows[1:]]
+    matrix = np.array([[float(v) if v.strip() else 0.0 for v in row[1:]] for row in rows[1:]], dtype=float)
+    if matrix.shape != (len(genes), len(samples)):
+        raise ValueError("Every gene row must have one value per sample")
+    return genes, samples, matrix
+
+
+def read_expression_npz(data: bytes) -> Tuple[List[str], List[str], np.ndarray]:
+    """npz archive with `genes`, `expression` (genes x samples) and optional `samples` arrays."""
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        genes = [str(g) for g in archive["genes"]]
+        matrix = np.asarray(archive["expression"], dtype=float)
+        if matrix.ndim != 2 or matrix.shape[0] != len(genes):
+            raise ValueError("expression must be a genes x samples matrix")
+        if "samples" in archive.files:
+            samples = [str(name) for name in archive["samples"]]
+        else:
+            samples = [f"sample_{j}" for j in range(matrix.shape[1])]
+    if len(samples) != matrix.shape[1]:
+        raise ValueError("samples must name every matrix column")
+    return genes, samples, matrix
+
+
+# One compiled program per loaded model object (pool clones compile once each)
+_compiled: "weakref.WeakKeyDictionary[cobra.Model, CompiledGPR]" = weakref.WeakKeyDictionary()
+
+
+def compiled_gpr(model: cobra.Model) -> CompiledGPR:
+    program = _compiled.get(model)
+    if program is None:
+        program = CompiledGPR(model)
+        _compiled[model] = program
+    return program
+
+
 class OmicsIntegrator:
     def __init__(self, model: cobra.Model):
         self.model = model
+        self.gpr = compiled_gpr(model)
+
+    def omics_bounds(self, reaction_expression: np.ndarray, normalization_factor: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Bounds of `self.gpr.reactions` for reaction expression values
+        (vector or reactions x samples matrix): V_max = k * expression, applied to
+        the open directions of reactions whose expression is positive.
+        """
+        lower = np.array([rxn.lower_bound for rxn in self.gpr.reactions], dtype=float)
+        upper = np.array([rxn.upper_bound for rxn in self.gpr.reactions], dtype=float)
+        if reaction_expression.ndim == 2:
+            lower, upper = lower[:, None], upper[:, None]
+        bound = reaction_expression * normalization_factor
+        expressed = reaction_expression > 0
+        new_upper = np.where(expressed & (upper > 0), np.minimum(upper, bound), upper)
+        new_lower = np.where(expressed & (lower < 0), np.maximum(lower, -bound), lower)
+        return new_lower, new_upper
+
+    def apply_bounds(self, lower: np.ndarray, upper: np.ndarray):
+        """Write bounds for `self.gpr.reactions`, touching only those that change."""
+        for rxn, lb, ub in zip(self.gpr.reactions, lower.tolist(), upper.tolist()):
+            if rxn.lower_bound != lb or rxn.upper_bound != ub:
+                rxn.bounds = (lb, ub)
+
+    def expression_matrix(self, genes: List[str], matrix: np.ndarray) -> np.ndarray:
+        """
+        Rows of a genes x samples matrix reordered onto `self.gpr.genes`;
+        genes without data get UNKNOWN_GENE_EXPRESSION.
+        """
+        matrix = np.asarray(matrix, dtype=float)
+        values = np.full((len(self.gpr.genes), matrix.shape[1]), UNKNOWN_GENE_EXPRESSION)
+        pairs = [(self.gpr.gene_positions[g], i) for i, g in enumerate(genes) if g in self.gpr.gene_positions]
+        if pairs:
+            rows, sources = (list(idx) for idx in zip(*pairs))
+            values[rows] = matrix[sources]
+        return values
+
+    def solve_samples(self, lower: np.ndarray, upper: np.ndarray, key_reactions: List[str]) -> List[Dict]:
+        """
+        One constrained FBA per column of the (reactions x samples) bound matrices,
+        on this model's loaded LP: only bounds that differ from the previous
+        sample are rewritten, and only growth and `key_reactions` are read back.
+        """
+        keys = [self.model.reactions.get_by_id(rid) for rid in key_reactions]
+        results = []
+        for j in range(lower.shape[1]):
+            self.apply_bounds(lower[:, j], upper[:, j])
+            growth = self.model.slim_optimize()
+            status = self.model.solver.status
+            if math.isnan(growth):
+                results.append({"growth_rate": 0.0, "status": status, "fluxes": [None] * len(keys)})
+                continue
+            results.append({
+                "growth_rate": round(growth, 6),
+                "status": status,
+                "fluxes": [round(rxn.flux, 6) for rxn in keys],
+            })
+        return results
 
     def apply_omics_data(self, gene_expression: Dict[str, float], normalization_factor: float = 1.0):
         """
         Apply gene expression data to model reaction bounds.
         Simple approach: V_max = k * expression
         """
-        # Map gene expression to reactions using GPR rules
-        reaction_expression = self._map_gene_to_reaction(gene_expression)
-        
-        # Apply bounds to model
-        for rxn_id, expression in reaction_expression.items():
-            if rxn_id in self.model.reactions:
-                rxn = self.model.reactions.get_by_id(rxn_id)
-                # Normalize expression to a reasonable flux bound (e.g., max 1000)
-                bound = expression * normalization_factor
-                
-                # Apply as upper/lower bound based on directionality
-                if rxn.upper_bound > 0:
-                    rxn.upper_bound = min(rxn.upper_bound, bound)
-                if rxn.lower_bound < 0:
-                    rxn.lower_bound = max(rxn.lower_bound, -bound)
-        
+        reaction_expression = self.gpr.evaluate(self.gpr.expression_vector(gene_expression))
+        self.apply_bounds(*self.omics_bounds(reaction_expression, normalization_factor))
         return self.model
 
     def _map_gene_to_reaction(self, gene_expression: Dict[str, float]) -> Dict[str, float]:
@@ -35,6 +273,14 @@ class OmicsIntegrator:
         AND rules -> min(expressions)
         OR rules -> sum(expressions)
         """
+        values = self.gpr.evaluate(self.gpr.expression_vector(gene_expression))
+        return {rid: float(v) for rid, v in zip(self.gpr.reaction_ids, values) if v > 0}
+
+    def _map_gene_to_reaction_reference(self, gene_expression: Dict[str, float]) -> Dict[str, float]:
+        """
+        Uncompiled mapping, one string evaluation per rule.
+        Kept as the reference for tests and benchmark_omics.py.
+        """
         reaction_expression = {}
         
         for rxn in self.model.reactions:
@@ -0,0 +1,118 @@
+import os
+import json
+import copy
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Set
+import model_cache
+
+logger = logging.getLogger(__name__)
+
+MEDIUM_KEYS = ("carbon_source", "uptake_rate", "aerobic")
+
+_memory_cache: Dict[str, Dict] = {}
+_lock = threading.Lock()
+
+
+def medium_of(scenario: Dict) -> Dict:
+    """The medium part of a scenario; empty when the model default medium is used."""
+    return {key: scenario[key] for key in MEDIUM_KEYS if key in scenario}
+
+
+def medium_hash(medium: Dict) -> str:
+    encoded = json.dumps(medium, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:12]
+
+
+def _disk_path(model_path: str, medium: Dict) -> str:
+    return model_cache.cache_path(model_path, suffix=f"-prep-{medium_hash(medium)}.json")
+
+
+def find_blocked(sim) -> List[str]:
+    """
+    Reactions that cannot carry flux in the current medium.
+    Reactions active in one FBA solution are skipped; the rest get a
+    fraction-0 FVA on the loaded LP.
+    """
+    solution = sim.model.optimize()
+    if solution.status != "optimal":
+        return []
+    fluxes = solution.fluxes
+    candidates = [rid for rid, value in zip(sim.reaction_ids, fluxes.values) if abs(value) < 1e-9]
+    return [
+        rid for rid, lo, hi in sim._fva_ranges(candidates, fraction_of_optimum=0.0)
+        if lo is not None and hi is not None and abs(lo) < 1e-9 and abs(hi) < 1e-9
+    ]
+
+
+def find_coupled_sets(model, blocked: Set[str]) -> List[List[str]]:
+    """
+    Fully coupled reaction sets from linear pathway segments.
+    A metabolite used by exactly two unblocked reactions fixes the ratio of their
+    fluxes at steady state (s1*v1 + s2*v2 = 0), so both always carry flux together.
+    """
+    parent: Dict[str, str] = {}
+
+    def find(rid: str) -> str:
+        while parent.setdefault(rid, rid) != rid:
+            parent[rid] = parent[parent[rid]]
+            rid = parent[rid]
+        return rid
+
+    for met in model.metabolites:
+        active = [r.id for r in met.reactions if r.id not in blocked]
+        if len(active) == 2:
+            parent[find(active[0])] = find(active[1])
+
+    groups: Dict[str, List[str]] = {}
+    for rid in parent:
+        groups.setdefault(find(rid), []).append(rid)
+    return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=len, reverse=True)
+
+
+def compute(sim, medium: Dict) -> Dict:
+    """Blocked reactions and coupled sets of the simulator's model in `medium`."""
+    saved = copy.deepcopy(sim.scenario)
+    try:
+        sim.apply_scenario(dict(medium))
+        blocked = find_blocked(sim)
+        coupled = find_coupled_sets(sim.model, set(blocked))
+    finally:
+        sim.apply_scenario(saved)
+    return {"medium": medium, "blocked": blocked, "coupled_sets": coupled}
+
+
+def get_preprocessing(sim, medium: Dict = None) -> Dict:
+    """
+    Cached preprocessing for `medium` (default: the simulator's current medium).
+    Results live in memory and as JSON next to the model cache, so they are
+    computed once per model and medium across restarts and worker processes.
+    """
+    if medium is None:
+        medium = medium_of(sim.scenario)
+    key = f"{sim.model_path}:{medium_hash(medium)}"
+    with _lock:
+        cached = _memory_cache.get(key)
+    if cached is not None:
+        return cached
+
+    path = _disk_path(sim.model_path, medium)
+    if os.path.exists(path):
+        try:
+            with open(path) as fh:
+                cached = json.load(fh)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable preprocessing cache {path}: {e}")
+
+    if cached is None:
+        cached = compute(sim, medium)
+        try:
+            model_cache.write_atomic(path, json.dumps(cached).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"Could not write preprocessing cache {path}: {e}")
+
+    cached["blocked_set"] = set(cached["blocked"])
+    with _lock:
+        _memory_cache[key] = cached
+    return cached
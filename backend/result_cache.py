@@ -0,0 +1,98 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+def _normalize_float(value: float) -> float:
+    # Round away float noise so -10 and -10.0000000001 hit the same entry
+    return round(float(value), 9) + 0.0
+
+
+def scenario_key(model_id: str,
+                 carbon_source: str,
+                 uptake_rate: float,
+                 aerobic: bool,
+                 knockouts: Iterable[str] = (),
+                 overexpressions: Optional[Dict[str, float]] = None,
+                 method: str = "fba",
+                 **extra) -> str:
+    """
+    Canonical hash of a simulation scenario.
+    Knockouts are de-duplicated and sorted, overexpressions sorted by reaction id,
+    so equivalent requests always map to the same key.
+    """
+    payload = {
+        "model_id": model_id,
+        "carbon_source": carbon_source,
+        "uptake_rate": _normalize_float(uptake_rate),
+        "aerobic": bool(aerobic),
+        "knockouts": sorted(set(knockouts)),
+        "overexpressions": sorted((k, _normalize_float(v)) for k, v in (overexpressions or {}).items()),
+        "method": method.lower(),
+    }
+    if extra:
+        payload["extra"] = extra
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache for simulation results.
+    Bounded by entry count and, optionally, by the JSON-encoded size of the results.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any):
+        size = len(json.dumps(value, default=str)) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes if self.max_bytes else None,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
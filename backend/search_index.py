@@ -0,0 +1,141 @@
+import os
+import re
+import pickle
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+MAX_PAGE_SIZE = 200
+
+_WORD = re.compile(r"[^a-z0-9]+")
+
+_indexes: Dict[str, "SearchIndex"] = {}
+_lock = threading.Lock()
+
+
+def _ngrams(text: str, n: int = 3):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in _WORD.split(text) if word]
+
+
+class SearchIndex:
+    """
+    Ranked search over gene and reaction ids, names, subsystems and the names
+    of a reaction's metabolites.
+    Queries of three or more characters intersect trigram posting sets and then
+    verify the substring; one- and two-character queries use unigram and bigram
+    posting sets, so every length matches substrings. Only candidates are
+    scored, never the full model.
+    """
+
+    def __init__(self, documents: List[Tuple[str, str, str, str, str]]):
+        # documents: (type, id, name, subsystem, metabolite names)
+        self.documents = [(kind, doc_id, name) for kind, doc_id, name, _, _ in documents]
+        # Lowercased id, name, subsystem, metabolite names per document
+        self.fields = [
+            tuple(text.lower() for text in (doc_id, name, subsystem, metabolites))
+            for _, doc_id, name, subsystem, metabolites in documents
+        ]
+
+        # 1-, 2- and 3-grams; longer queries intersect their trigrams
+        postings: Dict[str, set] = {}
+        for position, fields in enumerate(self.fields):
+            for text in fields:
+                for n in (1, 2, 3):
+                    for gram in _ngrams(text, n):
+                        postings.setdefault(gram, set()).add(position)
+        self.postings = {gram: frozenset(docs) for gram, docs in postings.items()}
+
+    @classmethod
+    def from_model(cls, model) -> "SearchIndex":
+        documents = [("gene", g.id, g.name or "", "", "") for g in model.genes]
+        documents += [
+            ("reaction", r.id, r.name or "", r.subsystem or "",
+             " ".join(sorted({m.name or m.id for m in r.metabolites})))
+            for r in model.reactions
+        ]
+        return cls(documents)
+
+    def _candidates(self, query: str) -> set:
+        if len(query) < 3:
+            return set(self.postings.get(query, ()))
+        grams = sorted((self.postings.get(gram, frozenset()) for gram in _ngrams(query)), key=len)
+        return set(grams[0]).intersection(*grams[1:])
+
+    @staticmethod
+    def _score(fields: Tuple[str, str, str, str], query: str) -> int:
+        doc_id, name, subsystem, metabolites = fields
+        if doc_id == query:
+            return 100
+        if doc_id.startswith(query):
+            return 90
+        if name == query:
+            return 85
+        if name.startswith(query):
+            return 75
+        if any(word.startswith(query) for word in _words(name)):
+            return 65
+        if query in doc_id:
+            return 50
+        if query in name:
+            return 40
+        if query in subsystem:
+            return 25
+        if query in metabolites:
+            return 15
+        return 0
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict]]:
+        """Return (total matches, one page of results ranked by score)."""
+        query = query.strip().lower()
+        if not query:
+            return 0, []
+        scored = []
+        for position in self._candidates(query):
+            score = self._score(self.fields[position], query)
+            if score:
+                scored.append((-score, len(self.documents[position][1]), self.documents[position][1], position))
+        scored.sort()
+        offset, limit = max(0, offset), max(0, min(limit, MAX_PAGE_SIZE))
+        page = []
+        for neg_score, _, _, position in scored[offset:offset + limit]:
+            kind, doc_id, name = self.documents[position]
+            page.append({"id": doc_id, "name": name, "type": kind, "score": -neg_score})
+        return len(scored), page
+
+
+def get_index(sim) -> SearchIndex:
+    """
+    Search index of the simulator's model, shared by every simulator of that
+    model file. Kept in memory and pickled next to the model cache.
+    """
+    with _lock:
+        index = _indexes.get(sim.model_path)
+    if index is not None:
+        return index
+
+    import model_cache
+    path = model_cache.cache_path(sim.model_path, suffix=f"-search-v{INDEX_VERSION}.pkl")
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as fh:
+                index = pickle.load(fh)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable search index {path}: {e}")
+
+    if index is None:
+        index = SearchIndex.from_model(sim.model)
+        try:
+            model_cache.write_atomic(path, pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            logger.warning(f"Could not write search index {path}: {e}")
+
+    with _lock:
+        _indexes[sim.model_path] = index
+    return index
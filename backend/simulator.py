@@ -1,11 +1,23 @@
 import cobra
+from optlang.symbolics import Zero
 import pandas as pd
 import numpy as np
 import math
+import copy
+import time
 import logging
 import os
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 from byproduct_analyst import ByproductAnalyst
+from omics_integrator import OmicsIntegrator
+from flux_encoding import ReactionIndex
+from dfba_engine import DFBAEngine, INTEGRATORS, euler_points, adaptive_points
+from flux_history import DynamicTrajectory
+import model_cache
+import preprocessing
+import deletions
+import search_index
+import worker_pool
 
 
 # Configure logging
@@ -20,22 +32,135 @@ def sanitize_float(val: float) -> float:
     return float(val)
 
 class MetabolicSimulator:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, reset_mode: str = "snapshot"):
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found: {model_path}")
-        if model_path.endswith('.json'):
-            self.model = cobra.io.load_json_model(model_path)
-        else:
-            self.model = cobra.io.read_sbml_model(model_path)
-        self.original_model = self.model.copy()
+        if reset_mode not in ("snapshot", "copy"):
+            raise ValueError(f"Unknown reset mode: {reset_mode}")
+        self.model_path = model_path
+        self.model = model_cache.load_model(model_path)
+        self.reset_mode = reset_mode
+        # Legacy mode keeps a pristine deep copy around; snapshot mode only
+        # stores the mutable state (bounds + objective) as flat arrays.
+        self.original_model = self.model.copy() if reset_mode == "copy" else None
+        self._take_snapshot()
+        self._build_indices()
+        self.scenario = {"knockouts": [], "overexpressions": {}}
         self.byproduct_analyst = ByproductAnalyst()
 
+    def _take_snapshot(self):
+        """
+        Capture the baseline reaction bounds and objective of the loaded model.
+        """
+        reactions = self.model.reactions
+        self._base_bounds = np.array([r.bounds for r in reactions], dtype=float).reshape(-1, 2)
+        self._base_objective = {
+            r.id: r.objective_coefficient for r in reactions if r.objective_coefficient != 0
+        }
+        self._base_direction = self.model.objective.direction
+
+    def _build_indices(self):
+        """
+        Precompute reaction-order index arrays used to post-process solutions.
+        Positions refer to `self.model.reactions`, which is also the order of
+        `solution.fluxes`.
+        """
+        reactions = self.model.reactions
+        self.reaction_ids = [r.id for r in reactions]
+        self.flux_index = ReactionIndex(self.reaction_ids)
+        exchanges = self.model.exchanges
+        self._exchange_idx = np.array([reactions.index(r) for r in exchanges], dtype=int)
+        self._exchange_ids = [r.id for r in exchanges]
+
+        carbons, is_co2 = [], []
+        for ex_rxn in exchanges:
+            met = next(iter(ex_rxn.metabolites))
+            try:
+                carbons.append(met.elements.get('C', 0))
+            except Exception:
+                carbons.append(0)
+            is_co2.append(met.id == 'co2_e')
+        self._exchange_carbons = np.array(carbons, dtype=float)
+        self._exchange_is_co2 = np.array(is_co2, dtype=bool)
+        self._ex_prefix_idx = np.array(
+            [i for i, rid in enumerate(self.reaction_ids) if rid.startswith('EX_')], dtype=int
+        )
+
+    def _top_byproducts(self, values: np.ndarray, k: int = 5) -> List[Dict]:
+        # Excreting exchange reactions, largest first
+        ex = values[self._exchange_idx]
+        excreting = np.flatnonzero(ex > 1e-6)
+        top = excreting[np.argsort(-ex[excreting], kind='stable')[:k]]
+        return [{"id": self._exchange_ids[i], "value": float(ex[i])} for i in top]
+
+    def _carbon_loss_index(self, values: np.ndarray) -> float:
+        ex = values[self._exchange_idx]
+        uptake = ex < -1e-6
+        carbon_uptake_flux = float(np.sum(-ex[uptake] * self._exchange_carbons[uptake]))
+        # Skip CO2 as it's inevitable but we often want to track organic loss
+        excreted = (ex > 1e-6) & ~self._exchange_is_co2
+        carbon_excreted_flux = float(np.sum(ex[excreted] * self._exchange_carbons[excreted]))
+        if carbon_uptake_flux > 0:
+            return (carbon_excreted_flux / carbon_uptake_flux) * 100
+        return 0.0
+
+    @staticmethod
+    def _top_shadow_prices(sp_series: pd.Series, k: int = 50) -> Dict[str, float]:
+        values = np.nan_to_num(sp_series.values.astype(float), nan=0.0, posinf=0.0, neginf=0.0)
+        magnitude = np.abs(values)
+        if len(values) > k:
+            candidates = np.argpartition(-magnitude, k - 1)[:k]
+        else:
+            candidates = np.arange(len(values))
+        top = candidates[np.argsort(-magnitude[candidates], kind='stable')]
+        index = sp_series.index
+        return {index[i]: float(values[i]) for i in top}
+
     def reset_model(self):
-        self.model = self.original_model.copy()
+        """
+        Restore the model to its loaded state.
+        In snapshot mode only the reactions whose bounds differ from the baseline
+        are touched, so no cobra objects or solver problems are reallocated.
+        """
+        self.scenario = {"knockouts": [], "overexpressions": {}}
+        if self.reset_mode == "copy":
+            self.model = self.original_model.copy()
+            return
+
+        reactions = self.model.reactions
+        current = np.array([r.bounds for r in reactions], dtype=float).reshape(-1, 2)
+        changed = np.flatnonzero((current != self._base_bounds).any(axis=1))
+        for idx in changed:
+            lb, ub = self._base_bounds[idx]
+            reactions[idx].bounds = (float(lb), float(ub))
+
+        # Gene knock-outs only flip the functional flag (bounds were restored above)
+        for gene in self.model.genes:
+            if not gene.functional:
+                gene.functional = True
+
+        self.model.objective = {
+            reactions.get_by_id(rid): coef for rid, coef in self._base_objective.items()
+        }
+        self.model.objective.direction = self._base_direction
+
+    def clone(self) -> "MetabolicSimulator":
+        """
+        Independent simulator with its own model and solver problem.
+        The clone starts from the baseline snapshot of this simulator.
+        """
+        other = copy.copy(self)
+        other.model = self.model.copy()
+        if self.original_model is not None:
+            other.original_model = self.original_model.copy()
+        other.byproduct_analyst = ByproductAnalyst()
+        other.reset_model()
+        return other
 
     def apply_environment(self, carbon_source: str, uptake_rate: float, aerobic: bool):
         # Reset to base before applying new constraints
         self.reset_model()
+        self.scenario.update(carbon_source=carbon_source, uptake_rate=uptake_rate, aerobic=aerobic)
         
         # Configure carbon source
         # Common exchange reactions: EX_glc__D_e, EX_glyc_e, EX_xyl__D_e
@@ -49,6 +174,8 @@ class MetabolicSimulator:
             o2_reaction.lower_bound = -20.0 if aerobic else 0.0
 
     def apply_modifications(self, knockouts: List[str], overexpressions: Dict[str, float]):
+        self.scenario["knockouts"].extend(knockouts)
+        self.scenario["overexpressions"].update(overexpressions)
         for gene_id in knockouts:
             if gene_id in self.model.genes:
                 self.model.genes.get_by_id(gene_id).knock_out()
@@ -66,66 +193,37 @@ class MetabolicSimulator:
             if solution.status != 'optimal':
                 return {"success": False, "status": solution.status}
 
-            # Extract fluxes
-            fluxes = {k: sanitize_float(v) for k, v in solution.fluxes.items()}
+            # Extract fluxes (reaction order matches self.reaction_ids)
+            values = np.nan_to_num(solution.fluxes.values.astype(float), nan=0.0, posinf=0.0, neginf=0.0)
+            fluxes = dict(zip(self.reaction_ids, values.tolist()))
             growth_rate = sanitize_float(solution.objective_value)
 
             # Extract top 5 byproducts (Excreting exchange reactions)
-            ex_fluxes = {r.id: fluxes[r.id] for r in self.model.exchanges if fluxes[r.id] > 1e-6}
-            top_byproducts = sorted(ex_fluxes.items(), key=lambda x: x[1], reverse=True)[:5]
-            
+            top_byproducts = self._top_byproducts(values)
+
             # --- Carbon Loss Calculation ---
-            carbon_loss_idx = 0.0
-            try:
-                # Find carbon source reaction (e.g., EX_glc__D_e)
-                carbon_uptake_flux = 0.0
-                carbon_source_atoms = 0
-                
-                # Check for glucose as default if not found via generic search
-                for ex_rxn in self.model.exchanges:
-                    flux = fluxes[ex_rxn.id]
-                    if flux < -1e-6: # Uptake
-                        met = list(ex_rxn.metabolites.keys())[0]
-                        c_count = met.elements.get('C', 0)
-                        if c_count > 0:
-                            carbon_uptake_flux += abs(flux) * c_count
-                
-                carbon_excreted_flux = 0.0
-                for ex_rxn in self.model.exchanges:
-                    flux = fluxes[ex_rxn.id]
-                    if flux > 1e-6: # Excretion
-                        met = list(ex_rxn.metabolites.keys())[0]
-                        # Skip CO2 as it's inevitable but we often want to track organic loss
-                        if met.id == 'co2_e': continue 
-                        c_count = met.elements.get('C', 0)
-                        carbon_excreted_flux += flux * c_count
-                
-                if carbon_uptake_flux > 0:
-                    carbon_loss_idx = (carbon_excreted_flux / carbon_uptake_flux) * 100
-            except:
-                pass # Fallback to 0 if calculation fails
-            
+            carbon_loss_idx = self._carbon_loss_index(values)
+
             # --- Shadow Price Extraction ---
             shadow_prices = {}
             try:
                 # Extract top 50 shadow prices (highest absolute values)
-                sp_series = solution.shadow_prices
-                top_sp = sp_series.abs().sort_values(ascending=False).head(50)
-                shadow_prices = {idx: sp_series[idx] for idx in top_sp.index}
-            except:
+                shadow_prices = self._top_shadow_prices(solution.shadow_prices)
+            except Exception:
                 pass
 
-
             # Calculate Byproduct Analysis for Static Simulation
             # Use production rates (flux > 0) as concentration proxy
-            production_rates = {k: v for k, v in fluxes.items() if v > 1e-4 and k.startswith('EX_')}
+            ex_values = values[self._ex_prefix_idx]
+            producing = self._ex_prefix_idx[ex_values > 1e-4]
+            production_rates = {self.reaction_ids[i]: float(values[i]) for i in producing}
             byproduct_analysis = self.byproduct_analyst.analyze_impact(production_rates)
-            
+
             return {
                 "success": True,
                 "growth_rate": growth_rate,
                 "fluxes": fluxes,
-                "byproducts": [{"id": k, "value": v} for k, v in top_byproducts],
+                "byproducts": top_byproducts,
                 "carbon_loss_index": round(carbon_loss_idx, 2),
                 "shadow_prices": shadow_prices,
                 "status": solution.status,
@@ -134,206 +232,516 @@ class MetabolicSimulator:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def apply_scenario(self, scenario: Dict):
+        """
+        Reset and apply a scenario dict (the format of `self.scenario`).
+        Without a carbon_source key the medium is left at the model default.
+        """
+        if "carbon_source" in scenario:
+            self.apply_environment(
+                scenario["carbon_source"],
+                scenario.get("uptake_rate", -10.0),
+                scenario.get("aerobic", True)
+            )
+        else:
+            self.reset_model()
+        self.apply_modifications(scenario.get("knockouts", []), scenario.get("overexpressions", {}))
+
+    def run_scenario(self, scenario: Dict) -> Dict:
+        """
+        Apply one scenario on top of the baseline and solve it.
+        Keys mirror the /simulate request: carbon_source, uptake_rate, aerobic,
+        knockouts, overexpressions and method ("fba" or "moma").
+        """
+        self.apply_scenario({"carbon_source": "glc__D", "uptake_rate": -10.0, "aerobic": True, **scenario})
+        if scenario.get("method", "fba").lower() == "moma":
+            return self.simulate_moma()
+        return self.simulate()
+
+    def iter_simulate_many(self, scenarios: List[Dict], processes: int = 1) -> Iterator[Dict]:
+        """
+        Solve many scenarios, yielding results in submission order.
+        In-process, the same solver problem is reused for every scenario: the
+        snapshot reset only rewrites the reactions the previous scenario changed,
+        and the solver warm-starts from the previous optimal basis.
+        With processes > 1 the scenarios are split into contiguous chunks that
+        run on worker processes, each holding its own preloaded model.
+        """
+        if processes > 1 and len(scenarios) > 1:
+            index = 0
+            chunks = worker_pool.chunked(scenarios, processes)
+            for chunk_results in worker_pool.map_chunks(_simulate_chunk, self.model_path, chunks):
+                for result in chunk_results:
+                    result["index"] = index
+                    index += 1
+                    yield result
+            return
+
+        for index, scenario in enumerate(scenarios):
+            result = self.run_scenario(scenario)
+            result["index"] = index
+            yield result
+
+    def simulate_many(self, scenarios: List[Dict], processes: int = 1) -> List[Dict]:
+        return list(self.iter_simulate_many(scenarios, processes=processes))
+
+    def _dynamic_points(self, initial_glucose: float, initial_biomass: float, total_time: float,
+                        time_step: float, include_fluxes: bool, integrator: str, rtol: float,
+                        atol: float, max_step: float) -> Tuple[DFBAEngine, Iterator[Dict]]:
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator: {integrator}")
+        if time_step <= 0:
+            raise ValueError("time_step must be positive")
+
+        engine = DFBAEngine(self.model, "EX_glc__D_e")
+        if integrator == "rk45":
+            logger.info(f"Starting dynamic simulation: adaptive RK45, t_end={total_time}")
+            points = adaptive_points(
+                engine, initial_glucose, initial_biomass, total_time,
+                rtol=rtol, atol=atol, max_step=max_step, include_fluxes=include_fluxes
+            )
+        else:
+            logger.info(f"Starting dynamic simulation: steps={int(total_time/time_step)}")
+            points = euler_points(
+                engine, initial_glucose, initial_biomass, total_time, time_step,
+                include_fluxes=include_fluxes
+            )
+        return engine, points
+
+    def iter_dynamic(self, initial_glucose: float = 20.0, initial_biomass: float = 0.01,
+                     total_time: float = 24.0, time_step: float = 0.5, flux_mode: Optional[str] = None,
+                     integrator: str = "euler", rtol: float = 1e-3, atol: float = 1e-6,
+                     max_step: float = 2.0) -> Iterator[Dict]:
+        """
+        Run dFBA and yield one JSON-ready event per timestep as soon as it is solved,
+        followed by a final "done" event. Only the previous step is kept in memory.
+
+        flux_mode: None (no fluxes), "full" (all |flux| > 1e-3 each step) or
+        "delta" (only reactions whose flux changed since the previous step;
+        reactions that dropped out are sent as 0.0).
+        """
+        if flux_mode not in (None, "full", "delta"):
+            raise ValueError(f"Unknown flux mode: {flux_mode}")
+        engine, points = self._dynamic_points(
+            initial_glucose, initial_biomass, total_time, time_step,
+            flux_mode is not None, integrator, rtol, atol, max_step
+        )
+
+        previous_fluxes: Dict[str, float] = {}
+        last_byproducts: Dict[str, float] = {}
+        steps = 0
+        for step_idx, point in enumerate(points):
+            if step_idx % 5 == 0:
+                logger.info(f"Simulating time: {point['time']:.1f}/{total_time}")
+
+            byproducts = {}
+            ex_values = point["exchange_fluxes"]
+            if ex_values is not None:
+                for pos in np.flatnonzero(ex_values > 1e-4):
+                    byproducts[engine.exchange_ids[pos]] = sanitize_float(round(float(ex_values[pos]), 4))
+            last_byproducts = byproducts
+
+            event = {
+                "type": "step",
+                "index": step_idx,
+                "time": round(point["time"], 4),
+                "biomass": round(point["biomass"], 4),
+                "glucose": round(point["glucose"], 4),
+                "growth_rate": sanitize_float(round(point["growth_rate"], 4)),
+                "byproducts": byproducts,
+                "alerts": point["alerts"],
+            }
+            if point["fluxes"] is not None:
+                values = point["fluxes"]
+                fluxes = {engine.reaction_ids[j]: float(values[j]) for j in np.flatnonzero(np.abs(values) > 1e-3)}
+                if flux_mode == "full":
+                    event["fluxes"] = fluxes
+                else:
+                    delta = {rid: v for rid, v in fluxes.items() if previous_fluxes.get(rid) != v}
+                    delta.update({rid: 0.0 for rid in previous_fluxes if rid not in fluxes})
+                    event["flux_delta"] = delta
+                    previous_fluxes = fluxes
+            steps += 1
+            yield event
+
+        yield {
+            "type": "done",
+            "steps": steps,
+            "integrator": integrator,
+            "lp_solves": engine.solves,
+            "byproduct_analysis": self.byproduct_analyst.analyze_impact(last_byproducts),
+        }
+
+    def run_dynamic_trajectory(self, initial_glucose: float = 20.0, initial_biomass: float = 0.01,
+                               total_time: float = 24.0, time_step: float = 0.5,
+                               include_flux_history: bool = False, integrator: str = "euler",
+                               rtol: float = 1e-3, atol: float = 1e-6, max_step: float = 2.0,
+                               progress: Optional[Callable[[float], None]] = None) -> DynamicTrajectory:
+        """
+        Run dFBA into preallocated columnar storage (see flux_history.DynamicTrajectory).
+        `progress` receives the simulated fraction of `total_time` after each step.
+        """
+        engine, points = self._dynamic_points(
+            initial_glucose, initial_biomass, total_time, time_step,
+            include_flux_history, integrator, rtol, atol, max_step
+        )
+        # Start modest and let the trajectory grow: runs usually stop early on depletion
+        steps = int(total_time / time_step) + 2 if integrator == "euler" else 64
+        capacity = min(steps, 256)
+        trajectory = DynamicTrajectory(engine.reaction_ids, engine.exchange_ids, capacity, include_flux_history)
+        for step_idx, point in enumerate(points):
+            if step_idx % 5 == 0:
+                logger.info(f"Simulating time: {point['time']:.1f}/{total_time}")
+            trajectory.append(point)
+            if progress:
+                progress(point["time"] / total_time if total_time > 0 else 1.0)
+        trajectory.lp_solves = engine.solves
+        return trajectory
+
     def simulate_dynamic(self, initial_glucose: float = 20.0, initial_biomass: float = 0.01, 
-                        total_time: float = 24.0, time_step: float = 0.5, include_flux_history: bool = False) -> Dict:
+                        total_time: float = 24.0, time_step: float = 0.5, include_flux_history: bool = False,
+                        integrator: str = "euler", rtol: float = 1e-3, atol: float = 1e-6,
+                        max_step: float = 2.0, history_format: str = "records",
+                        progress: Optional[Callable[[float], None]] = None) -> Dict:
         """
         Dynamic FBA (dFBA) simulation
         Simple batch fermentation model:
         dX/dt = mu * X
         dS/dt = v_s * X
         dP/dt = v_p * X
+
+        integrator="euler" takes fixed steps of `time_step`; integrator="rk45"
+        picks step sizes from the error tolerances (rtol/atol, capped at
+        `max_step`), reuses LP solutions along linear pieces of the uptake
+        response, and stops exactly where the substrate is exhausted or no
+        longer covers maintenance.
+        history_format="records" returns the flux history as one dict per step,
+        "columnar" as a shared reaction index plus a value matrix.
         """
         try:
-            growth_rate_history = []
-            byproduct_histories = {}
-            glucose_history = []
-            biomass_history = []
-            time_points = []
-            toxicity_events = []
-            flux_history = []  # Store full flux snapshots
-            
-            # Initial conditions
-            X = initial_biomass
-            S = initial_glucose
-            t = 0.0
-            
-            # Constants for uptake (Michaelis-Menten)
-            Km = 0.5 # mmol/L
-            Vmax_uptake = -10.0 # mmol/gDW/h (Negative for uptake)
-            
-            # Toxicity Thresholds (mmol/L)
-            TOXICITY_MAP = {
-                "EX_ac_e": 60.0,   # Acetate threshold
-                "EX_lac__L_e": 40.0, # Lactate threshold
-                "EX_etoh_e": 30.0    # Ethanol threshold
-            }
-            
-            # Byproduct accumulation (mmol/L)
-            P = {rid: 0.0 for rid in TOXICITY_MAP}
-            toxicity_events = []
-            
-            logger.info(f"Starting dynamic simulation: steps={int(total_time/time_step)}")
-            
-            while t <= total_time and S > 0:
-                step_idx = len(time_points)
-                if step_idx % 5 == 0:
-                    logger.info(f"Simulating time: {t:.1f}/{total_time}")
-
-                time_points.append(round(t, 2))
-                biomass_history.append(round(X, 4))
-                glucose_history.append(round(S, 4))
-                
-                # 1. Update uptake rate based on S
-                current_v_s = Vmax_uptake * (S / (Km + S))
-                
-                # 2. Apply current substrate constraint
-                self.model.reactions.get_by_id("EX_glc__D_e").lower_bound = current_v_s
-                
-                # 3. Solve FBA
-                solution = self.model.optimize()
-                if solution.status != 'optimal':
-                    growth_rate_history.append(0.0)
-                    break
-                    
-                mu = solution.objective_value
-                
-                # --- Toxicity Inhibition Factor ---
-                # mu = mu_base * Product(Ki / (Ki + Pi))
-                inhibition_factor = 1.0
-                for rid, threshold in TOXICITY_MAP.items():
-                    if rid in byproduct_histories and len(byproduct_histories[rid]) > 0:
-                        current_p = P.get(rid, 0.0)
-                        inhibition_factor *= (threshold / (threshold + current_p))
-                        if current_p > threshold * 0.8:
-                            toxicity_events.append({"time": t, "byproduct": rid, "concentration": current_p})
-                
-                mu = mu * inhibition_factor
-                growth_rate_history.append(sanitize_float(round(mu, 4)))
-                
-                # Capture current fluxes (Sparse Optimization & Type Safety)
-                # Only analyze and store if requested to save massive bandwidth
-                if include_flux_history:
-                    # Ensure float conversion and handle NaNs
-                    current_fluxes = {}
-                    for k, v in solution.fluxes.items():
-                        if abs(v) > 1e-3:
-                            current_fluxes[k] = sanitize_float(v)
-                    flux_history.append(current_fluxes)
-                
-                fluxes = solution.fluxes
-                
-                # 4. Record byproducts
-                ex_fluxes = {r.id: fluxes[r.id] for r in self.model.exchanges if fluxes[r.id] > 1e-4}
-                for rid, val in ex_fluxes.items():
-                    if rid not in byproduct_histories:
-                        byproduct_histories[rid] = [0.0] * (len(time_points) - 1)
-                    byproduct_histories[rid].append(sanitize_float(round(val, 4)))
-                    
-                    # Accumulate concentration in the medium
-                    if rid in P:
-                        P[rid] += val * X * time_step
-                
-                # Ensure all byproducts have entry for this timepoint
-                for rid in byproduct_histories:
-                    if len(byproduct_histories[rid]) < len(time_points):
-                        byproduct_histories[rid].append(0.0)
-
-                # 5. Integrate (Euler)
-                dt = time_step
-                X_next = X + (mu * X * dt)
-                S_next = S + (fluxes["EX_glc__D_e"] * X * dt)
-                
-                X = max(0, X_next)
-                S = max(0, S_next)
-                t += dt
-            
+            if history_format not in ("records", "columnar"):
+                return {"success": False, "error": f"Unknown history format: {history_format}"}
+
+            trajectory = self.run_dynamic_trajectory(
+                initial_glucose, initial_biomass, total_time, time_step,
+                include_flux_history=include_flux_history, integrator=integrator,
+                rtol=rtol, atol=atol, max_step=max_step, progress=progress
+            )
+            byproduct_histories = trajectory.byproduct_histories()
+            if history_format == "columnar":
+                flux_history = trajectory.flux_columnar()
+            else:
+                flux_history = trajectory.flux_records()
+
             # Final Byproduct Analysis
             final_concentrations = {rid: history[-1] for rid, history in byproduct_histories.items()}
             byproduct_analysis = self.byproduct_analyst.analyze_impact(final_concentrations)
 
             return {
                 "success": True,
-                "time": time_points,
-                "biomass": biomass_history,
-                "glucose": glucose_history,
-                "growth_rates": growth_rate_history,
+                "integrator": integrator,
+                "lp_solves": trajectory.lp_solves,
+                "time": np.round(trajectory.series("time"), 4).tolist(),
+                "biomass": np.round(trajectory.series("biomass"), 4).tolist(),
+                "glucose": np.round(trajectory.series("glucose"), 4).tolist(),
+                "growth_rates": np.round(np.nan_to_num(trajectory.series("growth_rate")), 4).tolist(),
                 "byproducts": byproduct_histories,
                 "flux_history": flux_history,
-                "toxicity_alerts": toxicity_events[:10],
+                "toxicity_alerts": trajectory.alerts[:10],
                 "byproduct_analysis": byproduct_analysis  # New Analysis Data
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def simulate_fva(self, reaction_ids: Optional[List[str]] = None, fraction_of_optimum: float = 0.95) -> Dict:
+    def _fva_ranges(self, reaction_ids: List[str], fraction_of_optimum: float,
+                    deadline: Optional[float] = None) -> Iterator[Tuple[str, Optional[float], Optional[float]]]:
         """
-        Flux Variability Analysis (FVA)
+        Warm-started FVA on the loaded LP.
+        The current objective is pinned to `fraction_of_optimum` of its optimum
+        once, then each reaction is minimized and maximized by swapping the
+        objective coefficients in place, so consecutive solves start from the
+        previous basis. Stops early once `deadline` (time.time()) has passed.
         """
-        try:
-            from cobra.flux_analysis import flux_variability_analysis
-            
-            # If no specific reactions, focus on key metabolic ones to save time
-            if not reaction_ids:
-                # Top reactions with significantly high flux in standard FBA
-                sol = self.model.optimize()
-                if sol.status == 'optimal':
-                    fluxes = sol.fluxes
-                    # Filter reactions with absolute flux > 1.0 (arbitrary threshold for key reactions)
-                    reaction_ids = [r.id for r in self.model.reactions if abs(fluxes[r.id]) > 1.0]
-                else:
-                    return {"success": False, "error": "Model not optimal for FVA"}
+        model = self.model
+        optimum = model.slim_optimize()
+        if math.isnan(optimum):
+            raise ValueError("Model not optimal for FVA")
+
+        with model:
+            expression = model.solver.objective.expression
+            if model.solver.objective.direction == "max":
+                bound = {"lb": fraction_of_optimum * optimum}
+            else:
+                bound = {"ub": optimum / fraction_of_optimum if fraction_of_optimum > 0 else None}
+            model.add_cons_vars([model.problem.Constraint(expression, name="fva_optimum", **bound)])
+            model.objective = model.problem.Objective(Zero, direction="max", sloppy=True)
+            objective = model.solver.objective
+
+            for rid in reaction_ids:
+                if deadline is not None and time.time() > deadline:
+                    return
+                rxn = model.reactions.get_by_id(rid)
+                coefficients = {rxn.forward_variable: 1, rxn.reverse_variable: -1}
+                objective.set_linear_coefficients(coefficients)
+                objective.direction = "min"
+                minimum = model.slim_optimize()
+                objective.direction = "max"
+                maximum = model.slim_optimize()
+                objective.set_linear_coefficients({rxn.forward_variable: 0, rxn.reverse_variable: 0})
+                yield (
+                    rid,
+                    None if math.isnan(minimum) else round(minimum, 4),
+                    None if math.isnan(maximum) else round(maximum, 4)
+                )
 
-            fva_result = flux_variability_analysis(
-                self.model, 
-                reaction_list=reaction_ids[:50], # Limit to 50 for performance
-                fraction_of_optimum=fraction_of_optimum
+    def iter_fva(self, reaction_ids: Optional[List[str]] = None, fraction_of_optimum: float = 0.95,
+                 processes: int = 1, chunk_size: int = 250, time_budget: Optional[float] = None,
+                 skip_blocked: bool = True) -> Iterator[Dict]:
+        """
+        Flux Variability Analysis over `reaction_ids` (all reactions by default),
+        yielding one chunk of results at a time.
+        With processes > 1 the chunks are solved on worker processes that each
+        replay the current scenario on their own model. `time_budget` (seconds)
+        bounds the whole run; reactions not reached are reported as remaining.
+        With `skip_blocked`, reactions blocked in the current medium are answered
+        from the preprocessing cache ([0, 0]) in a first chunk without any solve.
+        """
+        if not reaction_ids:
+            reaction_ids = self.reaction_ids
+        reaction_ids = [rid for rid in reaction_ids if rid in self.model.reactions]
+        total = len(reaction_ids)
+        deadline = time.time() + time_budget if time_budget else None
+
+        completed = 0
+        if skip_blocked:
+            # Knockouts and the optimum constraint only shrink the flux space,
+            # so a reaction blocked in the medium stays blocked in the scenario.
+            blocked = preprocessing.get_preprocessing(self)["blocked_set"]
+            known = [rid for rid in reaction_ids if rid in blocked]
+            if known:
+                reaction_ids = [rid for rid in reaction_ids if rid not in blocked]
+                completed = len(known)
+                yield {
+                    "fva_results": {rid: {"minimum": 0.0, "maximum": 0.0} for rid in known},
+                    "completed": completed,
+                    "total": total,
+                }
+
+        chunks = [reaction_ids[i:i + chunk_size] for i in range(0, len(reaction_ids), chunk_size)]
+        if processes > 1 and len(chunks) > 1:
+            chunk_results = worker_pool.map_chunks(
+                _fva_chunk, self.model_path, chunks,
+                scenario=self.scenario, fraction_of_optimum=fraction_of_optimum, deadline=deadline
             )
-            
+        else:
+            chunk_results = (
+                list(self._fva_ranges(chunk, fraction_of_optimum, deadline)) for chunk in chunks
+            )
+
+        for ranges in chunk_results:
+            completed += len(ranges)
+            yield {
+                "fva_results": {rid: {"minimum": lo, "maximum": hi} for rid, lo, hi in ranges},
+                "completed": completed,
+                "total": total,
+            }
+            if deadline is not None and time.time() > deadline:
+                break
+
+    def simulate_fva(self, reaction_ids: Optional[List[str]] = None, fraction_of_optimum: float = 0.95,
+                     processes: int = 1, time_budget: Optional[float] = None, chunk_size: int = 250) -> Dict:
+        """
+        Flux Variability Analysis (FVA)
+        `chunk_size` reactions are solved per chunk (per worker task with processes > 1).
+        """
+        try:
+            start = time.time()
             results = {}
-            for rid, row in fva_result.iterrows():
-                results[rid] = {
-                    "minimum": round(row['minimum'], 4),
-                    "maximum": round(row['maximum'], 4)
-                }
-                
+            completed, total = 0, 0
+            for chunk in self.iter_fva(reaction_ids, fraction_of_optimum, processes=processes,
+                                       chunk_size=chunk_size, time_budget=time_budget):
+                results.update(chunk["fva_results"])
+                completed, total = chunk["completed"], chunk["total"]
+
             return {
                 "success": True,
-                "fva_results": results
+                "fva_results": results,
+                "completed": completed,
+                "total": total,
+                "truncated": completed < total,
+                "elapsed": round(time.time() - start, 3)
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def simulate_production_envelope(self, target_rxn_id: str, points: int = 20) -> Dict:
+    @property
+    def biomass_rxn_id(self) -> Optional[str]:
+        """The biomass reaction, taken from the model's base objective."""
+        if not self._base_objective:
+            return None
+        return max(self._base_objective, key=lambda rid: abs(self._base_objective[rid]))
+
+    def _flux_range(self, rxn_id: str) -> Tuple[float, float]:
+        """Unrounded min/max flux of one reaction in the current scenario."""
+        with self.model:
+            self.model.objective = rxn_id
+            self.model.objective_direction = "min"
+            minimum = self.model.slim_optimize()
+            self.model.objective_direction = "max"
+            maximum = self.model.slim_optimize()
+        if math.isnan(minimum) or math.isnan(maximum):
+            raise ValueError(f"Model not optimal while ranging {rxn_id}")
+        return minimum, maximum
+
+    def envelope_grid(self, control_rxn_ids: List[str], points: int = 20) -> List[Tuple[float, ...]]:
+        """
+        Grid of control flux values: `points` evenly spaced values over the
+        feasible range of each control, combined row-major for 2D envelopes.
+        """
+        axes = [np.linspace(*self._flux_range(rid), points) for rid in control_rxn_ids]
+        mesh = np.meshgrid(*axes, indexing="ij")
+        return [tuple(float(v) for v in row) for row in np.stack([m.ravel() for m in mesh], axis=1)]
+
+    def _envelope_ranges(self, target_rxn_id: str, control_rxn_ids: List[str],
+                         grid: List[Tuple[float, ...]],
+                         progress: Optional[Callable[[float], None]] = None
+                         ) -> List[Tuple[Tuple[float, ...], Optional[float], Optional[float]]]:
+        """
+        Min/max target flux at each grid point on the loaded LP.
+        The objective is set to the target once; between points only the
+        control bounds move, so every solve warm-starts from the previous basis.
+        """
+        model = self.model
+        controls = [model.reactions.get_by_id(rid) for rid in control_rxn_ids]
+        ranges = []
+        with model:
+            model.objective = target_rxn_id
+            # Recorded once so the context restores the direction on exit
+            model.objective_direction = "max"
+            objective = model.solver.objective
+            for values in grid:
+                for rxn, value in zip(controls, values):
+                    rxn.bounds = (value, value)
+                objective.direction = "min"
+                minimum = model.slim_optimize()
+                objective.direction = "max"
+                maximum = model.slim_optimize()
+                ranges.append((
+                    values,
+                    None if math.isnan(minimum) else round(minimum, 4),
+                    None if math.isnan(maximum) else round(maximum, 4)
+                ))
+                if progress:
+                    progress(len(ranges) / len(grid))
+        return ranges
+
+    def simulate_production_envelope(self, target_rxn_id: str, points: int = 20,
+                                     control_rxn_ids: Optional[List[str]] = None,
+                                     processes: int = 1,
+                                     progress: Optional[Callable[[float], None]] = None) -> Dict:
         """
         Production Envelope analysis (Growth vs Target yield)
+        The controls default to the biomass reaction; two controls give a 2D
+        envelope of points x points cells. With processes > 1 the grid is
+        split across worker processes that replay the current scenario.
+        `progress` receives the solved fraction of the grid.
         """
         try:
-            # Use model-specific biomass reaction if not explicitly provided
-            biomass_id = "BIOMASS_Ec_iML1515_core_75p37M" if "iML1515" in self.model.id else "r_2111"
-            
-            envelope = production_envelope(
-                self.model, 
-                reactions=[biomass_id], 
-                objective=target_rxn_id,
-                points=points
-            )
-            
+            if target_rxn_id not in self.model.reactions:
+                return {"success": False, "error": f"Target reaction {target_rxn_id} not found"}
+            biomass_id = self.biomass_rxn_id
+            control_rxn_ids = list(control_rxn_ids or [biomass_id])
+            if not 1 <= len(control_rxn_ids) <= 2:
+                return {"success": False, "error": "Envelopes take one or two control reactions"}
+            missing = [rid for rid in control_rxn_ids if rid not in self.model.reactions]
+            if missing:
+                return {"success": False, "error": f"Control reactions not found: {missing}"}
+
+            grid = self.envelope_grid(control_rxn_ids, points)
+            if processes > 1:
+                chunks = worker_pool.chunked(grid, processes)
+                ranges = []
+                for chunk in worker_pool.map_chunks(
+                    _envelope_chunk, self.model_path, chunks, scenario=self.scenario,
+                    target_rxn_id=target_rxn_id, control_rxn_ids=control_rxn_ids
+                ):
+                    ranges.extend(chunk)
+                    if progress:
+                        progress(len(ranges) / len(grid))
+            else:
+                ranges = self._envelope_ranges(target_rxn_id, control_rxn_ids, grid, progress)
+
             result_data = []
-            for _, row in envelope.iterrows():
-                result_data.append({
-                    "growth_rate": round(row[biomass_id], 4),
-                    "min_flux": round(row['minimum'], 4),
-                    "max_flux": round(row['maximum'], 4)
-                })
-                
+            for values, lo, hi in ranges:
+                row = {rid: round(value, 4) for rid, value in zip(control_rxn_ids, values)}
+                if biomass_id in row:
+                    row["growth_rate"] = row[biomass_id]
+                row["min_flux"] = lo
+                row["max_flux"] = hi
+                result_data.append(row)
+
             return {
                 "success": True,
                 "target_rxn": target_rxn_id,
+                "biomass_rxn": biomass_id,
+                "controls": control_rxn_ids,
+                "points": points,
                 "data": result_data
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def simulate_omics_batch(self, genes: List[str], expression: np.ndarray,
+                             samples: Optional[List[str]] = None, normalization_factor: float = 1.0,
+                             key_reactions: Optional[List[str]] = None, processes: int = 1) -> Dict:
+        """
+        Omics-constrained FBA for every column of a genes x samples expression matrix.
+        Reaction bounds for all samples come from one compiled-GPR pass; samples are
+        then solved on this model (or in column chunks on worker processes that
+        replay the current scenario). Returns growth and key fluxes as a table.
+        """
+        try:
+            expression = np.asarray(expression, dtype=float)
+            if expression.ndim != 2 or expression.shape[0] != len(genes):
+                return {"success": False, "error": "expression must be a genes x samples matrix"}
+            samples = samples or [f"sample_{j}" for j in range(expression.shape[1])]
+            if len(samples) != expression.shape[1]:
+                return {"success": False, "error": "samples must name every matrix column"}
+            if key_reactions is None:
+                key_reactions = [self.biomass_rxn_id] + [
+                    rid for rid in ("EX_glc__D_e", "EX_o2_e", "EX_co2_e", "EX_ac_e") if rid in self.model.reactions
+                ]
+            missing = [rid for rid in key_reactions if rid not in self.model.reactions]
+            if missing:
+                return {"success": False, "error": f"Reactions not found: {missing}"}
+
+            integrator = OmicsIntegrator(self.model)
+            reaction_expression = integrator.gpr.evaluate(integrator.expression_matrix(genes, expression))
+            lower, upper = integrator.omics_bounds(reaction_expression, normalization_factor)
+
+            if processes > 1 and len(samples) > 1:
+                columns = worker_pool.chunked(list(range(len(samples))), processes)
+                chunks = [(lower[:, cols], upper[:, cols]) for cols in columns]
+                results = [
+                    row for chunk in worker_pool.map_chunks(
+                        _omics_chunk, self.model_path, chunks,
+                        scenario=self.scenario, key_reactions=key_reactions
+                    ) for row in chunk
+                ]
+            else:
+                results = integrator.solve_samples(lower, upper, key_reactions)
+
+            columns = ["sample", "growth_rate", "status"] + key_reactions
+            rows = [[name, r["growth_rate"], r["status"]] + r["fluxes"] for name, r in zip(samples, results)]
+            return {
+                "success": True,
+                "samples": len(samples),
+                "genes_matched": int(sum(1 for g in genes if g in integrator.gpr.gene_positions)),
+                "results": {"columns": columns, "rows": rows}
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
     def simulate_moma(self) -> Dict:
         """
         MOMA (Minimization of Metabolic Adjustment)
@@ -353,32 +761,71 @@ class MetabolicSimulator:
             fluxes = solution.fluxes.to_dict()
             growth_rate = solution.objective_value
 
-            ex_fluxes = {r.id: fluxes[r.id] for r in self.model.exchanges if fluxes[r.id] > 1e-6}
-            top_byproducts = sorted(ex_fluxes.items(), key=lambda x: x[1], reverse=True)[:5]
+            values = solution.fluxes.reindex(self.reaction_ids).fillna(0.0).values.astype(float)
+            top_byproducts = self._top_byproducts(values)
             
             return {
                 "success": True,
                 "growth_rate": growth_rate,
                 "fluxes": fluxes,
-                "byproducts": [{"id": k, "value": v} for k, v in top_byproducts],
+                "byproducts": top_byproducts,
                 "status": solution.status,
                 "method": "MOMA"
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def search_genes_reactions(self, query: str) -> List[Dict]:
-        results = []
-        query = query.lower()
-        
-        # Search genes
-        for gene in self.model.genes:
-            if query in gene.id.lower() or query in gene.name.lower():
-                results.append({"id": gene.id, "name": gene.name, "type": "gene"})
-        
-        # Search reactions
-        for rxn in self.model.reactions:
-            if query in rxn.id.lower() or query in rxn.name.lower():
-                results.append({"id": rxn.id, "name": rxn.name, "type": "reaction"})
-                
-        return results[:20]  # Limit results
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Dict:
+        """Ranked, paginated gene/reaction search through the model's search index."""
+        return search_model(search_index.get_index(self), self.model_path, query, offset, limit,
+                            preprocessing.medium_of(self.scenario))
+
+    def search_genes_reactions(self, query: str, offset: int = 0, limit: int = 20) -> List[Dict]:
+        return self.search(query, offset, limit)["results"]
+
+
+def search_model(index: search_index.SearchIndex, model_path: str, query: str, offset: int = 0,
+                 limit: int = 20, medium: Optional[Dict] = None) -> Dict:
+    """
+    One page of `index` matches, annotated with essentiality when a deletion
+    scan of `model_path` is cached for `medium` (default: the model's own).
+    """
+    total, results = index.search(query, offset, limit)
+    for kind in deletions.DELETION_KINDS:
+        essential = deletions.essential_set(model_path, medium or {}, kind)
+        if essential is None:
+            continue
+        for item in results:
+            if item["type"] == kind:
+                item["essential"] = item["id"] in essential
+    return {"total": total, "results": results}
+
+
+def _simulate_chunk(model_path: str, scenarios: List[Dict]) -> List[Dict]:
+    """Worker-process entry point for batch FBA."""
+    sim = worker_pool.get_worker_simulator(model_path)
+    return sim.simulate_many(scenarios)
+
+
+def _fva_chunk(model_path: str, reaction_ids: List[str], scenario: Dict,
+               fraction_of_optimum: float, deadline: Optional[float]) -> List[Tuple]:
+    """Worker-process entry point for parallel FVA."""
+    sim = worker_pool.get_worker_simulator(model_path)
+    sim.apply_scenario(scenario)
+    return list(sim._fva_ranges(reaction_ids, fraction_of_optimum, deadline))
+
+
+def _envelope_chunk(model_path: str, grid: List[Tuple[float, ...]], scenario: Dict,
+                    target_rxn_id: str, control_rxn_ids: List[str]) -> List[Tuple]:
+    """Worker-process entry point for parallel production envelopes."""
+    sim = worker_pool.get_worker_simulator(model_path)
+    sim.apply_scenario(scenario)
+    return sim._envelope_ranges(target_rxn_id, control_rxn_ids, grid)
+
+
+def _omics_chunk(model_path: str, bounds: Tuple[np.ndarray, np.ndarray], scenario: Dict,
+                 key_reactions: List[str]) -> List[Dict]:
+    """Worker-process entry point for batch omics integration."""
+    sim = worker_pool.get_worker_simulator(model_path)
+    sim.apply_scenario(scenario)
+    return OmicsIntegrator(sim.model).solve_samples(*bounds, key_reactions)
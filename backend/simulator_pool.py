@@ -0,0 +1,116 @@
+import os
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from simulator import MetabolicSimulator, search_model
+import search_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.getenv("SIMULATOR_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+# Longest a caller waits for a free simulator; None waits forever
+LEASE_TIMEOUT = float(os.getenv("SIMULATOR_LEASE_TIMEOUT", "30"))
+
+
+class SimulatorPool:
+    """
+    Fixed-size pool of independent simulators for one model.
+    Each request checks out its own simulator, so concurrent requests never
+    share reaction bounds or a solver problem.
+    """
+
+    def __init__(self, model_path: str, size: int = DEFAULT_POOL_SIZE):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.model_path = model_path
+        self.size = size
+
+        primary = MetabolicSimulator(model_path)
+        self.primary = primary
+        self._simulators = [primary] + [primary.clone() for _ in range(size - 1)]
+        self._available: "queue.Queue[MetabolicSimulator]" = queue.Queue()
+        for sim in self._simulators:
+            self._available.put(sim)
+
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        logger.info(f"Simulator pool ready: {os.path.basename(model_path)} x{size}")
+
+    def warm_up(self):
+        """
+        Run one optimization on every simulator so each solver problem is
+        built and has an optimal basis before the first request arrives, and
+        load the model's search index. Call before the pool is shared with
+        request handlers.
+        """
+        for sim in self._simulators:
+            sim.model.slim_optimize()
+        search_index.get_index(self.primary)
+
+    def checkout(self, timeout: Optional[float] = LEASE_TIMEOUT) -> MetabolicSimulator:
+        """
+        Take a free simulator, waiting at most `timeout` seconds.
+        Raises TimeoutError (counted in the `timeouts` metric) when none frees up.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        try:
+            sim = self._available.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise TimeoutError(f"No simulator available within {timeout}s")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return sim
+
+    def checkin(self, sim: MetabolicSimulator):
+        # Hand the next borrower a clean model regardless of what this one did
+        try:
+            sim.reset_model()
+        finally:
+            self._available.put(sim)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = LEASE_TIMEOUT) -> Iterator[MetabolicSimulator]:
+        sim = self.checkout(timeout)
+        try:
+            yield sim
+        finally:
+            self.checkin(sim)
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Dict:
+        """
+        Search the model without checking out a simulator: the index is shared
+        and read-only, and essentiality refers to the model's default medium.
+        """
+        return search_model(search_index.get_index(self.primary), self.model_path, query, offset, limit)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            available = self._available.qsize()
+            return {
+                "size": self.size,
+                "available": available,
+                "in_use": self.size - available,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
@@ -1,153 +1,436 @@
 import cobra
+import math
+import heapq
+import itertools
+import time
+import logging
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 from cobra.flux_analysis import production_envelope
+from optlang.symbolics import Zero
+import worker_pool
+
+logger = logging.getLogger(__name__)
+
+# Candidate reactions (one binary each) kept in the OptKnock MILP by default
+OPTKNOCK_MAX_CANDIDATES = 50
+# Double/triple knockout sets solved by the screen by default
+SCREEN_MAX_COMBINATIONS = 2000
+
+
+def combination_pool_size(n_candidates: int, max_knockouts: int, budget: int) -> int:
+    """Largest m <= n_candidates whose 2..max_knockouts combinations fit in `budget`."""
+    size = 0
+    for m in range(n_candidates + 1):
+        if sum(math.comb(m, k) for k in range(2, max_knockouts + 1)) > budget:
+            break
+        size = m
+    return size
 
 class StrainDesigner:
-    def __init__(self, model: cobra.Model):
+    def __init__(self, model: cobra.Model, preprocessing: Optional[Dict] = None,
+                 model_path: Optional[str] = None, scenario: Optional[Dict] = None,
+                 essential_reactions: Optional[set] = None):
         self.model = model
+        # Cached single-deletion essentiality; these never make viable knockouts
+        self.essential_reactions = essential_reactions or set()
+        # Worker processes rebuild the model from its file and replay the scenario
+        self.model_path = model_path
+        self.scenario = scenario or {}
+        # Blocked reactions and fully coupled sets for the model's current medium
+        self.blocked = set(preprocessing["blocked"]) if preprocessing else set()
+        self.coupled_sets = preprocessing["coupled_sets"] if preprocessing else []
+
+    def _prune_candidates(self, candidates: List[str]) -> List[str]:
+        """
+        Drop blocked reactions (knocking them out changes nothing) and keep one
+        representative per fully coupled set (knocking out any member has the same effect).
+        """
+        representative = {rid: group[0] for group in self.coupled_sets for rid in group}
+        pruned = []
+        seen = set()
+        for rid in candidates:
+            if rid in self.blocked:
+                continue
+            key = representative.get(rid, rid)
+            if key in seen:
+                continue
+            seen.add(key)
+            pruned.append(rid)
+        return pruned
+
+    def _candidate_reactions(self, solution: cobra.Solution, target_rxn_id: str, biomass_rxn_id: str,
+                             require_active: bool = True) -> List[str]:
+        """
+        Knockout candidates: gene-associated reactions (optionally only those
+        carrying flux in the wild-type optimum), not essential, not blocked, one
+        representative per fully coupled set.
+        """
+        active = solution.fluxes.abs() > 1e-9
+        candidates = [
+            rxn.id for rxn in self.model.reactions
+            if rxn.genes and not rxn.boundary and (active[rxn.id] or not require_active)
+            and rxn.id not in (target_rxn_id, biomass_rxn_id) and rxn.id not in self.essential_reactions
+        ]
+        return self._prune_candidates(candidates)
 
     def optimize_knockouts(self, 
                            target_rxn_id: str, 
                            biomass_rxn_id: str = "BIOMASS_Ec_iML1515_core_75p37M",
                            max_knockouts: int = 2,
-                           fraction_of_optimum: float = 0.1) -> Dict:
+                           fraction_of_optimum: float = 0.1,
+                           max_combinations: int = SCREEN_MAX_COMBINATIONS,
+                           top_k: int = 5,
+                           processes: int = 1,
+                           progress: Optional[Callable[[float], None]] = None) -> Dict:
         """
-        Advanced heuristic strain design using Branch Point Analysis and Production Envelopes.
-        Replaces legacy OptKnock which is no longer supported in latest cobrapy.
+        Combinatorial knockout screening.
+        Every gene-associated reaction that carries flux in the wild-type optimum
+        is knocked out alone; lethal singles are dropped (adding knockouts never
+        restores growth). All double/triple sets up to `max_knockouts` of the
+        surviving singles are solved when they fit in `max_combinations`;
+        otherwise only the singles with the most production headroom at optimal
+        growth are combined and the result is marked heuristic. Combinations are
+        solved on worker processes with processes > 1, and a bounded heap keeps
+        the `top_k` strategies by guaranteed production at optimal growth.
+        `progress` receives the solved fraction after each batch.
         """
         try:
             if target_rxn_id not in self.model.reactions:
                 return {"success": False, "error": f"Target reaction {target_rxn_id} not found"}
-            
-            # 1. Identity Competing Pathways (Heuristic)
-            # Find reactions that share precursors with the target but lead to different subsystems
-            target_rxn = self.model.reactions.get_by_id(target_rxn_id)
-            precursors = [m for m in target_rxn.metabolites if target_rxn.get_coefficient(m) < 0]
-            
-            candidates = []
-            for met in precursors:
-                for rxn in met.reactions:
-                    if rxn.id == target_rxn_id or rxn.id == biomass_rxn_id:
-                        continue
-                    if len(rxn.genes) == 0:
-                        continue
-                    # Check if it's a "diverting" reaction (consuming the precursor)
-                    if rxn.get_coefficient(met) < 0:
-                        candidates.append(rxn.id)
-            
-            # Remove duplicates and limit search space for stability
-            candidates = list(set(candidates))[:30]
-            
-            # 2. Simulate Best Knockouts
-            # Instead of MILP, we use a scoring function based on Flux Coupling and Production Envelope
-            strategies = []
-            
-            # Get baseline growth
-            with self.model:
-                sol = self.model.optimize()
-                max_growth = sol.objective_value
-            
-            # Analysis Loop (Rank candidates)
-            scored_candidates = []
-            for rxn_id in candidates:
-                with self.model:
-                    self.model.reactions.get_by_id(rxn_id).knock_out()
-                    try:
-                        ko_sol = self.model.optimize()
-                        if ko_sol.status == 'optimal' and ko_sol.objective_value >= max_growth * fraction_of_optimum:
-                            # Calculate production potential
-                            prod_flux = ko_sol.fluxes[target_rxn_id]
-                            # Simple score: growth * production
-                            score = prod_flux * (ko_sol.objective_value / max_growth)
-                            scored_candidates.append({
-                                "id": rxn_id,
-                                "growth": float(ko_sol.objective_value),
-                                "production": float(prod_flux),
-                                "score": float(score)
-                            })
-                    except:
-                        continue
-            
-            # Sort and build strategies
-            scored_candidates.sort(key=lambda x: x['score'], reverse=True)
-            
-            # Strategy 1 (Top Single KO)
-            if scored_candidates:
-                top = scored_candidates[0]
-                strategies.append({
-                    "knockouts": [top['id']],
-                    "expected_growth": top['growth'],
-                    "expected_production": top['production'] + 2.5, # Boosted magnitude for UI
-                    "score": round(0.7 + (top['score'] / 10), 2),
-                    "rationale": {
-                        "mechanism": "Competitive Pathway Blockage",
-                        "description": f"The reaction {top['id']} competes with the target for precursor metabolites. Blocking it forces carbon flux towards {target_rxn_id}.",
-                        "visual_flow": [
-                            {"from": "Precursor Pool", "to": top['id'], "type": "blocked"},
-                            {"from": "Precursor Pool", "to": target_rxn_id, "type": "enhanced"}
-                        ]
-                    }
+            if biomass_rxn_id not in self.model.reactions:
+                return {"success": False, "error": f"Biomass reaction {biomass_rxn_id} not found"}
+            max_knockouts = max(1, min(max_knockouts, 3))
+
+            solution = self.model.optimize()
+            if solution.status != 'optimal' or solution.objective_value <= 0:
+                return {"success": False, "error": "Wild-type model does not grow in this medium"}
+            max_growth = solution.objective_value
+            min_growth = max_growth * fraction_of_optimum
+
+            # 1. Candidate reactions
+            candidates = self._candidate_reactions(solution, target_rxn_id, biomass_rxn_id)
+
+            # 2. Single knockouts: exhaustive, also the essentiality filter
+            singles = self._screen([(rid,) for rid in candidates], target_rxn_id, biomass_rxn_id,
+                                   min_growth, processes)
+            viable = [r for r in singles if r["feasible"]]
+            essential = len(singles) - len(viable)
+
+            top = []
+            counter = itertools.count()
+
+            def offer(result: Dict):
+                result["score"] = round(result["production"] * result["growth"] / max_growth, 4)
+                entry = ((result["score"], result["production_max"]), next(counter), result)
+                if len(top) < top_k:
+                    heapq.heappush(top, entry)
+                else:
+                    heapq.heappushpop(top, entry)
+
+            for result in viable:
+                offer(result)
+
+            # 3. Double/triple combinations of the surviving singles, within the budget.
+            # Growth-coupling singles rarely force production on their own, so when the
+            # pool must shrink, keep those that open the most production headroom.
+            pool_size = combination_pool_size(len(viable), max_knockouts, max_combinations)
+            exhaustive = pool_size == len(viable)
+            ranked = sorted(viable, key=lambda r: (r["production_max"], r["production"], r["growth"]), reverse=True)
+            pool = [r["knockouts"][0] for r in ranked[:pool_size]]
+            combos = [c for k in range(2, max_knockouts + 1) for c in itertools.combinations(pool, k)]
+
+            total = len(singles) + len(combos)
+            if progress:
+                progress(len(singles) / total if total else 1.0)
+            batch = max(1, processes) * 64
+            for start in range(0, len(combos), batch):
+                for result in self._screen(combos[start:start + batch], target_rxn_id, biomass_rxn_id,
+                                           min_growth, processes):
+                    if result["feasible"]:
+                        offer(result)
+                if progress:
+                    progress((len(singles) + min(start + batch, len(combos))) / total)
+
+            strategies = [
+                self._strategy(result, target_rxn_id)
+                for _, _, result in sorted(top, reverse=True)
+            ]
+
+            return {
+                "success": True,
+                "target": target_rxn_id,
+                "method": "Combinatorial Knockout Screening",
+                "strategies": strategies,
+                "screened": {
+                    "candidates": len(candidates),
+                    "essential": essential,
+                    "combination_pool": pool_size,
+                    "combinations": total,
+                    "exhaustive": exhaustive,
+                    "wild_type_growth": round(max_growth, 4)
+                },
+                **({} if exhaustive else {
+                    "note": (f"Heuristic screen: combinations were drawn from the {pool_size} of "
+                             f"{len(viable)} viable single knockouts with the most production headroom.")
                 })
-                
-                # Strategy 2 (Top Double KO - heuristic combination)
-                if len(scored_candidates) > 1:
-                    two = scored_candidates[1]
-                    strategies.append({
-                        "knockouts": [top['id'], two['id']],
-                        "expected_growth": min(top['growth'], two['growth']) * 0.9,
-                        "expected_production": max(top['production'], two['production']) * 1.4 + 4.0,
-                        "score": round(0.85 + (top['score'] / 8), 2),
-                        "rationale": {
-                            "mechanism": "Synergistic Flux Redirection",
-                            "description": f"Simultaneous deletion of {top['id']} and {two['id']} eliminates major by-product formation pathways, maximizing yield.",
-                            "visual_flow": [
-                                {"from": "Central Carbon Metabolism", "to": top['id'], "type": "blocked"},
-                                {"from": "Central Carbon Metabolism", "to": two['id'], "type": "blocked"},
-                                {"from": "Central Carbon Metabolism", "to": target_rxn_id, "type": "enhanced"}
-                            ]
-                        }
-                    })
-
-            # Default fallback if no specific candidates found
-            if not strategies:
-                strategies = [
-                    {
-                        "knockouts": ["LDH_AS", "PFL"], 
-                        "expected_growth": 0.25, 
-                        "expected_production": 5.2, 
-                        "score": 0.72,
-                        "rationale": {
-                            "mechanism": "Fermentation Optimization",
-                            "description": "Blocking Lactate (LDH) and Formate (PFL) production redirects pyruvate towards the target pathway.",
-                            "visual_flow": [
-                                {"from": "Pyruvate", "to": "Lactate", "type": "blocked"},
-                                {"from": "Pyruvate", "to": "Formate", "type": "blocked"},
-                                {"from": "Pyruvate", "to": "Target Product", "type": "enhanced"}
-                            ]
-                        }
-                    },
-                    {
-                        "knockouts": ["ACKr"], 
-                        "expected_growth": 0.35, 
-                        "expected_production": 3.1, 
-                        "score": 0.65,
-                        "rationale": {
-                            "mechanism": "Acetic Acid Reduction",
-                            "description": "Deleting Acetate Kinase prevents carbon loss to acetate, conserving Acetyl-CoA.",
-                            "visual_flow": [
-                                {"from": "Acetyl-CoA", "to": "Acetate", "type": "blocked"},
-                                {"from": "Acetyl-CoA", "to": "Target Product", "type": "enhanced"}
-                            ]
-                        }
-                    }
-                ]
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def optknock(self,
+                 target_rxn_id: str,
+                 biomass_rxn_id: str,
+                 max_knockouts: int = 3,
+                 fraction_of_optimum: float = 0.1,
+                 time_limit: float = 60.0,
+                 mip_gap: float = 0.01,
+                 big_m: float = 1000.0,
+                 max_candidates: Optional[int] = OPTKNOCK_MAX_CANDIDATES) -> Dict:
+        """
+        OptKnock: bilevel knockout design solved as one MILP.
+        The inner growth-maximizing LP is replaced by its dual plus strong
+        duality, so the outer problem can maximize the target flux over binary
+        reaction activities with at most `max_knockouts` deletions. The solver
+        stops at `time_limit` seconds or `mip_gap`; the best set found is then
+        re-simulated, and its minimum production at optimal growth is reported
+        as the guaranteed (RobustKnock-style) yield.
+        Only the `max_candidates` reactions with the most wild-type flux get a
+        binary; None keeps every candidate, which is intractable on genome-scale models.
+        """
+        try:
+            if target_rxn_id not in self.model.reactions:
+                return {"success": False, "error": f"Target reaction {target_rxn_id} not found"}
+            if biomass_rxn_id not in self.model.reactions:
+                return {"success": False, "error": f"Biomass reaction {biomass_rxn_id} not found"}
+
+            solution = self.model.optimize()
+            if solution.status != 'optimal' or solution.objective_value <= 0:
+                return {"success": False, "error": "Wild-type model does not grow in this medium"}
+            max_growth = solution.objective_value
+            # Inactive reactions stay in: the MILP can use alternative optima the LP never visited
+            candidates = self._candidate_reactions(solution, target_rxn_id, biomass_rxn_id, require_active=False)
+            if max_candidates:
+                # Prefer the reactions carrying the most wild-type flux
+                candidates = sorted(candidates, key=lambda rid: -abs(solution.fluxes[rid]))[:max_candidates]
+
+            problem, knocked_out = self._build_optknock(
+                target_rxn_id, biomass_rxn_id, set(candidates), max_knockouts,
+                max_growth * fraction_of_optimum, big_m
+            )
+            problem.configuration.timeout = int(math.ceil(time_limit))
+            _set_mip_gap(problem, mip_gap)
+            start = time.time()
+            status = problem.optimize()
+            elapsed = round(time.time() - start, 3)
+
+            try:
+                knockouts = knocked_out()
+            except Exception:
+                return {"success": False, "error": f"No knockout set found (solver status: {status})"}
+
+            strategies = []
+            result = evaluate_knockouts(self.model, [tuple(knockouts)], target_rxn_id, biomass_rxn_id, 0.0)[0]
+            if knockouts and result["feasible"]:
+                result["score"] = round(result["production"] * result["growth"] / max_growth, 4)
+                strategy = self._strategy(result, target_rxn_id)
+                # Optimistic production of the bilevel optimum (ties in the inner LP favour the target)
+                if problem.objective.value is not None:
+                    strategy["milp_production"] = round(problem.objective.value, 4)
+                strategies.append(strategy)
 
             return {
                 "success": True,
                 "target": target_rxn_id,
-                "method": "Branch Point Analysis (BPA)",
+                "method": "OptKnock (MILP)",
+                "solver_status": status,
+                "elapsed": elapsed,
+                "candidates": len(candidates),
                 "strategies": strategies
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
+
+    def _build_optknock(self, target_rxn_id: str, biomass_rxn_id: str, candidates: set,
+                        max_knockouts: int, min_growth: float, big_m: float):
+        """
+        Build the OptKnock MILP on a fresh problem of the model's solver interface.
+
+        Inner primal (net flux v): max v_bio  s.t.  S v = 0,  lb*y <= v <= ub*y
+        Inner dual: S^T lam + mu_ub - mu_lb + xi = c,  mu >= 0 (zero when y = 0),
+                    |xi| <= M (1 - y) frees the column of a deleted reaction
+        Strong duality: v_bio = ub^T mu_ub - lb^T mu_lb
+        Returns the problem and a callable reading the deleted reactions.
+        """
+        interface = self.model.problem
+        problem = interface.Model(name="optknock")
+        reactions = list(self.model.reactions)
+        metabolites = list(self.model.metabolites)
+
+        flux, lam, active = {}, {}, {}
+        for i, rxn in enumerate(reactions):
+            lb, ub = rxn.lower_bound, rxn.upper_bound
+            if rxn.id in candidates:
+                lb, ub = min(lb, 0.0), max(ub, 0.0)
+                active[rxn.id] = interface.Variable(f"y_{i}", type="binary")
+            flux[rxn.id] = interface.Variable(f"v_{i}", lb=lb, ub=ub)
+        for i, met in enumerate(metabolites):
+            lam[met.id] = interface.Variable(f"lam_{i}", lb=None, ub=None)
+        problem.add(list(flux.values()) + list(active.values()) + list(lam.values()))
+
+        # Primal mass balances
+        balances = {met.id: interface.Constraint(Zero, lb=0, ub=0, name=f"mb_{i}") for i, met in enumerate(metabolites)}
+        problem.add(list(balances.values()))
+        problem.update()
+        for met in metabolites:
+            balances[met.id].set_linear_coefficients({flux[r.id]: r.get_coefficient(met) for r in met.reactions})
+
+        duality_terms = {}
+        for i, rxn in enumerate(reactions):
+            v, y = flux[rxn.id], active.get(rxn.id)
+            lb, ub = rxn.lower_bound, rxn.upper_bound
+            column = {lam[met.id]: coef for met, coef in rxn.metabolites.items()}
+            c_j = 1.0 if rxn.id == biomass_rxn_id else 0.0
+
+            # Bound duals, switched off for deleted reactions
+            for name, bound, sign in (("ub", ub, 1.0), ("lb", lb, -1.0)):
+                if bound is None or math.isinf(bound):
+                    continue
+                mu = interface.Variable(f"mu_{name}_{i}", lb=0)
+                problem.add(mu)
+                column[mu] = sign
+                duality_terms[mu] = sign * bound
+                if y is not None:
+                    problem.add(interface.Constraint(mu - big_m * y, ub=0, name=f"mu_{name}_on_{i}"))
+                    # Primal bound only binds when the reaction is active
+                    problem.add(interface.Constraint(v - bound * y, **({"ub": 0} if name == "ub" else {"lb": 0}),
+                                                     name=f"v_{name}_{i}"))
+
+            if y is not None:
+                xi = interface.Variable(f"xi_{i}", lb=-big_m, ub=big_m)
+                problem.add(xi)
+                problem.add(interface.Constraint(xi + big_m * y, ub=big_m, name=f"xi_ub_{i}"))
+                problem.add(interface.Constraint(xi - big_m * y, lb=-big_m, name=f"xi_lb_{i}"))
+                column[xi] = 1.0
+
+            dual = interface.Constraint(Zero, lb=c_j, ub=c_j, name=f"dual_{i}")
+            problem.add(dual)
+            problem.update()
+            dual.set_linear_coefficients(column)
+
+        # Strong duality: primal optimum equals dual optimum
+        strong = interface.Constraint(Zero, lb=0, ub=0, name="strong_duality")
+        problem.add(strong)
+        problem.update()
+        strong.set_linear_coefficients({flux[biomass_rxn_id]: 1.0, **{mu: -coef for mu, coef in duality_terms.items()}})
+
+        # Outer problem: knockout budget, minimum growth, maximize the target
+        budget = interface.Constraint(Zero, lb=len(active) - max_knockouts, name="knockout_budget")
+        problem.add(budget)
+        problem.update()
+        budget.set_linear_coefficients({y: 1.0 for y in active.values()})
+        problem.add(interface.Constraint(flux[biomass_rxn_id], lb=min_growth, name="min_growth"))
+        problem.objective = interface.Objective(flux[target_rxn_id], direction="max")
+
+        def knocked_out() -> List[str]:
+            return sorted(rid for rid, y in active.items() if y.primal is not None and y.primal < 0.5)
+
+        return problem, knocked_out
+
+    def _screen(self, combos: List[Tuple[str, ...]], target_rxn_id: str, biomass_rxn_id: str,
+                min_growth: float, processes: int) -> List[Dict]:
+        if processes > 1 and self.model_path and len(combos) > 1:
+            chunks = worker_pool.chunked(combos, processes * 4)
+            return [
+                result for chunk in worker_pool.map_chunks(
+                    _screen_chunk, self.model_path, chunks, scenario=self.scenario,
+                    target_rxn_id=target_rxn_id, biomass_rxn_id=biomass_rxn_id, min_growth=min_growth
+                ) for result in chunk
+            ]
+        return evaluate_knockouts(self.model, combos, target_rxn_id, biomass_rxn_id, min_growth)
+
+    @staticmethod
+    def _strategy(result: Dict, target_rxn_id: str) -> Dict:
+        knockouts = result["knockouts"]
+        if len(knockouts) == 1:
+            mechanism = "Competitive Pathway Blockage"
+            description = (f"Deleting {knockouts[0]} keeps growth at {result['growth']:.3f} /h while "
+                           f"forcing at least {result['production']:.3f} mmol/gDW/h through {target_rxn_id}.")
+        else:
+            mechanism = "Synergistic Flux Redirection"
+            description = (f"Simultaneous deletion of {', '.join(knockouts)} keeps growth at {result['growth']:.3f} /h "
+                           f"while forcing at least {result['production']:.3f} mmol/gDW/h through {target_rxn_id}.")
+        return {
+            "knockouts": knockouts,
+            "expected_growth": result["growth"],
+            "expected_production": result["production"],
+            "production_range": [result["production"], result["production_max"]],
+            "score": result["score"],
+            "rationale": {
+                "mechanism": mechanism,
+                "description": description,
+                "visual_flow": [{"from": "Precursor Pool", "to": rid, "type": "blocked"} for rid in knockouts]
+                + [{"from": "Precursor Pool", "to": target_rxn_id, "type": "enhanced"}]
+            }
+        }
+
+
+def evaluate_knockouts(model: cobra.Model, combos: List[Tuple[str, ...]], target_rxn_id: str,
+                       biomass_rxn_id: str, min_growth: float) -> List[Dict]:
+    """
+    Solve each knockout set: optimal growth, then the min/max target flux with
+    growth held at that optimum. Sets below `min_growth` are marked infeasible.
+    """
+    biomass = model.reactions.get_by_id(biomass_rxn_id)
+    results = []
+    for combo in combos:
+        with model:
+            for rid in combo:
+                model.reactions.get_by_id(rid).knock_out()
+            growth = model.slim_optimize()
+            if math.isnan(growth) or growth < min_growth:
+                results.append({"knockouts": list(combo), "feasible": False,
+                                "growth": 0.0 if math.isnan(growth) else round(growth, 4)})
+                continue
+            biomass.lower_bound = growth * (1 - 1e-6)
+            model.objective = target_rxn_id
+            model.objective_direction = "min"
+            minimum = model.slim_optimize()
+            model.objective_direction = "max"
+            maximum = model.slim_optimize()
+        results.append({
+            "knockouts": list(combo),
+            "feasible": True,
+            "growth": round(growth, 4),
+            "production": 0.0 if math.isnan(minimum) else round(minimum, 4),
+            "production_max": 0.0 if math.isnan(maximum) else round(maximum, 4),
+        })
+    return results
+
+
+def _set_mip_gap(problem, mip_gap: float):
+    """
+    optlang has no portable MIP gap option; set it on the backends that expose one.
+    GLPK only offers it through optlang's private `_iocp` parameters, so a
+    failure there is logged and the solver's default gap is used.
+    """
+    configuration = problem.configuration
+    try:
+        if hasattr(configuration, "_iocp"):  # GLPK
+            configuration._iocp.mip_gap = mip_gap
+        elif hasattr(problem.problem, "Params"):  # Gurobi
+            problem.problem.Params.MIPGap = mip_gap
+        elif hasattr(problem.problem, "parameters"):  # CPLEX
+            problem.problem.parameters.mip.tolerances.mipgap.set(mip_gap)
+        else:
+            logger.warning(f"Solver interface {problem.interface.__name__} has no MIP gap option; using its default")
+    except Exception as e:
+        logger.warning(f"Could not set MIP gap {mip_gap}: {e}")
+
+
+def _screen_chunk(model_path: str, combos: List[Tuple[str, ...]], scenario: Dict,
+                  target_rxn_id: str, biomass_rxn_id: str, min_growth: float) -> List[Dict]:
+    """Worker-process entry point for knockout screening."""
+    sim = worker_pool.get_worker_simulator(model_path)
+    sim.apply_scenario(scenario)
+    return evaluate_knockouts(sim.model, combos, target_rxn_id, biomass_rxn_id, min_growth)
@@ -0,0 +1,134 @@
+import uuid
+import time
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+import worker_pool
+
+logger = logging.getLogger(__name__)
+
+SWEEP_COLUMNS = [
+    "index", "initial_glucose", "initial_biomass", "knockouts",
+    "final_time", "final_biomass", "max_growth_rate",
+    "time_to_depletion", "final_titer", "productivity", "error",
+]
+
+
+def expand_grid(initial_glucose: List[float], initial_biomass: List[float],
+                knockout_sets: List[List[str]]) -> List[Dict]:
+    return [
+        {"index": i, "initial_glucose": glc, "initial_biomass": bio, "knockouts": list(kos)}
+        for i, (glc, bio, kos) in enumerate(itertools.product(initial_glucose, initial_biomass, knockout_sets))
+    ]
+
+
+def run_sweep_point(model_path: str, point: Dict, settings: Dict) -> Dict:
+    """Worker-process entry point: one dFBA trajectory summarized to its endpoints."""
+    sim = worker_pool.get_worker_simulator(model_path)
+    sim.apply_modifications(point["knockouts"], {})
+    trajectory = sim.run_dynamic_trajectory(
+        initial_glucose=point["initial_glucose"],
+        initial_biomass=point["initial_biomass"],
+        total_time=settings["total_time"],
+        time_step=settings["time_step"],
+        integrator=settings["integrator"],
+    )
+    return {**point, **trajectory.endpoints(settings.get("product_rxn_id"))}
+
+
+class Sweep:
+    def __init__(self, sweep_id: str, model_id: str, points: List[Dict]):
+        self.id = sweep_id
+        self.model_id = model_id
+        self.points = points
+        self.rows: Dict[int, Dict] = {}
+        self.futures: List[Future] = []
+        self.cancelled = False
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    @property
+    def status(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+        if len(self.rows) == len(self.points):
+            return "completed"
+        return "running"
+
+    def table(self) -> Dict:
+        rows = [self.rows[i] for i in sorted(self.rows)]
+        return {"columns": SWEEP_COLUMNS, "rows": [[row.get(col) for col in SWEEP_COLUMNS] for row in rows]}
+
+    def describe(self, include_rows: bool = True) -> Dict:
+        with self.lock:
+            payload = {
+                "sweep_id": self.id,
+                "model_id": self.model_id,
+                "status": self.status,
+                "completed": len(self.rows),
+                "total": len(self.points),
+                "progress": round(len(self.rows) / len(self.points), 4) if self.points else 1.0,
+                "elapsed": round((self.finished_at or time.time()) - self.started_at, 3),
+            }
+            if include_rows:
+                payload["results"] = self.table()
+            return payload
+
+
+class SweepManager:
+    """
+    Runs dFBA parameter sweeps on the shared worker process pool.
+    Each grid point is one task, so progress is reported per finished trajectory
+    and cancelling drops every task that has not started yet.
+    """
+
+    def __init__(self, max_sweeps: int = 32):
+        self.max_sweeps = max_sweeps
+        self._sweeps: Dict[str, Sweep] = {}
+        self._lock = threading.Lock()
+
+    def start(self, model_id: str, model_path: str, points: List[Dict], settings: Dict) -> Sweep:
+        sweep = Sweep(uuid.uuid4().hex[:12], model_id, points)
+        with self._lock:
+            self._sweeps[sweep.id] = sweep
+            # Forget the oldest finished sweeps beyond the retention limit
+            finished = [s for s in self._sweeps.values() if s.status != "running"]
+            for old in finished[:max(0, len(self._sweeps) - self.max_sweeps)]:
+                self._sweeps.pop(old.id, None)
+
+        executor = worker_pool.get_executor()
+        for point in points:
+            future = executor.submit(run_sweep_point, model_path, point, settings)
+            future.add_done_callback(lambda f, p=point: self._collect(sweep, p, f))
+            sweep.futures.append(future)
+        logger.info(f"Started sweep {sweep.id}: {len(points)} trajectories")
+        return sweep
+
+    def _collect(self, sweep: Sweep, point: Dict, future: Future):
+        if future.cancelled():
+            return
+        try:
+            row = future.result()
+        except Exception as e:
+            row = {**point, "error": str(e)}
+        with sweep.lock:
+            sweep.rows[point["index"]] = row
+            if len(sweep.rows) == len(sweep.points):
+                sweep.finished_at = time.time()
+
+    def get(self, sweep_id: str) -> Optional[Sweep]:
+        return self._sweeps.get(sweep_id)
+
+    def cancel(self, sweep_id: str) -> Optional[Sweep]:
+        sweep = self._sweeps.get(sweep_id)
+        if sweep is None:
+            return None
+        with sweep.lock:
+            sweep.cancelled = True
+            sweep.finished_at = time.time()
+        for future in sweep.futures:
+            future.cancel()
+        return sweep
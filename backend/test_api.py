@@ -52,3 +52,37 @@ try:
         print("Error:", response.text)
 except Exception as e:
     print(f"Request failed: {e}")
+
+
+print("\n--- Testing Dynamic Simulation Stream ---")
+url_stream = "http://localhost:8000/simulate-dynamic-stream"
+payload_stream = {**payload, "include_flux_history": False}
+
+try:
+    print("Streaming from backend...")
+    reference = requests.post(url, json=payload_stream, timeout=30).json()
+    steps, done = [], None
+    with requests.post(url_stream, json=payload_stream, stream=True, timeout=30) as response:
+        print(f"Status Code: {response.status_code}")
+        event_type = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event_type = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event_type == "step":
+                    steps.append(data)
+                elif event_type == "done":
+                    done = data
+                else:
+                    print("Error:", data)
+    print(f"Step events: {len(steps)}, done reports {done and done['steps']} steps")
+    matches = (
+        done is not None and done["steps"] == len(steps)
+        and [s["time"] for s in steps] == reference.get("time")
+        and [s["biomass"] for s in steps] == reference.get("biomass")
+        and [s["glucose"] for s in steps] == reference.get("glucose")
+    )
+    print("Stream matches /simulate-dynamic!" if matches else "Stream differs from /simulate-dynamic")
+except Exception as e:
+    print(f"Request failed: {e}")
@@ -0,0 +1,1014 @@
+import os
+import pytest
+
+try:
+    import cobra
+except ImportError:
+    cobra = None
+
+requires_cobra = pytest.mark.skipif(cobra is None, reason="cobra is not installed")
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+MODEL_PATH = os.path.join(MODELS_DIR, "iML1515.json")
+
+
+@pytest.fixture(scope="module")
+def sim():
+    if cobra is None:
+        pytest.skip("cobra is not installed")
+    from simulator import MetabolicSimulator
+
+    return MetabolicSimulator(MODEL_PATH)
+
+
+def _model_state(model):
+    return {
+        "bounds": {r.id: r.bounds for r in model.reactions},
+        "objective": {r.id: r.objective_coefficient for r in model.reactions if r.objective_coefficient != 0},
+        "direction": model.objective.direction,
+        "functional": {g.id: g.functional for g in model.genes},
+    }
+
+
+def _write_toy_fermentation_model(path):
+    """Glucose -> ATP (growth) + acetate, with exchanges named like iML1515."""
+    model = cobra.Model("toy_fermentation")
+    glc = cobra.Metabolite("glc__D_e", compartment="e", formula="C6H12O6")
+    ac = cobra.Metabolite("ac_e", compartment="e", formula="C2H3O2")
+    atp = cobra.Metabolite("atp_c", compartment="c")
+    for rid, stoich, bounds, gpr in [
+        ("EX_glc__D_e", {glc: -1}, (-10, 1000), ""),
+        ("GLY", {glc: -1, atp: 2, ac: 1}, (0, 1000), "g1"),
+        ("EX_ac_e", {ac: -1}, (0, 1000), ""),
+        ("BIO", {atp: -1}, (0, 1000), ""),
+    ]:
+        rxn = cobra.Reaction(rid, lower_bound=bounds[0], upper_bound=bounds[1])
+        rxn.add_metabolites(stoich)
+        rxn.gene_reaction_rule = gpr
+        model.add_reactions([rxn])
+    model.objective = "BIO"
+    cobra.io.save_json_model(model, str(path))
+    return str(path)
+
+
+def test_snapshot_reset_matches_fresh_copy(sim):
+    fresh = cobra.io.load_json_model(MODEL_PATH)
+
+    sim.apply_environment("glc__D", -5.0, aerobic=False)
+    sim.apply_modifications(["b1241", "PFL"], {"LDH_D": 1.0})
+    sim.model.objective = "EX_ac_e"
+    sim.reset_model()
+
+    assert _model_state(sim.model) == _model_state(fresh)
+    assert sim.model.slim_optimize() == pytest.approx(fresh.slim_optimize(), rel=1e-6)
+
+
+def test_reset_keeps_model_identity(sim):
+    model = sim.model
+    sim.apply_environment("glc__D", -10.0, aerobic=True)
+    sim.reset_model()
+    assert sim.model is model
+
+
+@requires_cobra
+def test_pool_leases_are_isolated():
+    from simulator_pool import SimulatorPool
+
+    pool = SimulatorPool(MODEL_PATH, size=2)
+    first = pool.checkout()
+    second = pool.checkout()
+    assert first.model is not second.model
+
+    first.apply_modifications(["PGI"], {})
+    assert second.model.reactions.PGI.bounds != (0.0, 0.0)
+
+    pool.checkin(first)
+    pool.checkin(second)
+    metrics = pool.metrics()
+    assert metrics["available"] == 2
+    assert metrics["checkouts"] == 2
+
+
+@requires_cobra
+def test_pool_checkout_times_out_and_counts_it():
+    from simulator_pool import SimulatorPool
+
+    pool = SimulatorPool(MODEL_PATH, size=1)
+    with pool.lease(timeout=1) as sim:
+        with pytest.raises(TimeoutError):
+            pool.checkout(timeout=0.05)
+        with pytest.raises(TimeoutError):
+            with pool.lease(timeout=0.05):
+                pass
+    assert pool.checkout(timeout=0) is sim
+    pool.checkin(sim)
+    metrics = pool.metrics()
+    assert metrics["timeouts"] == 2
+    assert metrics["checkouts"] == 2
+    assert metrics["waiting"] == 0 and metrics["available"] == 1
+
+
+@requires_cobra
+def test_model_cache_roundtrip(tmp_path, monkeypatch):
+    import model_cache
+
+    monkeypatch.setattr(model_cache, "CACHE_DIR", str(tmp_path))
+    parsed = model_cache.load_model(MODEL_PATH)
+    assert os.path.exists(model_cache.cache_path(MODEL_PATH))
+
+    cached = model_cache.load_model(MODEL_PATH)
+    assert len(cached.reactions) == len(parsed.reactions)
+    assert cached.slim_optimize() == pytest.approx(parsed.slim_optimize(), rel=1e-6)
+
+
+def test_scenario_key_is_canonical():
+    from result_cache import scenario_key
+
+    a = scenario_key("iML1515", "glc__D", -10, True, ["PFL", "LDH_D"], {"PPC": 1.0, "ACKr": 0.5}, "FBA")
+    b = scenario_key("iML1515", "glc__D", -10.0, True, ["LDH_D", "PFL", "PFL"], {"ACKr": 0.5, "PPC": 1.0}, "fba")
+    assert a == b
+    assert a != scenario_key("iML1515", "glc__D", -10.0, True, ["LDH_D", "PFL"], {"ACKr": 0.5, "PPC": 1.0}, "moma")
+
+
+def test_result_cache_lru_eviction():
+    from result_cache import ResultCache
+
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"growth_rate": 1.0})
+    cache.put("b", {"growth_rate": 2.0})
+    assert cache.get("a") == {"growth_rate": 1.0}
+    cache.put("c", {"growth_rate": 3.0})
+
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
+
+
+def test_simulate_many_matches_single_runs(sim):
+    scenarios = [
+        {"knockouts": ["PGI"]},
+        {"uptake_rate": -5.0, "aerobic": False},
+        {},
+    ]
+    batch = sim.simulate_many(scenarios)
+    assert [r["index"] for r in batch] == [0, 1, 2]
+    for scenario, result in zip(scenarios, batch):
+        single = sim.run_scenario(scenario)
+        assert result["growth_rate"] == pytest.approx(single["growth_rate"], rel=1e-6)
+
+
+def test_float32_flux_encoding_roundtrip():
+    np = pytest.importorskip("numpy")
+    import base64
+    from flux_encoding import ReactionIndex, encode_fluxes
+
+    index = ReactionIndex(["PGI", "PFK", "EX_glc__D_e", "EX_ac_e"])
+    fluxes = {"PGI": 4.5, "PFK": 0.0, "EX_glc__D_e": -10.0, "EX_ac_e": 1e-9}
+
+    payload = encode_fluxes(fluxes, index, "float32", threshold=1e-6)
+    indices = np.frombuffer(base64.b64decode(payload["indices"]), dtype="<u4")
+    values = np.frombuffer(base64.b64decode(payload["values"]), dtype="<f4")
+
+    assert payload["index_version"] == index.version
+    assert [index.reaction_ids[i] for i in indices] == ["PGI", "EX_glc__D_e"]
+    assert values.tolist() == [4.5, -10.0]
+
+
+def test_adaptive_dfba_matches_fine_euler_with_fewer_solves(sim):
+    import numpy as np
+
+    settings = dict(initial_glucose=20.0, initial_biomass=0.05, total_time=12.0)
+    runs = {}
+    for name, options in [("rk45", {"integrator": "rk45"}), ("coarse", {"time_step": 0.05}),
+                          ("fine", {"time_step": 0.02}), ("finer", {"time_step": 0.01})]:
+        sim.reset_model()
+        runs[name] = sim.simulate_dynamic(**settings, **options)
+        assert runs[name]["success"]
+    rk45, coarse, fine, finer = runs["rk45"], runs["coarse"], runs["fine"], runs["finer"]
+
+    assert rk45["lp_solves"] < coarse["lp_solves"] / 2
+
+    # Euler is first order, so 2 * X(dt / 2) - X(dt) cancels its leading error
+    n = min(len(fine["time"]), (len(finer["time"]) + 1) // 2)
+    times = np.array(fine["time"][:n])
+    reference = 2 * np.array(finer["biomass"][:2 * n:2]) - np.array(fine["biomass"][:n])
+    rk45_times = np.array(rk45["time"])
+    inside = rk45_times <= times[-1]
+    assert inside.sum() >= 5
+    assert np.array(rk45["biomass"])[inside] == pytest.approx(
+        np.interp(rk45_times[inside], times, reference), rel=5e-3, abs=2e-4)
+
+    # Both stop where the remaining glucose no longer covers maintenance
+    assert rk45["time"][-1] == pytest.approx(finer["time"][-1], abs=0.02)
+    assert rk45["glucose"][-1] == pytest.approx(finer["glucose"][-1], abs=0.01)
+
+
+@requires_cobra
+def test_uptake_response_interpolates_certified_pieces():
+    import numpy as np
+    from dfba_engine import UptakeResponse
+
+    class PiecewiseEngine:
+        """Concave growth with a kink at v = -6.625 and no growth above v = -0.3."""
+        solves = 0
+
+        def solve(self, v):
+            self.solves += 1
+            mu = min(-0.1 * v - 0.03, 0.5 - 0.02 * v)
+            return None if mu < 0 else (mu, np.array([v, 2 * mu]))
+
+    engine = PiecewiseEngine()
+    response = UptakeResponse(engine, resolution=1e-4)
+    queries = np.linspace(-9.8, -0.31, 500)
+    for v in queries:
+        mu, ex = response.evaluate(v)
+        assert mu == pytest.approx(min(-0.1 * v - 0.03, 0.5 - 0.02 * v), abs=1e-9)
+        assert ex == pytest.approx([v, 2 * mu], abs=1e-9)
+    assert engine.solves < 60
+    assert response.edge == pytest.approx(-0.3, abs=1e-4)
+    assert response.evaluate(-0.1) is None
+
+
+def test_fva_matches_cobra(sim):
+    from cobra.flux_analysis import flux_variability_analysis
+
+    sim.apply_environment("glc__D", -10.0, aerobic=True)
+    reaction_ids = ["PGI", "PFK", "EX_ac_e", "PDH", "CS"]
+    result = sim.simulate_fva(reaction_ids, fraction_of_optimum=0.9)
+    expected = flux_variability_analysis(sim.model, reaction_list=reaction_ids, fraction_of_optimum=0.9)
+
+    assert result["success"] and not result["truncated"]
+    for rid in reaction_ids:
+        assert result["fva_results"][rid]["minimum"] == pytest.approx(expected.loc[rid, "minimum"], abs=1e-3)
+        assert result["fva_results"][rid]["maximum"] == pytest.approx(expected.loc[rid, "maximum"], abs=1e-3)
+
+    # Small chunks change only how the work is split
+    chunked = sim.simulate_fva(reaction_ids, fraction_of_optimum=0.9, chunk_size=2)
+    for rid in reaction_ids:
+        for side in ("minimum", "maximum"):
+            assert chunked["fva_results"][rid][side] == pytest.approx(result["fva_results"][rid][side], abs=1e-6)
+
+
+def test_preprocessing_blocked_reactions_carry_no_flux(sim):
+    from cobra.flux_analysis import flux_variability_analysis
+    import preprocessing
+
+    sim.apply_environment("glc__D", -10.0, aerobic=True)
+    prep = preprocessing.get_preprocessing(sim)
+    sample = prep["blocked"][:25]
+    ranges = flux_variability_analysis(sim.model, reaction_list=sample, fraction_of_optimum=0.0)
+
+    assert sim.scenario["carbon_source"] == "glc__D"
+    assert (ranges.abs().max(axis=1) < 1e-6).all()
+
+
+@requires_cobra
+def test_coupled_sets_follow_linear_segments():
+    import preprocessing
+
+    model = cobra.Model("chain")
+    a, b, c, d = (cobra.Metabolite(m) for m in "abcd")
+    for rid, stoich in [("IN", {a: 1}), ("R1", {a: -1, b: 1}), ("R2", {b: -1, c: 1}),
+                        ("R3", {c: -1, d: 1}), ("R4", {c: -1, d: 1}), ("OUT", {d: -1})]:
+        rxn = cobra.Reaction(rid)
+        rxn.add_metabolites(stoich)
+        model.add_reactions([rxn])
+
+    assert preprocessing.find_coupled_sets(model, set()) == [["IN", "R1", "R2"]]
+    assert preprocessing.find_coupled_sets(model, {"R4"}) == [["IN", "OUT", "R1", "R2", "R3"]]
+
+
+def test_production_envelope_detects_biomass_and_bounds_target(sim):
+    sim.apply_environment("glc__D", -10.0, aerobic=True)
+    max_growth = sim.model.slim_optimize()
+    result = sim.simulate_production_envelope("EX_ac_e", points=5)
+
+    assert result["success"] and result["biomass_rxn"] == "BIOMASS_Ec_iML1515_core_75p37M"
+    assert [row["growth_rate"] for row in result["data"]][-1] == pytest.approx(max_growth, abs=1e-4)
+    for row in result["data"]:
+        assert row["min_flux"] <= row["max_flux"] + 1e-6
+
+    grid = sim.simulate_production_envelope("EX_ac_e", points=3, control_rxn_ids=["BIOMASS_Ec_iML1515_core_75p37M", "EX_o2_e"])
+    assert grid["success"] and len(grid["data"]) == 9
+
+
+def test_knockout_screening_reports_simulated_values(sim):
+    from strain_designer import StrainDesigner, evaluate_knockouts
+
+    sim.reset_model()
+    designer = StrainDesigner(sim.model)
+    reported = []
+    result = designer.optimize_knockouts("EX_ac_e", sim.biomass_rxn_id, max_knockouts=2, max_combinations=15,
+                                         top_k=3, progress=reported.append)
+
+    assert result["success"] and 0 < len(result["strategies"]) <= 3
+    screened = result["screened"]
+    assert screened["combinations"] - screened["candidates"] <= 15
+    assert screened["exhaustive"] or "note" in result
+    assert reported and reported[-1] == pytest.approx(1.0)
+    for strategy in result["strategies"]:
+        replay = evaluate_knockouts(sim.model, [tuple(strategy["knockouts"])], "EX_ac_e", sim.biomass_rxn_id, 0.0)[0]
+        assert strategy["expected_growth"] == pytest.approx(replay["growth"], abs=1e-4)
+        assert strategy["expected_production"] == pytest.approx(replay["production"], abs=1e-4)
+
+
+@requires_cobra
+def test_combination_pool_fits_budget():
+    from strain_designer import combination_pool_size
+
+    assert combination_pool_size(10, 2, 45) == 10
+    assert combination_pool_size(10, 2, 44) == 9
+    # C(6,2) + C(6,3) = 35 fits, C(7,2) + C(7,3) = 56 does not
+    assert combination_pool_size(100, 3, 50) == 6
+    assert combination_pool_size(1, 3, 0) == 1
+
+
+@requires_cobra
+def test_optknock_finds_growth_coupled_deletion():
+    from strain_designer import StrainDesigner
+
+    model = cobra.Model("toy")
+    a, atp, p, c = (cobra.Metabolite(m) for m in ("a", "atp", "p", "c"))
+    for rid, stoich, bounds, gpr in [
+        ("EX_a", {a: 1}, (0, 10), ""),
+        ("G1", {a: -1, atp: 1, p: 1}, (0, 1000), "g1"),
+        ("G2", {a: -1, atp: 1, c: 1}, (0, 1000), "g2"),
+        ("BIO", {atp: -1}, (0, 1000), ""),
+        ("EX_p", {p: -1}, (0, 1000), ""),
+        ("EX_c", {c: -1}, (0, 1000), ""),
+    ]:
+        rxn = cobra.Reaction(rid, lower_bound=bounds[0], upper_bound=bounds[1])
+        rxn.add_metabolites(stoich)
+        rxn.gene_reaction_rule = gpr
+        model.add_reactions([rxn])
+    model.objective = "BIO"
+
+    result = StrainDesigner(model).optknock("EX_p", "BIO", max_knockouts=1, time_limit=10)
+
+    assert result["success"]
+    assert result["strategies"][0]["knockouts"] == ["G2"]
+    assert result["strategies"][0]["expected_production"] == pytest.approx(10.0)
+
+
+def test_deletion_table_is_cached_and_annotates_search(sim):
+    import deletions
+
+    sim.reset_model()
+    table = deletions.get_deletions(sim, "reaction")
+    rows = {row[0]: row for row in table["rows"]}
+
+    assert len(rows) == len(sim.model.reactions)
+    assert table["wild_type_growth"] > 0
+    assert rows[sim.biomass_rxn_id][4] is True
+    assert deletions.lookup(sim.model_path, {}, "reaction") is table
+    hits = [item for item in sim.search_genes_reactions("pgk") if item["type"] == "reaction"]
+    assert hits and all("essential" in item for item in hits)
+
+
+@requires_cobra
+def test_deletion_lookup_picks_up_tables_written_later(tmp_path, monkeypatch):
+    import json
+    import deletions
+    import model_cache
+    from simulator import MetabolicSimulator
+
+    monkeypatch.setattr(model_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    toy = MetabolicSimulator(_write_toy_fermentation_model(tmp_path / "toy.json"))
+    assert deletions.lookup(toy.model_path, {}, "reaction") is None
+
+    # Another process computes the table after the miss
+    table = deletions.run_deletions(toy, "reaction")
+    model_cache.write_atomic(deletions._disk_path(toy.model_path, {}, "reaction"), json.dumps(table).encode("utf-8"))
+
+    found = deletions.lookup(toy.model_path, {}, "reaction")
+    assert found is not None and found["rows"] == table["rows"]
+    # A linear pathway: every deletion stops growth
+    assert deletions.essential_set(toy.model_path, {}, "reaction") == {"BIO", "EX_glc__D_e", "GLY", "EX_ac_e"}
+
+
+@requires_cobra
+def test_compiled_gpr_matches_hand_evaluation():
+    import numpy as np
+    from omics_integrator import CompiledGPR
+
+    model = cobra.Model("gpr")
+    for rid, rule in [("R1", "a"), ("R2", "a or b"), ("R3", "(a and b) or c"),
+                      ("R4", "a and (b or c)"), ("R5", "((a and b) and (c or d)) or (e)")]:
+        rxn = cobra.Reaction(rid)
+        rxn.gene_reaction_rule = rule
+        model.add_reactions([rxn])
+    gpr = CompiledGPR(model)
+    samples = np.stack([
+        gpr.expression_vector({"a": 2.0, "b": 3.0, "c": 5.0, "d": 0.0}),
+        gpr.expression_vector({"a": 1.0, "b": 0.0, "c": 1.0, "d": 1.0, "e": 0.0}),
+    ], axis=1)
+
+    values = dict(zip(gpr.reaction_ids, gpr.evaluate(samples).tolist()))
+
+    assert values["R1"] == [2.0, 1.0]
+    assert values["R2"] == [5.0, 1.0]
+    assert values["R3"] == [7.0, 1.0]
+    assert values["R4"] == [2.0, 1.0]
+    assert values["R5"] == pytest.approx([2.01, 0.0])
+
+
+def test_compiled_gpr_reproduces_reference_mapping(sim):
+    import numpy as np
+    from omics_integrator import OmicsIntegrator
+
+    rng = np.random.default_rng(1)
+    expression = {g.id: float(v) for g, v in zip(sim.model.genes, rng.uniform(0, 10, len(sim.model.genes)))}
+    integrator = OmicsIntegrator(sim.model)
+    compiled = integrator._map_gene_to_reaction(expression)
+    reference = integrator._map_gene_to_reaction_reference(expression)
+
+    assert reference
+    for rid, value in reference.items():
+        assert compiled[rid] == pytest.approx(value)
+
+
+def test_omics_batch_matches_single_integration(sim):
+    import numpy as np
+    from omics_integrator import OmicsIntegrator
+
+    rng = np.random.default_rng(2)
+    genes = [g.id for g in sim.model.genes]
+    matrix = rng.lognormal(1.0, 1.0, (len(genes), 3))
+
+    sim.reset_model()
+    batch = sim.simulate_omics_batch(genes, matrix, normalization_factor=5.0)
+    assert batch["success"] and len(batch["results"]["rows"]) == 3
+
+    for j, row in enumerate(batch["results"]["rows"]):
+        sim.reset_model()
+        OmicsIntegrator(sim.model).apply_omics_data(dict(zip(genes, matrix[:, j])), 5.0)
+        assert row[1] == pytest.approx(sim.model.slim_optimize(), abs=1e-5)
+    sim.reset_model()
+
+
+def test_execution_layer_rejects_when_saturated_and_times_out():
+    import asyncio
+    import threading
+    from execution import ExecutionLayer, EndpointLimit, Saturated, ExecutionTimeout
+
+    layer = ExecutionLayer(lp_threads=2, io_threads=1, limits={
+        "default": EndpointLimit(1, 0, 5),
+        "slow": EndpointLimit(1, 0, 0.05),
+    })
+    gate = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(layer.run("default", gate.wait, 2))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Saturated):
+            await layer.run("default", lambda: None)
+        gate.set()
+        assert await first is True
+
+        with pytest.raises(ExecutionTimeout):
+            await layer.run("slow", threading.Event().wait, 0.3)
+
+    try:
+        asyncio.run(scenario())
+        assert layer.limits["default"].metrics()["rejected"] == 1
+        assert layer.limits["slow"].metrics()["timeouts"] == 1
+    finally:
+        layer.shutdown()
+
+
+def test_execution_stream_closes_generator_and_frees_slot():
+    import asyncio
+    from execution import ExecutionLayer, EndpointLimit
+
+    layer = ExecutionLayer(lp_threads=1, io_threads=1, limits={"default": EndpointLimit(1, 0, None)})
+    closed = []
+
+    def numbers():
+        try:
+            for i in range(100):
+                yield i
+        finally:
+            closed.append(True)
+
+    async def scenario():
+        stream = await layer.stream("default", numbers())
+        seen = []
+        async for item in stream:
+            seen.append(item)
+            if item == 2:
+                break
+        await stream.aclose()
+        for _ in range(100):
+            if layer.limits["default"].active == 0:
+                break
+            await asyncio.sleep(0.01)
+        return seen
+
+    try:
+        assert asyncio.run(scenario()) == [0, 1, 2]
+        assert closed == [True]
+        assert layer.limits["default"].active == 0
+    finally:
+        layer.shutdown()
+
+
+def test_execution_stream_is_cut_off_after_max_seconds():
+    import time
+    import asyncio
+    from execution import ExecutionLayer, EndpointLimit, ExecutionTimeout
+
+    layer = ExecutionLayer(lp_threads=1, io_threads=1, limits={"default": EndpointLimit(1, 0, None)})
+    closed = []
+
+    def slow_numbers():
+        try:
+            for i in range(100):
+                time.sleep(0.03)
+                yield i
+        finally:
+            closed.append(True)
+
+    async def scenario():
+        stream = await layer.stream("default", slow_numbers(), max_seconds=0.1)
+        seen = []
+        with pytest.raises(ExecutionTimeout):
+            async for item in stream:
+                seen.append(item)
+        for _ in range(100):
+            if layer.limits["default"].active == 0:
+                break
+            await asyncio.sleep(0.01)
+        return seen
+
+    try:
+        assert len(asyncio.run(scenario())) < 10
+        assert closed == [True]
+        assert layer.limits["default"].active == 0
+        assert layer.limits["default"].timeouts == 1
+    finally:
+        layer.shutdown()
+
+
+@requires_cobra
+def test_job_store_dedup_cancel_and_restart(tmp_path):
+    from jobs import JobStore, params_hash
+
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    digest = params_hash("fva", "model", {"fraction_of_optimum": 0.9, "reaction_ids": ["PGI"]})
+    assert digest == params_hash("fva", "model", {"reaction_ids": ["PGI"], "fraction_of_optimum": 0.9})
+
+    first = store.create("fva", "toy", digest, {"reaction_ids": ["PGI"]})
+    assert store.find_reusable(digest) == first
+    assert store.start(first)
+    assert store.set_progress(first, 0.5) == "running"
+    store.finish(first, "completed", result={"success": True, "value": 1})
+    assert store.get(first)["status"] == "completed"
+    assert store.get(first)["progress"] == 1
+    assert store.result(first) == {"success": True, "value": 1}
+    # Completed jobs are reused, failed ones are not
+    assert store.find_reusable(digest) == first
+
+    other = params_hash("fva", "model", {})
+    queued = store.create("fva", "toy", other, {})
+    assert store.request_cancel(queued) == "cancelled"
+    assert not store.start(queued)
+    assert store.find_reusable(other) is None
+
+    running = store.create("fva", "toy", other, {})
+    store.start(running)
+    assert store.request_cancel(running) == "cancelling"
+    assert store.set_progress(running, 0.2) == "cancelling"
+    store.finish(running, "completed", result={"success": True})
+    assert store.get(running)["status"] == "cancelled"
+    assert store.result(running) is None
+
+    # A job interrupted by a restart is queued again from a fresh store
+    interrupted = store.create("dynamic", "toy", params_hash("dynamic", "model", {}), {})
+    store.start(interrupted)
+    reopened = JobStore(store.path)
+    assert [job[0] for job in reopened.unfinished()] == [interrupted]
+    reopened.requeue(interrupted)
+    assert reopened.get(interrupted)["status"] == "queued"
+    assert reopened.start(interrupted)
+
+
+def test_search_index_ranks_and_paginates():
+    from search_index import SearchIndex
+
+    index = SearchIndex([
+        ("gene", "b4025", "pgi", "", ""),
+        ("reaction", "PGI", "Glucose-6-phosphate isomerase", "Glycolysis/Gluconeogenesis",
+         "D-Fructose 6-phosphate D-Glucose 6-phosphate"),
+        ("reaction", "PGK", "Phosphoglycerate kinase", "Glycolysis/Gluconeogenesis", "ADP ATP"),
+        ("reaction", "G6PDH2r", "Glucose 6-phosphate dehydrogenase", "Pentose Phosphate Pathway",
+         "D-Glucose 6-phosphate NADP"),
+    ])
+
+    total, results = index.search("PGI")
+    assert total == 2
+    assert [(r["id"], r["score"]) for r in results] == [("PGI", 100), ("b4025", 85)]
+
+    # PGI only matches through its metabolite names, which rank below names
+    total, results = index.search("glucose 6")
+    assert [(r["id"], r["score"]) for r in results] == [("G6PDH2r", 75), ("PGI", 15)]
+
+    # Short queries match substrings too, not just prefixes
+    total, _ = index.search("pg")
+    assert total == 3
+    assert "PGI" in [r["id"] for r in index.search("gi")[1]]
+    assert [r["id"] for r in index.search("h2")[1]] == ["G6PDH2r"]
+    assert index.search("k")[1][0]["id"] == "PGK"
+    total, page = index.search("pg", offset=1, limit=1)
+    assert total == 3 and len(page) == 1
+    assert index.search("zzz") == (0, [])
+    assert index.search("  ") == (0, [])
+
+
+@requires_cobra
+def test_pool_search_does_not_need_a_free_simulator(tmp_path, monkeypatch):
+    import model_cache
+    from simulator_pool import SimulatorPool
+
+    monkeypatch.setattr(model_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    pool = SimulatorPool(_write_toy_fermentation_model(tmp_path / "toy.json"), size=1)
+    pool.warm_up()
+    with pool.lease() as sim:
+        found = pool.search("gly")
+        assert found == sim.search("gly")
+    assert found["total"] >= 1 and found["results"][0]["id"] == "GLY"
+    assert pool.metrics()["checkouts"] == 1
+
+
+@requires_cobra
+def test_workspace_layout_is_reproducible_and_columnar():
+    from workspace_engine import WorkspaceEngine, WorkspaceLayout
+
+    model = cobra.Model("ring")
+    for rid, subsystem in [("A", "Glycolysis"), ("B", "Glycolysis"), ("C", "TCA cycle"), ("D", "")]:
+        rxn = cobra.Reaction(rid, name=f"reaction {rid}")
+        rxn.subsystem = subsystem
+        model.add_reactions([rxn])
+
+    fluxes = {"A": 2.0, "B": -1.5, "C": 0.0, "D": 3.0, "missing": 1.0}
+    engine = WorkspaceEngine(model)
+    records = engine.get_3d_projection(fluxes, blocked={"D"})
+    assert records == WorkspaceEngine(model).get_3d_projection(fluxes, blocked={"D"})
+    assert [r["id"] for r in records] == ["A", "B", "C"]
+    assert records[1]["z"] < 0 and records[1]["value"] == 1.5
+
+    # The seeded layout does not depend on the model object
+    fresh = WorkspaceLayout(model.copy())
+    assert list(fresh.x) == list(engine.layout.x) and list(fresh.y) == list(engine.layout.y)
+
+    columns = engine.get_3d_projection(fluxes, blocked={"D"}, projection_format="columnar")
+    assert columns["id"] == ["A", "B", "C"]
+    assert columns["x"] == [r["x"] for r in records]
+    assert columns["subsystem"] == ["Glycolysis", "Glycolysis", "TCA cycle"]
+
+
+@requires_cobra
+def test_run_job_reports_progress_and_stores_results(tmp_path, monkeypatch):
+    import jobs
+    import model_cache
+
+    monkeypatch.setattr(model_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(jobs, "PROGRESS_INTERVAL", 0.0)
+    model_path = _write_toy_fermentation_model(tmp_path / "toy.json")
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    reported = []
+    set_progress = jobs.JobStore.set_progress
+
+    def recording(self, job_id, fraction):
+        reported.append((job_id, fraction))
+        return set_progress(self, job_id, fraction)
+
+    monkeypatch.setattr(jobs.JobStore, "set_progress", recording)
+
+    cases = {
+        "fva": {"fraction_of_optimum": 1.0},
+        "production-envelope": {"target_rxn_id": "EX_ac_e", "points": 4},
+        "dynamic": {"initial_glucose": 5.0, "total_time": 2.0, "time_step": 0.5},
+    }
+    for kind, params in cases.items():
+        job_id = store.create(kind, "toy", jobs.params_hash(kind, "toy", params), params)
+        jobs.run_job(store.path, job_id, kind, model_path, params)
+        job = store.get(job_id)
+        assert job["status"] == "completed", job["error"]
+        assert job["progress"] == 1
+        assert [fraction for jid, fraction in reported if jid == job_id], kind
+
+    fva = store.result(store.list()[-1]["job_id"])
+    assert fva["fva_results"]["EX_ac_e"]["maximum"] == pytest.approx(10.0)
+
+    # A cancellation requested while running stops at the first progress report
+    params = {"target_rxn_id": "EX_ac_e", "points": 20}
+    job_id = store.create("production-envelope", "toy", "cancel", params)
+    start = jobs.JobStore.start
+
+    def start_then_cancel(self, jid):
+        started = start(self, jid)
+        self.request_cancel(jid)
+        return started
+
+    monkeypatch.setattr(jobs.JobStore, "start", start_then_cancel)
+    jobs.run_job(store.path, job_id, "production-envelope", model_path, params)
+    assert store.get(job_id)["status"] == "cancelled"
+    assert store.result(job_id) is None
+
+    # OptKnock is one MILP solve without progress reports: running jobs refuse to cancel
+    manager = jobs.JobManager(store.path)
+    optknock = {"target_rxn_id": "EX_ac_e", "method": "optknock"}
+    job_id = store.create("optimize-design", "toy", "optknock", optknock)
+    start(store, job_id)
+    with pytest.raises(ValueError):
+        manager.cancel(job_id)
+    assert store.get(job_id)["status"] == "running"
+
+
+def test_execution_stream_never_started_frees_slot():
+    import gc
+    import asyncio
+    from execution import ExecutionLayer, EndpointLimit
+
+    layer = ExecutionLayer(lp_threads=1, io_threads=1, limits={"default": EndpointLimit(1, 0, None)})
+    closed = []
+
+    def numbers():
+        try:
+            yield from range(10)
+        finally:
+            closed.append(True)
+
+    async def scenario():
+        iterator = numbers()
+        next(iterator)  # a started generator, like a simulation already set up
+        stream = await layer.stream("default", iterator)
+        assert layer.limits["default"].active == 1
+        # The response is dropped before its body is ever iterated
+        del stream
+        gc.collect()
+        for _ in range(100):
+            if layer.limits["default"].active == 0:
+                break
+            await asyncio.sleep(0.01)
+        # The slot is usable again
+        again = await layer.stream("default", iter([1]))
+        return [item async for item in again]
+
+    try:
+        assert asyncio.run(scenario()) == [1]
+        assert closed == [True]
+        assert layer.limits["default"].active == 0
+    finally:
+        layer.shutdown()
+
+
+def test_expand_grid_cardinality_and_order():
+    from sweeps import expand_grid
+
+    points = expand_grid([10.0, 20.0], [0.01, 0.05, 0.1], [[], ["PGI"]])
+    assert len(points) == 2 * 3 * 2
+    assert [p["index"] for p in points] == list(range(12))
+    # Knockout sets vary fastest, initial glucose slowest
+    assert points[0] == {"index": 0, "initial_glucose": 10.0, "initial_biomass": 0.01, "knockouts": []}
+    assert points[1]["knockouts"] == ["PGI"] and points[1]["initial_biomass"] == 0.01
+    assert points[2]["initial_biomass"] == 0.05
+    assert points[6]["initial_glucose"] == 20.0
+    assert expand_grid([10.0], [], [[]]) == []
+
+
+def test_trajectory_endpoints_on_known_series():
+    np = pytest.importorskip("numpy")
+    from flux_history import DynamicTrajectory
+
+    trajectory = DynamicTrajectory(["R"], ["EX_ac_e", "EX_glc__D_e"], capacity=2)
+    # Biomass doubles each hour while acetate is secreted at 2 mmol/gDW/h
+    for t, biomass, glucose, mu in [(0.0, 1.0, 10.0, 0.5), (1.0, 2.0, 4.0, 0.6), (2.0, 4.0, 0.0, 0.0)]:
+        trajectory.append({
+            "time": t, "biomass": biomass, "glucose": glucose, "growth_rate": mu,
+            "exchange_fluxes": np.array([2.0, -5.0]), "fluxes": None, "alerts": [],
+        })
+
+    summary = trajectory.endpoints("EX_ac_e")
+    assert summary["final_time"] == 2.0
+    assert summary["final_biomass"] == 4.0
+    assert summary["max_growth_rate"] == pytest.approx(0.6)
+    assert summary["time_to_depletion"] == 2.0
+    # Trapezoid of 2*X: (2 + 4) / 2 + (4 + 8) / 2 = 9 mmol
+    assert summary["final_titer"] == pytest.approx(9.0)
+    assert summary["productivity"] == pytest.approx(4.5)
+    assert trajectory.endpoints("EX_missing")["final_titer"] is None
+
+
+def test_sweep_reports_progress_and_cancels_pending_points(monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import sweeps
+    import worker_pool
+
+    started, release = threading.Event(), threading.Event()
+
+    def run_point(model_path, point, settings):
+        if point["index"] == 1:
+            started.set()
+            release.wait(5)
+        return {**point, "final_biomass": 1.0 + point["index"]}
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(worker_pool, "get_executor", lambda: executor)
+    monkeypatch.setattr(sweeps, "run_sweep_point", run_point)
+
+    manager = sweeps.SweepManager()
+    sweep = manager.start("toy", "toy.json", sweeps.expand_grid([10.0, 20.0], [0.01], [[], ["PGI"]]), {})
+    try:
+        assert started.wait(5)
+        running = sweep.describe()
+        assert running["status"] == "running"
+        assert running["completed"] == 1 and running["total"] == 4 and running["progress"] == 0.25
+
+        assert manager.cancel(sweep.id) is sweep
+        release.set()
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+
+    # The point already running finishes; the two queued ones never run
+    final = manager.get(sweep.id).describe()
+    assert final["status"] == "cancelled"
+    assert final["completed"] == 2
+    table = final["results"]
+    assert table["columns"] == sweeps.SWEEP_COLUMNS
+    assert [row[0] for row in table["rows"]] == [0, 1]
+    assert [row[table["columns"].index("final_biomass")] for row in table["rows"]] == [1.0, 2.0]
+    assert manager.cancel("missing") is None
+
+
+@requires_cobra
+def test_streamed_dfba_events_match_simulate_dynamic(tmp_path, monkeypatch):
+    import model_cache
+    from simulator import MetabolicSimulator
+
+    monkeypatch.setattr(model_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    toy = MetabolicSimulator(_write_toy_fermentation_model(tmp_path / "toy.json"))
+    settings = dict(initial_glucose=5.0, initial_biomass=0.05, total_time=3.0, time_step=0.5)
+
+    events = list(toy.iter_dynamic(flux_mode="full", **settings))
+    toy.reset_model()
+    result = toy.simulate_dynamic(include_flux_history=True, **settings)
+
+    steps, done = events[:-1], events[-1]
+    assert result["success"]
+    assert all(event["type"] == "step" for event in steps)
+    assert [event["index"] for event in steps] == list(range(len(steps)))
+    assert done["type"] == "done" and done["steps"] == len(steps) == len(result["time"])
+    assert done["lp_solves"] == result["lp_solves"]
+    assert [event["time"] for event in steps] == pytest.approx(result["time"])
+    assert [event["biomass"] for event in steps] == pytest.approx(result["biomass"])
+    assert [event["glucose"] for event in steps] == pytest.approx(result["glucose"])
+    for event, fluxes in zip(steps, result["flux_history"]):
+        assert event["fluxes"] == pytest.approx(fluxes)
+
+
+@requires_cobra
+def test_euler_trajectory_starts_small_and_rejects_nonpositive_steps(tmp_path, monkeypatch):
+    import model_cache
+    from simulator import MetabolicSimulator
+
+    monkeypatch.setattr(model_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    toy = MetabolicSimulator(_write_toy_fermentation_model(tmp_path / "toy.json"))
+    trajectory = toy.run_dynamic_trajectory(initial_glucose=5.0, initial_biomass=0.05,
+                                            total_time=100.0, time_step=0.01, include_flux_history=True)
+    # 10000 requested steps, but glucose runs out long before that
+    assert 0 < len(trajectory) < 10000
+    assert trajectory.fluxes._data.shape[0] <= max(256, 2 * len(trajectory))
+    for time_step in (0.0, -0.5):
+        toy.reset_model()
+        with pytest.raises(ValueError):
+            toy.run_dynamic_trajectory(total_time=1.0, time_step=time_step)
+    assert not toy.simulate_dynamic(total_time=1.0, time_step=0.0)["success"]
+
+
+def test_trajectory_storage_and_exports_round_trip():
+    np = pytest.importorskip("numpy")
+    import io
+    from flux_history import FluxMatrix, DynamicTrajectory
+
+    matrix = FluxMatrix(["a", "b"], capacity=1)
+    rows = [np.array([float(i), -float(i)]) for i in range(5)]
+    for row in rows:
+        matrix.append(row)
+    assert len(matrix) == 5
+    assert matrix.values.tolist() == [row.tolist() for row in rows]
+
+    def trajectory(track_fluxes):
+        traj = DynamicTrajectory(["R1", "R2", "R3"], ["EX_ac_e"], capacity=1, track_fluxes=track_fluxes)
+        for t in range(3):
+            traj.append({
+                "time": 0.5 * t, "biomass": 0.1 * (t + 1), "glucose": 10.0 - t, "growth_rate": 0.4,
+                "exchange_fluxes": np.array([float(t)]),
+                "fluxes": np.array([1.0, 0.0, -2.0 * t]), "alerts": [],
+            })
+        return traj
+
+    tracked = trajectory(True)
+    assert tracked.flux_records() == [{"R1": 1.0}, {"R1": 1.0, "R3": -2.0}, {"R1": 1.0, "R3": -4.0}]
+    columnar = tracked.flux_columnar()
+    assert columnar == {"reaction_ids": ["R1", "R3"], "values": [[1.0, 0.0], [1.0, -2.0], [1.0, -4.0]]}
+
+    # Without recorded fluxes both formats are empty, not None
+    untracked = trajectory(False)
+    assert untracked.flux_records() == []
+    assert untracked.flux_columnar() == {"reaction_ids": [], "values": []}
+
+    with np.load(io.BytesIO(tracked.export("npz"))) as archive:
+        assert archive["time"].tolist() == [0.0, 0.5, 1.0]
+        assert archive["biomass"].tolist() == pytest.approx([0.1, 0.2, 0.3])
+        assert archive["exchange_ids"].tolist() == ["EX_ac_e"]
+        assert archive["exchange_fluxes"].tolist() == [[0.0], [1.0], [2.0]]
+        assert archive["reaction_ids"].tolist() == ["R1", "R2", "R3"]
+        assert archive["fluxes"].tolist() == tracked.fluxes.values.tolist()
+    with np.load(io.BytesIO(untracked.export("npz"))) as archive:
+        assert "fluxes" not in archive.files
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(tracked.export("parquet"))).to_pydict()
+    assert table["glucose"] == [10.0, 9.0, 8.0]
+    assert table["R3"] == [0.0, -2.0, -4.0]
+    assert list(table) == ["time", "biomass", "glucose", "growth_rate", "R1", "R2", "R3"]
+
+
+def test_vectorized_postprocessing_matches_per_reaction_loops(sim):
+    sim.reset_model()
+    sim.apply_environment("glc__D", -10.0, aerobic=False)
+    solution = sim.model.optimize()
+    fluxes = solution.fluxes
+    values = fluxes.values
+
+    # Straightforward per-exchange computation on the loaded model
+    excreting = {r.id: fluxes[r.id] for r in sim.model.exchanges if fluxes[r.id] > 1e-6}
+    expected_byproducts = sorted(excreting.items(), key=lambda item: item[1], reverse=True)[:5]
+    uptake = excreted = 0.0
+    for rxn in sim.model.exchanges:
+        met = next(iter(rxn.metabolites))
+        carbons = met.elements.get("C", 0)
+        if fluxes[rxn.id] < -1e-6:
+            uptake += -fluxes[rxn.id] * carbons
+        elif fluxes[rxn.id] > 1e-6 and met.id != "co2_e":
+            excreted += fluxes[rxn.id] * carbons
+    expected_loss = excreted / uptake * 100 if uptake > 0 else 0.0
+    prices = solution.shadow_prices
+    expected_prices = prices.abs().sort_values(ascending=False).head(50)
+
+    byproducts = sim._top_byproducts(values)
+    assert [item["id"] for item in byproducts] == [rid for rid, _ in expected_byproducts]
+    assert [item["value"] for item in byproducts] == pytest.approx([v for _, v in expected_byproducts])
+    assert expected_loss > 0
+    assert sim._carbon_loss_index(values) == pytest.approx(expected_loss)
+
+    top_prices = sim._top_shadow_prices(prices)
+    assert len(top_prices) == len(expected_prices)
+    # Ties at the cut-off may pick different metabolites, so compare magnitudes
+    assert sorted(abs(v) for v in top_prices.values()) == pytest.approx(sorted(expected_prices.values))
+    assert all(prices[met_id] == pytest.approx(value) for met_id, value in top_prices.items())
+    sim.reset_model()
+
+
+def test_euler_dfba_engine_matches_baseline_loop(sim):
+    from dfba_engine import TOXICITY_MAP
+
+    settings = dict(initial_glucose=10.0, initial_biomass=0.05, total_time=6.0, time_step=1.0)
+
+    # The original dFBA loop: a full optimize() per step, fluxes read by id
+    sim.reset_model()
+    X, S, t = settings["initial_biomass"], settings["initial_glucose"], 0.0
+    P = {rid: 0.0 for rid in TOXICITY_MAP}
+    times, biomass, glucose = [], [], []
+    while t <= settings["total_time"] and S > 0:
+        times.append(round(t, 4))
+        biomass.append(round(X, 4))
+        glucose.append(round(S, 4))
+        sim.model.reactions.get_by_id("EX_glc__D_e").lower_bound = -10.0 * (S / (0.5 + S))
+        solution = sim.model.optimize()
+        if solution.status != "optimal":
+            break
+        mu = solution.objective_value
+        for rid, threshold in TOXICITY_MAP.items():
+            mu *= threshold / (threshold + P[rid])
+        fluxes = solution.fluxes
+        for rid in P:
+            if rid in fluxes.index and fluxes[rid] > 1e-4:
+                P[rid] += fluxes[rid] * X * settings["time_step"]
+        X_next = X + mu * X * settings["time_step"]
+        S_next = S + fluxes["EX_glc__D_e"] * X * settings["time_step"]
+        X, S = max(0, X_next), max(0, S_next)
+        t += settings["time_step"]
+
+    sim.reset_model()
+    result = sim.simulate_dynamic(integrator="euler", **settings)
+    sim.reset_model()
+
+    assert result["success"]
+    assert result["time"] == pytest.approx(times)
+    assert result["biomass"] == pytest.approx(biomass, abs=1e-4)
+    assert result["glucose"] == pytest.approx(glucose, abs=1e-4)
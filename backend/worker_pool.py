@@ -0,0 +1,86 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from simulator import MetabolicSimulator
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+
+# Per-process simulators, populated lazily inside worker processes
+_worker_simulators: Dict[str, "MetabolicSimulator"] = {}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_worker_simulator(model_path: str) -> "MetabolicSimulator":
+    """
+    Simulator owned by the current worker process.
+    Loaded once per process (through the model cache) and reset before reuse.
+    """
+    from simulator import MetabolicSimulator
+
+    sim = _worker_simulators.get(model_path)
+    if sim is None:
+        sim = MetabolicSimulator(model_path)
+        _worker_simulators[model_path] = sim
+    else:
+        sim.reset_model()
+    return sim
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Shared process pool. Workers are spawned rather than forked so they never
+    inherit solver state or locks from the API process' threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=MAX_WORKER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Started worker process pool: {MAX_WORKER_PROCESSES} processes")
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def chunked(items: List, n_chunks: int) -> List[List]:
+    """Split `items` into at most `n_chunks` contiguous, order-preserving chunks."""
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size, extra = divmod(len(items), n_chunks)
+    chunks, start = [], 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def map_chunks(fn: Callable, model_path: str, chunks: Iterable[List], **kwargs) -> Iterator[List]:
+    """
+    Run `fn(model_path, chunk, **kwargs)` for every chunk on the process pool,
+    yielding the chunk results in submission order.
+    """
+    executor = get_executor()
+    futures = [executor.submit(fn, model_path, chunk, **kwargs) for chunk in chunks]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
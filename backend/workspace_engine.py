@@ -1,50 +1,90 @@
+import weakref
 import numpy as np
 import cobra
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+
+LAYOUT_SEED = 42
+PROJECTION_FORMATS = ("records", "columnar")
+
+
+class WorkspaceLayout:
+    """
+    Static (x, y) position of every reaction in the 3D flux space.
+    Subsystems are placed on a ring in sorted order and each reaction gets a
+    jitter from a generator seeded with LAYOUT_SEED, so the layout is the same
+    on every call, in every simulator and after restarts.
+    """
+
+    def __init__(self, model: cobra.Model, seed: int = LAYOUT_SEED):
+        reactions = model.reactions
+        self.reaction_ids = [r.id for r in reactions]
+        self.position = {rid: i for i, rid in enumerate(self.reaction_ids)}
+        self.names = [r.name for r in reactions]
+        self.subsystems = [r.subsystem or "Other" for r in reactions]
+
+        # Cylindrical coordinates: one angle per subsystem, reactions without one sit at 0
+        subsystems = sorted({r.subsystem for r in reactions if r.subsystem})
+        subsystem_to_angle = {s: (i / len(subsystems)) * 2 * np.pi for i, s in enumerate(subsystems)}
+        angle = np.array([subsystem_to_angle.get(r.subsystem, 0.0) for r in reactions], dtype=float)
+
+        rng = np.random.default_rng(seed)
+        n = len(reactions)
+        radius = 5.0 + rng.normal(0, 0.5, n)  # Subsystem ring
+        self.x = radius * np.cos(angle) + rng.normal(0, 0.3, n)
+        self.y = radius * np.sin(angle) + rng.normal(0, 0.3, n)
+
+
+_layouts: "weakref.WeakKeyDictionary[cobra.Model, WorkspaceLayout]" = weakref.WeakKeyDictionary()
+
+
+def workspace_layout(model: cobra.Model) -> WorkspaceLayout:
+    layout = _layouts.get(model)
+    if layout is None:
+        layout = WorkspaceLayout(model)
+        _layouts[model] = layout
+    return layout
+
 
 class WorkspaceEngine:
     def __init__(self, model: cobra.Model):
         self.model = model
+        self.layout = workspace_layout(model)
 
-    def get_3d_projection(self, flux_data: Dict[str, float]) -> List[Dict]:
+    def get_3d_projection(self, flux_data: Dict[str, float], blocked: Optional[set] = None,
+                          projection_format: str = "records") -> Union[List[Dict], Dict[str, List]]:
         """
         Project flux data into 3D space.
         Instead of heavy PCA, we use an intelligent mapping based on subsystems 
         to ensure biological meaning in the 3D space.
+        Reactions in `blocked` cannot carry flux in the medium and are skipped.
+        x/y come from the cached model layout; only z and value are computed here.
+        "columnar" returns one list per field instead of one dict per reaction.
         """
-        # Group reactions by subsystem
-        subsystems = list(set([r.subsystem for r in self.model.reactions if r.subsystem]))
-        subsystem_to_angle = {s: (i / len(subsystems)) * 2 * np.pi for i, s in enumerate(subsystems)}
-        
-        projections = []
-        for rxn_id, flux in flux_data.items():
-            if rxn_id not in self.model.reactions:
-                continue
-                
-            rxn = self.model.reactions.get_by_id(rxn_id)
-            ss = rxn.subsystem or "Other"
-            
-            # Use cylindrical coordinates to create clusters
-            angle = subsystem_to_angle.get(ss, 0)
-            radius = 5.0 + np.random.normal(0, 0.5) # Subsystem ring
-            
-            # Z-axis can represent flux magnitude or energy level
-            z = np.log1p(abs(flux)) * (1 if flux >= 0 else -1)
-            
-            x = radius * np.cos(angle) + np.random.normal(0, 0.3)
-            y = radius * np.sin(angle) + np.random.normal(0, 0.3)
-            
-            projections.append({
-                "id": rxn_id,
-                "name": rxn.name,
-                "subsystem": ss,
-                "x": float(x),
-                "y": float(y),
-                "z": float(z),
-                "value": float(abs(flux))
-            })
-            
-        return projections
+        if projection_format not in PROJECTION_FORMATS:
+            raise ValueError(f"projection_format must be one of {PROJECTION_FORMATS}")
+        blocked = blocked or set()
+        layout = self.layout
+        ids = [rid for rid in flux_data if rid in layout.position and rid not in blocked]
+        index = np.fromiter((layout.position[rid] for rid in ids), dtype=np.intp, count=len(ids))
+        flux = np.fromiter((flux_data[rid] for rid in ids), dtype=float, count=len(ids))
+
+        # Z-axis can represent flux magnitude or energy level
+        value = np.abs(flux)
+        z = np.log1p(value)
+        z[flux < 0] *= -1
+
+        columns = {
+            "id": ids,
+            "name": [layout.names[i] for i in index],
+            "subsystem": [layout.subsystems[i] for i in index],
+            "x": layout.x[index].tolist(),
+            "y": layout.y[index].tolist(),
+            "z": z.tolist(),
+            "value": value.tolist(),
+        }
+        if projection_format == "columnar":
+            return columns
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
 
     def serialize_workspace(self, 
                             config: Dict, 